@@ -0,0 +1,35 @@
+"""add tag name lower index
+
+Revision ID: 3d9f6b2c4e11
+Revises: 8c3e1a7b5d20
+Create Date: 2026-10-17 00:00:01.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3d9f6b2c4e11"
+down_revision: Union[str, None] = "8c3e1a7b5d20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY 不能在事务中执行，建索引期间不阻塞写入
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tags_name_lower",
+            "tags",
+            [sa.text("lower(name)")],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_tags_name_lower", table_name="tags", if_exists=True, postgresql_concurrently=True)
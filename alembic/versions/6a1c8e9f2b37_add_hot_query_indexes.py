@@ -0,0 +1,54 @@
+"""add hot query indexes
+
+Revision ID: 6a1c8e9f2b37
+Revises: 3d9f6b2c4e11
+Create Date: 2026-10-17 00:00:02.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6a1c8e9f2b37"
+down_revision: Union[str, None] = "3d9f6b2c4e11"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (名称, 表, 列, 部分索引条件)
+INDEXES = [
+    ("ix_posts_published_feed", "posts", [sa.text("published_at DESC"), sa.text("id DESC")], "published = true"),
+    (
+        "ix_comments_post_status_roots",
+        "comments",
+        ["post_id", "moderation_status", "created_at"],
+        "parent_id IS NULL",
+    ),
+    ("ix_comments_parent_id_created_at", "comments", ["parent_id", "created_at"], None),
+    ("ix_post_tag_tag_id_post_id", "post_tag", ["tag_id", "post_id"], None),
+    ("ix_comment_likes_comment_id_user_id", "comment_likes", ["comment_id", "user_id"], None),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY 不能在事务中执行，建索引期间不阻塞写入
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                sqlite_where=sa.text(where.replace("true", "1")) if where else None,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
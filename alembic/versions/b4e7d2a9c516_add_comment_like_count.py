@@ -0,0 +1,42 @@
+"""add comment like count
+
+Revision ID: b4e7d2a9c516
+Revises: 6a1c8e9f2b37
+Create Date: 2026-10-17 00:00:03.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b4e7d2a9c516"
+down_revision: Union[str, None] = "6a1c8e9f2b37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "comments",
+        sa.Column("like_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+    )
+    op.execute(
+        sa.text(
+            """
+            UPDATE comments
+            SET like_count = counts.like_count
+            FROM (
+                SELECT comment_id, COUNT(*) AS like_count
+                FROM comment_likes
+                GROUP BY comment_id
+            ) AS counts
+            WHERE counts.comment_id = comments.id
+            """
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("comments", "like_count")
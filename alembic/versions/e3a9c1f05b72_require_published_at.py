@@ -0,0 +1,39 @@
+"""require published_at for published posts
+
+Revision ID: e3a9c1f05b72
+Revises: b4e7d2a9c516
+Create Date: 2026-10-17 00:00:04.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a9c1f05b72"
+down_revision: Union[str, None] = "b4e7d2a9c516"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 已发布文章按 (published_at, id) 做键集分页，旧数据里缺失的发布时间用创建时间补上
+    op.execute(
+        sa.text(
+            """
+            UPDATE posts
+            SET published_at = COALESCE(created_at, CURRENT_TIMESTAMP)
+            WHERE published AND published_at IS NULL
+            """
+        )
+    )
+    with op.batch_alter_table("posts") as batch_op:
+        batch_op.create_check_constraint(
+            op.f("ck_posts_published_at_required"), sa.text("NOT published OR published_at IS NOT NULL")
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("posts") as batch_op:
+        batch_op.drop_constraint(op.f("ck_posts_published_at_required"), type_="check")
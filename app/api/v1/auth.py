@@ -7,6 +7,7 @@ from fastapi import APIRouter, Cookie, Depends, Form, HTTPException, Request, Re
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import JWTError
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.templating import Jinja2Templates
 
@@ -22,6 +23,7 @@ from app.core.security import (
     set_auth_cookies,
     verify_password,
 )
+from app.crud.existence import emails, usernames
 from app.models.user import User
 from app.schemas.user import EmailSchema, PasswordResetSchema, Token, User as UserSchema, UserCreate
 from app.tasks.email import send_email
@@ -42,6 +44,25 @@ async def _get_user_by_username(db: AsyncSession, username: str) -> User | None:
     return result.scalars().first()
 
 
+async def _email_taken(db: AsyncSession, email: str) -> bool:
+    """Bloom 过滤器判定一定不存在时不查询数据库"""
+    if not emails.might_contain(email):
+        return False
+    if await _get_user_by_email(db, email):
+        return True
+    emails.record_false_positive()
+    return False
+
+
+async def _username_taken(db: AsyncSession, username: str) -> bool:
+    if not usernames.might_contain(username):
+        return False
+    if await _get_user_by_username(db, username):
+        return True
+    usernames.record_false_positive()
+    return False
+
+
 def _require_email_delivery(feature_name: str) -> None:
     if not settings.mail_enabled:
         raise HTTPException(
@@ -119,9 +140,9 @@ async def register(
     db: AsyncSession = Depends(get_db),
     user_in: UserCreate,
 ) -> Any:
-    if await _get_user_by_email(db, user_in.email):
+    if await _email_taken(db, user_in.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该邮箱已被注册")
-    if await _get_user_by_username(db, user_in.username):
+    if await _username_taken(db, user_in.username):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该用户名已被使用")
 
     require_email_verification = bool(settings.REQUIRE_EMAIL_VERIFICATION)
@@ -143,7 +164,12 @@ async def register(
         ),
     )
     db.add(user)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 并发注册（或过滤器尚未同步到的新用户）由唯一约束兜底
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该邮箱或用户名已被使用")
     await db.refresh(user)
 
     if require_email_verification and verify_token:
@@ -0,0 +1,80 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from app.api.v1.dependencies import get_current_superuser
+from app.core.bloom import filter_stats
+from app.core.cache import cache_manager, invalidate_tags
+from app.core.snapshot import registered_snapshots
+from app.core.write_behind import counter_stats
+from app.models.user import User
+
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def read_cache_stats(
+    *,
+    aggregate: bool = Query(True, description="是否汇总所有 worker 的统计"),
+    current_user: User = Depends(get_current_superuser),
+) -> Any:
+    return await cache_manager.get_stats(aggregate=aggregate)
+
+
+@router.get("/snapshots")
+async def read_snapshots(
+    *,
+    current_user: User = Depends(get_current_superuser),
+) -> Any:
+    """预计算快照的构建时间与构建耗时"""
+    return [await snapshot.info() for snapshot in registered_snapshots()]
+
+
+@router.get("/bloom")
+async def read_bloom_filters(
+    *,
+    current_user: User = Depends(get_current_superuser),
+) -> Any:
+    """本进程各 Bloom 过滤器的大小、估算与实际误判率"""
+    return filter_stats()
+
+
+@router.get("/counters")
+async def read_write_behind_counters(
+    *,
+    current_user: User = Depends(get_current_superuser),
+) -> Any:
+    """写回计数器的缓冲量、批量写入大小、延迟与失败次数（本进程）"""
+    return counter_stats()
+
+
+@router.get("/keys")
+async def read_cache_keys(
+    *,
+    prefix: Optional[str] = Query(None, description="只列出以该前缀开头的键"),
+    order_by: str = Query("bytes", pattern="^(bytes|hits)$"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_superuser),
+) -> Any:
+    return await cache_manager.inspect_keys(prefix=prefix, order_by=order_by, limit=limit)
+
+
+@router.delete("/prefix/{prefix}")
+async def purge_cache_prefix(
+    *,
+    prefix: str,
+    current_user: User = Depends(get_current_superuser),
+) -> Any:
+    await cache_manager.purge_prefix(prefix)
+    return {"detail": "缓存已清除", "prefix": prefix}
+
+
+@router.delete("/tags/{tag}")
+async def purge_cache_tag(
+    *,
+    tag: str,
+    current_user: User = Depends(get_current_superuser),
+) -> Any:
+    await invalidate_tags(tag)
+    return {"detail": "缓存已清除", "tag": tag}
@@ -6,33 +6,30 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.api.v1.dependencies import get_current_superuser
-from app.core.cache import cache_key_wrapper, invalidate_cache_pattern
+from app.core.cache import cache_key_wrapper, invalidate_tags
+from app.core.conditional import Validators, conditional, fetch_validators, table_version
 from app.core.database import get_db
+from app.crud.post import join_counters, with_counters
+from app.crud.slugs import category_slug
 from app.models.category import Category
-from app.models.post import Post
+from app.models.post import Post, PostCounter
 from app.models.tag import Tag
 from app.models.user import User
 from app.schemas.category import Category as CategorySchema, CategoryCreate, CategoryDetail, CategoryUpdate
-from app.utils.slug import generate_slug
 
 
 router = APIRouter()
 
 
-async def _build_unique_category_slug(db: AsyncSession, name: str) -> str:
-    base_slug = generate_slug(name, max_length=100)
-    slug = base_slug
-    suffix = 1
-    while True:
-        result = await db.execute(select(Category.id).where(Category.slug == slug))
-        if result.scalar_one_or_none() is None:
-            return slug
-        slug = f"{base_slug}-{suffix}"
-        suffix += 1
+async def _categories_validators(db: AsyncSession) -> Validators:
+    """分类列表版本：分类表与已发布文章的版本（决定 post_count）"""
+    return await fetch_validators(db, *table_version(Category), *table_version(Post, Post.published == True))
 
 
 @router.get("/", response_model=list[CategoryDetail])
-@cache_key_wrapper("categories:list", expire=3600)
+@conditional(_categories_validators)
+@cache_key_wrapper("categories:list", expire=3600, vary_on=("skip", "limit", "include_empty"),
+                   stale_ttl=600, stale_if_error=True, tags=("categories",))
 async def read_categories(
     db: AsyncSession = Depends(get_db),
     skip: int = Query(0, ge=0),
@@ -66,7 +63,7 @@ async def read_categories(
 
 
 @router.get("/{category_id}", response_model=CategoryDetail)
-@cache_key_wrapper("categories:detail", expire=1800)
+@cache_key_wrapper("categories:detail", expire=1800, vary_on=("category_id",), tags=("category:{category_id}",))
 async def read_category(category_id: int, db: AsyncSession = Depends(get_db)) -> CategoryDetail:
     category = await db.get(Category, category_id)
     if category is None:
@@ -105,11 +102,11 @@ async def read_category_posts(
         .where((Post.category_id == category_id) & (Post.published == True))
     )
     if sort == "newest":
-        query = query.order_by(Post.created_at.desc())
+        query = with_counters(query).order_by(Post.created_at.desc())
     elif sort == "oldest":
-        query = query.order_by(Post.created_at.asc())
+        query = with_counters(query).order_by(Post.created_at.asc())
     else:
-        query = query.order_by(Post.views.desc())
+        query = join_counters(query).order_by(PostCounter.views.desc())
 
     result = await db.execute(query.offset(skip).limit(limit))
     posts = result.scalars().all()
@@ -140,14 +137,13 @@ async def create_category(
 
     category = Category(
         name=category_in.name,
-        slug=await _build_unique_category_slug(db, category_in.name),
         description=category_in.description,
         is_active=category_in.is_active,
     )
-    db.add(category)
+    await category_slug.assign(db, category, category_in.name)
     await db.commit()
     await db.refresh(category)
-    await invalidate_cache_pattern("categories:*")
+    await invalidate_tags("categories", "sidebar")
     return category
 
 
@@ -171,7 +167,7 @@ async def update_category(
         if result.scalars().first():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该分类名已存在")
         category.name = category_in.name
-        category.slug = await _build_unique_category_slug(db, category_in.name)
+        await category_slug.assign(db, category, category_in.name)
 
     if category_in.description is not None:
         category.description = category_in.description
@@ -180,8 +176,7 @@ async def update_category(
 
     await db.commit()
     await db.refresh(category)
-    await invalidate_cache_pattern("categories:*")
-    await invalidate_cache_pattern("posts:*")
+    await invalidate_tags("categories", f"category:{category_id}", "posts", "sidebar")
     return category
 
 
@@ -209,5 +204,4 @@ async def delete_category(
 
     await db.delete(category)
     await db.commit()
-    await invalidate_cache_pattern("categories:*")
-    await invalidate_cache_pattern("posts:*")
+    await invalidate_tags("categories", f"category:{category_id}", "posts", "sidebar")
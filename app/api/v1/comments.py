@@ -1,20 +1,23 @@
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.api.v1.dependencies import get_current_active_user, get_current_user_optional
+from app.core.cache import invalidate_tags
 from app.core.database import get_db
+from app.crud.base import InvalidCursor
+from app.crud.comment_tree import CommentNode, comment_tree
+from app.crud.like import comment_like
 from app.models.comment import (
     COMMENT_STATUS_APPROVED,
     COMMENT_STATUS_HIDDEN,
     COMMENT_STATUS_PENDING,
     Comment,
 )
-from app.models.like import CommentLike
-from app.models.post import Post
+from app.models.post import Post, PostCounter
 from app.models.user import User
 from app.schemas.comment import Comment as CommentSchema, CommentCreate, CommentUpdate
 
@@ -27,29 +30,55 @@ async def _get_comment(db: AsyncSession, comment_id: int) -> Comment | None:
         select(Comment)
         .options(
             selectinload(Comment.author),
-            selectinload(Comment.likes),
             selectinload(Comment.replies).selectinload(Comment.author),
-            selectinload(Comment.replies).selectinload(Comment.likes),
         )
         .where(Comment.id == comment_id)
     )
     return result.scalars().first()
 
 
+async def _invalidate_comment_post(db: AsyncSession, comment_id: int) -> None:
+    post_id = (await db.execute(select(Comment.post_id).where(Comment.id == comment_id))).scalar_one_or_none()
+    if post_id is not None:
+        await invalidate_tags(f"post:{post_id}")
+
+
 def _serialize_comment(comment: Comment) -> dict[str, Any]:
     return CommentSchema.model_validate(comment).model_dump(mode="json")
 
 
-async def _refresh_post_comment_count(db: AsyncSession, post_id: int) -> None:
+async def _load_thread(
+    db: AsyncSession, response: Response, current_user: User | None, **params: Any
+) -> list[CommentNode]:
+    try:
+        thread = await comment_tree.load(db, **params)
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="分页游标无效")
+    if current_user:
+        await comment_tree.mark_liked(db, thread, current_user.id)
+    if thread.next_cursor:
+        response.headers["X-Next-Cursor"] = thread.next_cursor
+    return thread.comments
+
+
+async def _refresh_post_comment_count(db: AsyncSession, post_id: int) -> bool:
+    """重算文章的可见评论数，返回是否有变化"""
     result = await db.execute(
         select(func.count(Comment.id)).where(
             Comment.post_id == post_id, Comment.moderation_status == COMMENT_STATUS_APPROVED
         )
     )
     visible_count = result.scalar_one_or_none() or 0
-    post = await db.get(Post, post_id)
-    if post is not None:
-        post.comment_count = visible_count
+    counters = await db.get(PostCounter, post_id)
+    if counters is None or counters.comment_count == visible_count:
+        return False
+    counters.comment_count = visible_count
+    return True
+
+
+def _comment_cache_tags(post_id: int, count_changed: bool) -> list[str]:
+    """评论变动要清除的缓存标签；可见评论数变了时，显示 comment_count 的列表页（posts 标签）也要清除"""
+    return [f"post:{post_id}", "sidebar", *(["posts"] if count_changed else [])]
 
 
 def _determine_initial_moderation_status(current_user: User, post: Post) -> str:
@@ -97,7 +126,7 @@ async def _collect_comment_subtree(
 async def _get_comment_with_post(db: AsyncSession, comment_id: int) -> Comment | None:
     result = await db.execute(
         select(Comment)
-        .options(selectinload(Comment.post), selectinload(Comment.author), selectinload(Comment.likes))
+        .options(selectinload(Comment.post), selectinload(Comment.author))
         .where(Comment.id == comment_id)
     )
     return result.scalars().first()
@@ -158,47 +187,35 @@ async def _hide_comment_subtree(
 async def read_post_comments(
     *,
     db: AsyncSession = Depends(get_db),
+    response: Response,
     post_id: int,
-    skip: int = Query(0, ge=0),
+    after: str | None = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     limit: int = Query(20, ge=1, le=100),
     current_user: User | None = Depends(get_current_user_optional),
 ) -> Any:
     post = await db.get(Post, post_id)
     if post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+    return await _load_thread(db, response, current_user, post_id=post_id, after=after, limit=limit)
 
-    result = await db.execute(
-        select(Comment)
-        .where(Comment.post_id == post_id, Comment.moderation_status == COMMENT_STATUS_APPROVED, Comment.parent_id.is_(None))
-        .options(
-            selectinload(Comment.author),
-            selectinload(Comment.likes),
-            selectinload(Comment.replies).selectinload(Comment.author),
-            selectinload(Comment.replies).selectinload(Comment.likes),
-        )
-        .order_by(Comment.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    comments = result.scalars().all()
-    for comment in comments:
-        comment.replies = [reply for reply in comment.replies if reply.moderation_status == COMMENT_STATUS_APPROVED]
-
-    if current_user and comments:
-        reply_ids = [reply.id for comment in comments for reply in comment.replies]
-        liked_result = await db.execute(
-            select(CommentLike.comment_id).where(
-                CommentLike.user_id == current_user.id,
-                CommentLike.comment_id.in_([comment.id for comment in comments] + reply_ids),
-            )
-        )
-        liked_comment_ids = set(liked_result.scalars().all())
-        for comment in comments:
-            comment.is_liked = comment.id in liked_comment_ids
-            for reply in comment.replies:
-                reply.is_liked = reply.id in liked_comment_ids
 
-    return comments
+@router.get("/{comment_id}/replies", response_model=list[CommentSchema])
+async def read_comment_replies(
+    *,
+    db: AsyncSession = Depends(get_db),
+    response: Response,
+    comment_id: int,
+    after: str | None = Query(None, description="评论的 replies_cursor 或上一页响应头 X-Next-Cursor 的值"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User | None = Depends(get_current_user_optional),
+) -> Any:
+    """加载某条评论的更多回复（连同它们各自的前几条回复）"""
+    comment = await db.get(Comment, comment_id)
+    if comment is None or comment.moderation_status != COMMENT_STATUS_APPROVED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+    return await _load_thread(
+        db, response, current_user, post_id=comment.post_id, parent_id=comment_id, after=after, limit=limit
+    )
 
 
 @router.post("/", response_model=CommentSchema)
@@ -233,8 +250,9 @@ async def create_comment(
     db.add(comment)
     current_user.comment_count += 1
     await db.flush()
-    await _refresh_post_comment_count(db, comment.post_id)
+    count_changed = await _refresh_post_comment_count(db, comment.post_id)
     await db.commit()
+    await invalidate_tags(*_comment_cache_tags(comment.post_id, count_changed))
     return await _get_comment(db, comment.id)
 
 
@@ -255,6 +273,7 @@ async def update_comment(
     comment.content = comment_in.content
     comment.is_edited = True
     await db.commit()
+    await invalidate_tags(f"post:{comment.post_id}")
     return await _get_comment(db, comment.id)
 
 
@@ -278,8 +297,9 @@ async def delete_comment(
             author.comment_count = max(0, author.comment_count - count)
     await db.delete(comment)
     await db.flush()
-    await _refresh_post_comment_count(db, comment.post_id)
+    count_changed = await _refresh_post_comment_count(db, comment.post_id)
     await db.commit()
+    await invalidate_tags(*_comment_cache_tags(comment.post_id, count_changed))
     return {
         "detail": "Comment deleted successfully",
         "deleted_count": len(subtree_ids),
@@ -314,8 +334,9 @@ async def approve_comment(
         }
 
     comment.set_moderation_status(COMMENT_STATUS_APPROVED)
-    await _refresh_post_comment_count(db, comment.post_id)
+    count_changed = await _refresh_post_comment_count(db, comment.post_id)
     await db.commit()
+    await invalidate_tags(*_comment_cache_tags(comment.post_id, count_changed))
     refreshed = await _get_comment(db, comment_id)
     return {
         "detail": "Comment approved successfully",
@@ -339,8 +360,9 @@ async def hide_comment(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
 
     changed_ids, approved_changed_count, pending_changed_count = await _hide_comment_subtree(db, comment)
-    await _refresh_post_comment_count(db, comment.post_id)
+    count_changed = await _refresh_post_comment_count(db, comment.post_id)
     await db.commit()
+    await invalidate_tags(*_comment_cache_tags(comment.post_id, count_changed))
     refreshed = await _get_comment(db, comment_id)
     return {
         "detail": "Comment hidden successfully",
@@ -359,19 +381,12 @@ async def like_comment(
     comment_id: int,
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    comment = await db.get(Comment, comment_id)
-    if comment is None:
+    result = await comment_like.like(db, user_id=current_user.id, comment_id=comment_id)
+    if result.like_count is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
-
-    result = await db.execute(
-        select(CommentLike).where(CommentLike.user_id == current_user.id, CommentLike.comment_id == comment_id)
-    )
-    existing = result.scalars().first()
-    if existing is None:
-        db.add(CommentLike(user_id=current_user.id, comment_id=comment_id))
-        await db.commit()
-    refreshed = await _get_comment(db, comment_id)
-    return {"detail": "Comment liked successfully", "like_count": refreshed.like_count if refreshed else 0, "liked": True}
+    if result.changed:
+        await _invalidate_comment_post(db, comment_id)
+    return {"detail": "Comment liked successfully", "like_count": result.like_count, "liked": True}
 
 
 @router.delete("/{comment_id}/like")
@@ -381,17 +396,12 @@ async def unlike_comment(
     comment_id: int,
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    result = await db.execute(
-        select(CommentLike).where(CommentLike.user_id == current_user.id, CommentLike.comment_id == comment_id)
-    )
-    like = result.scalars().first()
-    if like is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Comment not liked")
-
-    await db.delete(like)
-    await db.commit()
-    refreshed = await _get_comment(db, comment_id)
-    return {"detail": "Comment unliked successfully", "like_count": refreshed.like_count if refreshed else 0, "liked": False}
+    result = await comment_like.unlike(db, user_id=current_user.id, comment_id=comment_id)
+    if result.like_count is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+    if result.changed:
+        await _invalidate_comment_post(db, comment_id)
+    return {"detail": "Comment unliked successfully", "like_count": result.like_count, "liked": False}
 
 
 @router.get("/user/{user_id}", response_model=list[CommentSchema])
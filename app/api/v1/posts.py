@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from markdown import markdown as render_markdown
 from pydantic import BaseModel, Field
 from sqlalchemy import func, select
@@ -10,16 +10,27 @@ from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.attributes import set_committed_value
 
 from app.api.v1.dependencies import get_current_active_user, get_current_user_optional
+from app.core.cache import invalidate_tags
+from app.core.conditional import Validators, conditional, fetch_validators, table_version
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import create_post_preview_token
+from app.crud.base import InvalidCursor
+from app.crud.comment_tree import comment_tree
+from app.crud.like import post_like
+from app.crud.post import (
+    counters_version, post as crud_post, post_sort_keys, post_views, sort_posts_query, with_counters,
+)
+from app.crud.slugs import post_slug
+from app.crud.tag import crud_tag
+from app.models.category import Category
 from app.models.comment import COMMENT_STATUS_APPROVED, COMMENT_STATUS_PENDING, Comment
 from app.models.like import PostLike
-from app.models.post import Post
+from app.models.post import Post, PostCounter
 from app.models.tag import Tag
 from app.models.user import User
 from app.schemas.comment import Comment as CommentSchema, CommentCreate
 from app.schemas.post import Post as PostSchema, PostCreate, PostDetail, PostUpdate
-from app.utils.slug import generate_slug
 
 
 router = APIRouter()
@@ -36,21 +47,18 @@ class PostPreviewLinkResponse(BaseModel):
     published: bool
 
 
-async def _build_unique_post_slug(db: AsyncSession, title: str, requested_slug: Optional[str] = None) -> str:
-    base_slug = requested_slug or generate_slug(title, max_length=200)
-    slug = base_slug
-    suffix = 1
-    while True:
-        result = await db.execute(select(Post.id).where(Post.slug == slug))
-        if result.scalar_one_or_none() is None:
-            return slug
-        slug = f"{base_slug}-{suffix}"
-        suffix += 1
+def _post_cache_tags(post: Post, *extra: str) -> list[str]:
+    """文章写操作影响的缓存依赖标签：文章本身、所属分类与标签的列表/计数、侧边栏"""
+    tags = [f"post:{post.id}", "posts", "categories", "tags", "sidebar", *extra]
+    if post.category_id is not None:
+        tags.append(f"category:{post.category_id}")
+    tags.extend(f"tag:{tag.id}" for tag in post.__dict__.get("tags") or [])
+    return tags
 
 
 async def _load_post(db: AsyncSession, post_id: int) -> Post:
     result = await db.execute(
-        select(Post)
+        with_counters(select(Post))
         .options(
             selectinload(Post.author),
             selectinload(Post.category),
@@ -69,13 +77,17 @@ async def _get_post_comment_author_counts(db: AsyncSession, post_id: int) -> dic
     return {author_id: count for author_id, count in result.all()}
 
 
-async def _refresh_post_comment_count(db: AsyncSession, post_id: int) -> None:
+async def _refresh_post_comment_count(db: AsyncSession, post_id: int) -> bool:
+    """重算文章的可见评论数，返回是否有变化"""
     result = await db.execute(
         select(func.count(Comment.id)).where(Comment.post_id == post_id, Comment.moderation_status == COMMENT_STATUS_APPROVED)
     )
-    post = await db.get(Post, post_id)
-    if post is not None:
-        post.comment_count = result.scalar_one_or_none() or 0
+    visible_count = result.scalar_one_or_none() or 0
+    counters = await db.get(PostCounter, post_id)
+    if counters is None or counters.comment_count == visible_count:
+        return False
+    counters.comment_count = visible_count
+    return True
 
 
 def _determine_comment_status(current_user: User, post: Post) -> str:
@@ -88,44 +100,36 @@ def _can_manage_post(current_user: User, post: Post) -> bool:
     return current_user.is_superuser or post.author_id == current_user.id
 
 
-async def _resolve_tags(db: AsyncSession, tag_names: list[str]) -> list[Tag]:
-    tags: list[Tag] = []
-    for raw_name in tag_names:
-        name = raw_name.strip().lower()
-        if not name:
-            continue
-        result = await db.execute(select(Tag).where(func.lower(Tag.name) == name))
-        tag = result.scalars().first()
-        if tag is None:
-            tag = Tag(name=name, slug=await _build_unique_tag_slug(db, name))
-            db.add(tag)
-            await db.flush()
-        tags.append(tag)
-    return tags
-
-
-async def _build_unique_tag_slug(db: AsyncSession, name: str) -> str:
-    base_slug = generate_slug(name, max_length=255)
-    slug = base_slug
-    suffix = 1
-    while True:
-        result = await db.execute(select(Tag.id).where(Tag.slug == slug))
-        if result.scalar_one_or_none() is None:
-            return slug
-        slug = f"{base_slug}-{suffix}"
-        suffix += 1
+async def _posts_list_validators(db: AsyncSession, published: Optional[bool] = True) -> Validators:
+    """列表版本：文章以及嵌入的作者、分类、标签各自表的 max(updated_at)/数量，外加文章计数合计"""
+    criteria = () if published is None else (Post.published == published,)
+    return await fetch_validators(
+        db,
+        *table_version(Post, *criteria),
+        *counters_version(*criteria),
+        *table_version(User),
+        *table_version(Category),
+        *table_version(Tag),
+    )
 
 
 @router.get("/", response_model=list[PostSchema])
+@conditional(_posts_list_validators)
 async def read_posts(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    skip: int = 0,
-    limit: int = 10,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=settings.MAX_PAGE_SIZE),
+    sort: str = Query("newest", pattern="^(newest|oldest|popular)$"),
+    after: Optional[str] = Query(None, description="上一页响应 X-Next-Cursor 中的游标"),
+    before: Optional[str] = Query(None, description="上一页响应 X-Prev-Cursor 中的游标"),
     published: Optional[bool] = True,
     category_id: Optional[int] = None,
     tag_name: Optional[str] = None,
     search: Optional[str] = None,
 ) -> Any:
+    """文章列表：用 after / before 游标翻页（skip 仍可用，但深翻页会越来越慢）"""
     query = select(Post).options(
         selectinload(Post.author),
         selectinload(Post.category),
@@ -142,8 +146,33 @@ async def read_posts(
         search_term = f"%{search}%"
         query = query.where(Post.title.ilike(search_term) | Post.content.ilike(search_term) | Post.summary.ilike(search_term))
 
-    result = await db.execute(query.offset(skip).limit(limit))
-    return result.scalars().unique().all()
+    keys, descending = post_sort_keys(sort, published)
+    try:
+        page = await crud_post.paginate(
+            db,
+            sort_posts_query(query, sort),
+            keys=keys,
+            descending=descending,
+            limit=limit,
+            after=after,
+            before=before,
+            offset=skip,
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="分页游标无效")
+    await post_views.merge(page.items)
+
+    links = []
+    base_url = request.url.remove_query_params(["skip", "after", "before"])
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+        links.append(f'<{base_url.include_query_params(after=page.next_cursor)}>; rel="next"')
+    if page.prev_cursor:
+        response.headers["X-Prev-Cursor"] = page.prev_cursor
+        links.append(f'<{base_url.include_query_params(before=page.prev_cursor)}>; rel="prev"')
+    if links:
+        response.headers["Link"] = ", ".join(links)
+    return page.items
 
 
 @router.get("/{slug}", response_model=PostDetail)
@@ -154,12 +183,8 @@ async def read_post(
     current_user: User | None = Depends(get_current_user_optional),
 ) -> Any:
     result = await db.execute(
-        select(Post)
+        with_counters(select(Post))
         .options(
-            selectinload(Post.comments).selectinload(Comment.author),
-            selectinload(Post.comments).selectinload(Comment.likes),
-            selectinload(Post.comments).selectinload(Comment.replies).selectinload(Comment.author),
-            selectinload(Post.comments).selectinload(Comment.replies).selectinload(Comment.likes),
             selectinload(Post.tags),
             selectinload(Post.category),
             selectinload(Post.author),
@@ -171,16 +196,21 @@ async def read_post(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文章不存在")
     if not post.published:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="该文章尚未发布")
-    visible_comments = [comment for comment in post.comments if comment.parent_id is None and comment.moderation_status == COMMENT_STATUS_APPROVED]
-    for comment in visible_comments:
-        comment.replies = [reply for reply in comment.replies if reply.moderation_status == COMMENT_STATUS_APPROVED]
-    post.comments = visible_comments
+    await post_views.merge([post])
+    thread = await comment_tree.load(db, post_id=post.id)
+    is_liked = False
     if current_user:
         like_result = await db.execute(
             select(PostLike.id).where(PostLike.user_id == current_user.id, PostLike.post_id == post.id)
         )
-        post.is_liked_by_current_user = like_result.scalar_one_or_none() is not None
-    return post
+        is_liked = like_result.scalar_one_or_none() is not None
+        await comment_tree.mark_liked(db, thread, current_user.id)
+    return PostDetail(
+        **PostSchema.model_validate(post).model_dump(),
+        comments=thread.comments,
+        comments_cursor=thread.next_cursor,
+        is_liked_by_current_user=is_liked,
+    )
 
 
 @router.post("/", response_model=PostSchema)
@@ -190,10 +220,8 @@ async def create_post(
     post_in: PostCreate,
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    slug = await _build_unique_post_slug(db, post_in.title, post_in.slug)
     post = Post(
         title=post_in.title,
-        slug=slug,
         summary=post_in.summary,
         content=post_in.content,
         featured_image=post_in.featured_image,
@@ -207,13 +235,14 @@ async def create_post(
         meta_keywords=post_in.meta_keywords,
         author_id=current_user.id,
     )
-    db.add(post)
-    await db.flush()
+    await post_slug.assign(db, post, post_in.title, requested=post_in.slug)
     set_committed_value(post, "tags", [])
-    post.tags.extend(await _resolve_tags(db, post_in.tags))
+    post.tags.extend(await crud_tag.resolve(db, post_in.tags))
     current_user.post_count += 1
     await db.commit()
-    return await _load_post(db, post.id)
+    post = await _load_post(db, post.id)
+    await invalidate_tags(*_post_cache_tags(post))
+    return post
 
 
 @router.post("/preview-markdown")
@@ -277,6 +306,7 @@ async def update_post(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文章不存在")
     if post.author_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="没有权限修改此文章")
+    previous_tags = _post_cache_tags(post)
 
     update_data = post_in.model_dump(exclude_unset=True)
     if "slug" in update_data and update_data["slug"] and update_data["slug"] != post.slug:
@@ -285,7 +315,7 @@ async def update_post(
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该 slug 已被使用")
         post.slug = update_data.pop("slug")
     elif "title" in update_data and "slug" not in update_data:
-        post.slug = await _build_unique_post_slug(db, update_data["title"])
+        await post_slug.assign(db, post, update_data["title"])
 
     for field in [
         "title",
@@ -307,10 +337,12 @@ async def update_post(
         post.published_at = datetime.utcnow()
 
     if post_in.tags is not None:
-        post.tags = await _resolve_tags(db, post_in.tags)
+        post.tags = await crud_tag.resolve(db, post_in.tags)
 
     await db.commit()
-    return await _load_post(db, post.id)
+    post = await _load_post(db, post.id)
+    await invalidate_tags(*previous_tags, *_post_cache_tags(post))
+    return post
 
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -320,11 +352,13 @@ async def delete_post(
     post_id: int,
     current_user: User = Depends(get_current_active_user),
 ) -> None:
-    post = await db.get(Post, post_id)
+    result = await db.execute(select(Post).options(selectinload(Post.tags)).where(Post.id == post_id))
+    post = result.scalars().first()
     if post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文章不存在")
     if post.author_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="没有权限删除此文章")
+    cache_tags = _post_cache_tags(post)
 
     author_comment_counts = await _get_post_comment_author_counts(db, post_id)
     await db.delete(post)
@@ -334,6 +368,7 @@ async def delete_post(
         if author:
             author.comment_count = max(0, author.comment_count - count)
     await db.commit()
+    await invalidate_tags(*cache_tags)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -371,16 +406,16 @@ async def create_comment(
     db.add(comment)
     current_user.comment_count += 1
     await db.flush()
-    await _refresh_post_comment_count(db, post_id)
+    count_changed = await _refresh_post_comment_count(db, post_id)
     await db.commit()
+    # 可见评论数变了时，显示 comment_count 的列表页（posts 标签）也要清除
+    await invalidate_tags(f"post:{post_id}", "sidebar", *(["posts"] if count_changed else []))
 
     result = await db.execute(
         select(Comment)
         .options(
             selectinload(Comment.author),
-            selectinload(Comment.likes),
             selectinload(Comment.replies).selectinload(Comment.author),
-            selectinload(Comment.replies).selectinload(Comment.likes),
         )
         .where(Comment.id == comment.id)
     )
@@ -394,19 +429,12 @@ async def like_post(
     post_id: int,
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    post = await db.get(Post, post_id)
-    if post is None:
+    result = await post_like.like(db, user_id=current_user.id, post_id=post_id)
+    if result.like_count is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文章不存在")
-
-    result = await db.execute(
-        select(PostLike).where(PostLike.user_id == current_user.id, PostLike.post_id == post_id)
-    )
-    existing = result.scalars().first()
-    if existing is None:
-        db.add(PostLike(user_id=current_user.id, post_id=post_id))
-        post.like_count += 1
-        await db.commit()
-    return {"detail": "文章点赞成功", "like_count": post.like_count, "liked": True}
+    if result.changed:
+        await invalidate_tags(f"post:{post_id}")
+    return {"detail": "文章点赞成功", "like_count": result.like_count, "liked": True}
 
 
 @router.delete("/{post_id}/like")
@@ -416,16 +444,9 @@ async def unlike_post(
     post_id: int,
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    result = await db.execute(
-        select(PostLike).where(PostLike.user_id == current_user.id, PostLike.post_id == post_id)
-    )
-    like = result.scalars().first()
-    if like is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="尚未点赞该文章")
-
-    post = await db.get(Post, post_id)
-    if post:
-        post.like_count = max(0, post.like_count - 1)
-    await db.delete(like)
-    await db.commit()
-    return {"detail": "已取消点赞", "like_count": post.like_count if post else 0, "liked": False}
+    result = await post_like.unlike(db, user_id=current_user.id, post_id=post_id)
+    if result.like_count is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文章不存在")
+    if result.changed:
+        await invalidate_tags(f"post:{post_id}")
+    return {"detail": "已取消点赞", "like_count": result.like_count, "liked": False}
@@ -4,32 +4,33 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.api.v1.dependencies import get_current_active_user, get_current_superuser
-from app.core.cache import cache_key_wrapper, invalidate_cache_pattern
+from app.core.cache import cache_key_wrapper, invalidate_tags
+from app.core.conditional import Validators, conditional, fetch_validators, table_version
 from app.core.database import get_db
+from app.crud.slugs import tag_slug
 from app.models.post import Post
 from app.models.tag import Tag, post_tag
 from app.models.user import User
 from app.schemas.tag import Tag as TagSchema, TagCloud, TagCreate, TagDetail, TagUpdate
-from app.utils.slug import generate_slug
 
 
 router = APIRouter()
 
 
-async def _build_unique_tag_slug(db: AsyncSession, name: str) -> str:
-    base_slug = generate_slug(name, max_length=255)
-    slug = base_slug
-    suffix = 1
-    while True:
-        result = await db.execute(select(Tag.id).where(Tag.slug == slug))
-        if result.scalar_one_or_none() is None:
-            return slug
-        slug = f"{base_slug}-{suffix}"
-        suffix += 1
+async def _tags_validators(db: AsyncSession) -> Validators:
+    """标签列表版本：标签表、已发布文章与文章-标签关联的版本（决定 post_count）"""
+    return await fetch_validators(
+        db,
+        *table_version(Tag),
+        *table_version(Post, Post.published == True),
+        select(func.count()).select_from(post_tag).scalar_subquery(),
+    )
 
 
 @router.get("/", response_model=list[TagDetail])
-@cache_key_wrapper("tags:list", expire=3600)
+@conditional(_tags_validators)
+@cache_key_wrapper("tags:list", expire=3600, vary_on=("skip", "limit", "search", "order_by"),
+                   stale_ttl=600, stale_if_error=True, tags=("tags",))
 async def read_tags(
     db: AsyncSession = Depends(get_db),
     skip: int = Query(0, ge=0),
@@ -69,7 +70,9 @@ async def read_tags(
 
 
 @router.get("/cloud", response_model=TagCloud)
-@cache_key_wrapper("tags:cloud", expire=1800)
+@conditional(_tags_validators)
+@cache_key_wrapper("tags:cloud", expire=1800, vary_on=("limit",), stale_ttl=600, stale_if_error=True,
+                   tags=("tags",))
 async def get_tag_cloud(
     db: AsyncSession = Depends(get_db),
     limit: int = Query(50, le=100, description="返回的标签数量"),
@@ -98,7 +101,7 @@ async def get_tag_cloud(
 
 
 @router.get("/{tag_id}", response_model=TagDetail)
-@cache_key_wrapper("tags:detail", expire=1800)
+@cache_key_wrapper("tags:detail", expire=1800, vary_on=("tag_id",), tags=("tag:{tag_id}",))
 async def read_tag(tag_id: int, db: AsyncSession = Depends(get_db)) -> TagDetail:
     tag = await db.get(Tag, tag_id)
     if tag is None:
@@ -164,11 +167,11 @@ async def create_tag(
     if result.scalars().first():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该标签已存在")
 
-    tag = Tag(name=tag_in.name, slug=await _build_unique_tag_slug(db, tag_in.name))
-    db.add(tag)
+    tag = Tag(name=tag_in.name)
+    await tag_slug.assign(db, tag, tag_in.name)
     await db.commit()
     await db.refresh(tag)
-    await invalidate_cache_pattern("tags:*")
+    await invalidate_tags("tags", "sidebar")
     return tag
 
 
@@ -190,10 +193,9 @@ async def update_tag(
         if result.scalars().first():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该标签名已存在")
         tag.name = tag_in.name
-        tag.slug = await _build_unique_tag_slug(db, tag_in.name)
+        await tag_slug.assign(db, tag, tag_in.name)
 
     await db.commit()
     await db.refresh(tag)
-    await invalidate_cache_pattern("tags:*")
-    await invalidate_cache_pattern("posts:*")
+    await invalidate_tags("tags", f"tag:{tag.id}", "posts", "sidebar")
     return tag
@@ -2,11 +2,14 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.dependencies import get_current_active_user, get_current_superuser
+from app.core.cache import invalidate_tags
 from app.core.database import get_db
 from app.core.security import get_password_hash
+from app.crud.existence import emails, usernames
 from app.models.user import User
 from app.schemas.user import User as UserSchema, UserUpdate
 
@@ -38,15 +41,17 @@ async def update_user_me(
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     if user_in.username is not None and user_in.username != current_user.username:
-        result = await db.execute(select(User).where(User.username == user_in.username))
-        if result.scalars().first():
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该用户名已被使用")
+        if usernames.might_contain(user_in.username):
+            result = await db.execute(select(User).where(User.username == user_in.username))
+            if result.scalars().first():
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该用户名已被使用")
         current_user.username = user_in.username
 
     if user_in.email is not None and user_in.email != current_user.email:
-        result = await db.execute(select(User).where(User.email == user_in.email))
-        if result.scalars().first():
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该邮箱已被注册")
+        if emails.might_contain(user_in.email):
+            result = await db.execute(select(User).where(User.email == user_in.email))
+            if result.scalars().first():
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该邮箱已被注册")
         current_user.email = user_in.email
 
     for field in ["full_name", "bio", "avatar_url", "website", "location"]:
@@ -57,8 +62,13 @@ async def update_user_me(
     if user_in.password:
         current_user.hashed_password = get_password_hash(user_in.password)
 
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="该邮箱或用户名已被使用")
     await db.refresh(current_user)
+    await invalidate_tags(f"user:{current_user.id}", "posts")
     return current_user
 
 
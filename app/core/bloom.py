@@ -0,0 +1,257 @@
+# app/core/bloom.py - 进程内 Bloom 过滤器（slug / 用户名 / 邮箱的存在性预判）
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache_manager, on_message, on_resubscribe, publish_message
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.tasks import cancel_task
+
+logger = logging.getLogger(__name__)
+
+_BROADCAST_OP = "bloom"
+
+
+class BloomFilter:
+    """按容量和目标误判率确定位数组大小与哈希次数的 Bloom 过滤器"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str) -> Iterable[int]:
+        # 双重哈希：h1 + i * h2
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def fill_ratio(self) -> float:
+        return sum(bin(byte).count("1") for byte in self.bits) / self.size
+
+    def estimated_false_positive_rate(self) -> float:
+        return self.fill_ratio() ** self.hashes
+
+
+def _channel_trusted() -> bool:
+    """其他 worker 的新增值通过失效频道同步；频道断开时过滤器可能漏掉新值"""
+    return not settings.CACHE_REDIS_ENABLED or cache_manager.listener_connected
+
+
+_filters: dict[str, "ExistenceFilter"] = {}
+
+
+class ExistenceFilter:
+    """
+    某一列取值的存在性预过滤
+
+    might_contain 为 False 时该值一定不存在，可以不查数据库直接返回 404 /「可用」；
+    为 True 时仍需查询。启动时和每 BLOOM_REBUILD_INTERVAL 秒从数据库重建（顺带清除
+    已删除的值），ORM flush 时自动加入新值并广播给其他 worker。过滤器尚未构建或
+    广播频道断开时一律返回 True
+    """
+
+    def __init__(
+            self,
+            name: str,
+            column,
+            fallback: Optional[tuple] = None,
+            normalize: Callable[[str], str] = str,
+    ):
+        self.name = name
+        self.column = column
+        # (来源列, 函数)：来源行的本列为空时，用函数计算出将来会生成的值（如按名称生成的 slug）
+        self.fallback = fallback
+        self.normalize = normalize
+        self._filter: Optional[BloomFilter] = None
+        self._pending: Optional[list[str]] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self.checks = 0
+        self.definite_misses = 0
+        self.false_positives = 0
+        self.rebuilds = 0
+        self.built_at: Optional[float] = None
+        self.build_seconds: Optional[float] = None
+        _filters[name] = self
+
+    @property
+    def model(self):
+        return self.column.class_
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None and _channel_trusted()
+
+    def might_contain(self, value: Optional[str], record: bool = True) -> bool:
+        if not value or not self.ready:
+            return True
+        present = self.normalize(value) in self._filter
+        if record:
+            self.checks += 1
+            if not present:
+                self.definite_misses += 1
+        return present
+
+    def record_false_positive(self) -> None:
+        """might_contain 返回 True 但数据库中不存在时调用，用于统计实际误判率"""
+        if self.ready:
+            self.false_positives += 1
+
+    def add(self, value: Optional[str]) -> None:
+        if not value:
+            return
+        value = self.normalize(value)
+        if self._pending is not None:
+            self._pending.append(value)
+        if self._filter is not None:
+            self._filter.add(value)
+
+    async def _load_values(self) -> list[str]:
+        columns = [self.column] + ([self.fallback[0]] if self.fallback else [])
+        async with async_session() as db:
+            rows = (await db.execute(select(*columns))).all()
+        values = []
+        for row in rows:
+            if row[0]:
+                values.append(row[0])
+            elif self.fallback and row[1]:
+                values.append(self.fallback[1](row[1]))
+        return values
+
+    async def rebuild(self) -> int:
+        """从数据库重建；重建期间新加入的值会补到新过滤器中"""
+        started = time.perf_counter()
+        self._pending = []
+        try:
+            values = await self._load_values()
+            bloom = BloomFilter(
+                max(len(values) * 2, settings.BLOOM_MIN_CAPACITY),
+                settings.BLOOM_FALSE_POSITIVE_RATE,
+            )
+            for value in values:
+                bloom.add(self.normalize(value))
+            for value in self._pending:
+                bloom.add(value)
+        finally:
+            self._pending = None
+        self._filter = bloom
+        self.rebuilds += 1
+        self.built_at = time.time()
+        self.build_seconds = round(time.perf_counter() - started, 4)
+        logger.info(f"Bloom filter {self.name} rebuilt with {len(values)} values in {self.build_seconds * 1000:.0f}ms")
+        return len(values)
+
+    def schedule_rebuild(self) -> None:
+        if self._rebuild_task is None or self._rebuild_task.done():
+            self._rebuild_task = asyncio.create_task(self._safe_rebuild())
+
+    async def _safe_rebuild(self) -> None:
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.warning(f"Bloom filter {self.name} rebuild failed: {e}")
+
+    def stats(self) -> dict:
+        bloom = self._filter
+        # 实际误判率 = 误判 / (误判 + 确定不存在)，即不存在的值中被误判为可能存在的比例
+        absent = self.false_positives + self.definite_misses
+        return {
+            "name": self.name,
+            "ready": self.ready,
+            "entries": bloom.count if bloom else 0,
+            "bits": bloom.size if bloom else 0,
+            "hashes": bloom.hashes if bloom else 0,
+            "fill_ratio": round(bloom.fill_ratio(), 4) if bloom else 0.0,
+            "estimated_false_positive_rate": round(bloom.estimated_false_positive_rate(), 6) if bloom else None,
+            "checks": self.checks,
+            "definite_misses": self.definite_misses,
+            "false_positives": self.false_positives,
+            "observed_false_positive_rate": round(self.false_positives / absent, 6) if absent else None,
+            "rebuilds": self.rebuilds,
+            "built_at": self.built_at,
+            "build_seconds": self.build_seconds,
+        }
+
+
+def filter_stats() -> list[dict]:
+    return [existence_filter.stats() for existence_filter in _filters.values()]
+
+
+def _apply_broadcast(message: dict) -> None:
+    for name, values in (message.get("values") or {}).items():
+        existence_filter = _filters.get(name)
+        if existence_filter is not None:
+            for value in values:
+                existence_filter.add(value)
+
+
+def _rebuild_all() -> None:
+    for existence_filter in _filters.values():
+        existence_filter.schedule_rebuild()
+
+
+on_message(_BROADCAST_OP, _apply_broadcast)
+# 断线期间可能错过了其他 worker 的新增值
+on_resubscribe(_rebuild_all)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_values(session: Session, _flush_context) -> None:
+    """flush 后把新增或修改后的值加入过滤器（回滚只会多出一次无害的误判）"""
+    added: dict[str, list[str]] = {}
+    for instance in list(session.new) + list(session.dirty):
+        for existence_filter in _filters.values():
+            if isinstance(instance, existence_filter.model):
+                value = getattr(instance, existence_filter.column.key, None)
+                if value:
+                    existence_filter.add(value)
+                    added.setdefault(existence_filter.name, []).append(existence_filter.normalize(value))
+    if not added:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    loop.create_task(publish_message(_BROADCAST_OP, values=added))
+
+
+class BloomRefresher:
+    """启动时构建所有过滤器，之后定期重建"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def _loop(self):
+        while True:
+            for existence_filter in list(_filters.values()):
+                await existence_filter._safe_rebuild()
+            await asyncio.sleep(settings.BLOOM_REBUILD_INTERVAL)
+
+    async def start(self):
+        if settings.BLOOM_FILTER_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        await cancel_task(self._task)
+        self._task = None
+
+
+bloom_refresher = BloomRefresher()
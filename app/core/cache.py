@@ -1,56 +1,732 @@
-# app/core/cache.py - 简化版本以解决导入问题
+# app/core/cache.py
+import asyncio
+import inspect
 import json
 import hashlib
+import os
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
 from functools import wraps
-from typing import Optional, Callable, Any
+from typing import Optional, Callable, Any, Awaitable, Sequence, Set, Union
 import logging
 
+from fastapi import BackgroundTasks
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.requests import HTTPConnection
+from starlette.responses import Response
+
+from app.core import codecs
 from app.core.config import settings
+from app.core.database import async_session
+from app.core.memory_cache import CacheEntry, MemoryCache
+from app.core.tasks import cancel_task
+
+try:
+    from app.core.redis import get_redis_connection
+except ModuleNotFoundError:  # 未安装 redis 时只使用进程内缓存
+    get_redis_connection = None
 
 logger = logging.getLogger(__name__)
 
-# 简单的内存缓存（用于开发环境）
-_memory_cache = {}
+_DIGEST_SUFFIX = re.compile(r":[0-9a-f]{20}$")
+
+
+def key_prefix(key: str) -> str:
+    """缓存键去掉参数哈希后的前缀，如 ``tags:list:ab12...`` -> ``tags:list``"""
+    return _DIGEST_SUFFIX.sub("", key)
+
+
+@dataclass
+class PrefixStats:
+    """按键前缀统计的缓存指标（本进程）"""
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    recomputes: int = 0
+    errors: int = 0
+    recompute_seconds: float = 0.0
+    recompute_max_seconds: float = 0.0
+    evictions: int = 0
+
+
+_prefix_stats: dict[str, PrefixStats] = {}
+
+
+def _stats_for(key: str) -> PrefixStats:
+    prefix = key_prefix(key)
+    stats = _prefix_stats.get(prefix)
+    if stats is None:
+        stats = _prefix_stats[prefix] = PrefixStats()
+    return stats
+
+
+def _record_eviction(key: str, entry: CacheEntry) -> None:
+    _stats_for(key).evictions += 1
+
+
+# 进程内缓存（L1）：带 TTL 与 LRU 淘汰，容量由配置限制
+_memory_cache = MemoryCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    on_evict=_record_eviction,
+)
+
+# 当前进程标识，用于忽略自己发出的失效广播
+_instance_id = uuid.uuid4().hex
+
+
+# 由 FastAPI 注入的依赖对象，不参与缓存键计算
+_DEPENDENCY_TYPES = (AsyncSession, Session, HTTPConnection, Response, BackgroundTasks)
+_SKIP = object()
+
+
+def _canonical_value(value: Any) -> Any:
+    """把查询/路径参数转换成可稳定序列化的形式，非参数对象返回 _SKIP"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Enum):
+        return _canonical_value(value.value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_canonical_value(item) for item in value]
+        if any(item is _SKIP for item in items):
+            return _SKIP
+        return sorted(items, key=str) if isinstance(value, (set, frozenset)) else items
+    return _SKIP
 
 
 def generate_cache_key(prefix: str, *args, **kwargs) -> str:
-    """生成缓存键"""
-    key_parts = [prefix]
+    """
+    生成缓存键：只对查询/路径参数做规范化哈希
+
+    数据库会话、请求/响应对象、ORM 实例等依赖注入的参数会被忽略，
+    None 值不参与计算，因此同一组参数无论如何传入都得到相同的键
+    """
+    params: dict[str, Any] = {}
+    for index, arg in enumerate(args):
+        params[f"_{index}"] = arg
+    params.update(kwargs)
+
+    canonical = {}
+    for name, value in params.items():
+        if value is None or isinstance(value, _DEPENDENCY_TYPES):
+            continue
+        normalized = _canonical_value(value)
+        if normalized is not _SKIP:
+            canonical[name] = normalized
+
+    if not canonical:
+        return prefix
+
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    digest = hashlib.sha1(payload.encode()).hexdigest()[:20]
+    return f"{prefix}:{digest}"
+
+
+def build_route_cache_key(
+        prefix: str,
+        signature: inspect.Signature,
+        args: tuple,
+        kwargs: dict,
+        vary_on: Optional[Sequence[str]] = None,
+        vary_on_user: bool = False,
+        user_param: str = "current_user",
+) -> str:
+    """
+    根据被装饰函数的签名生成缓存键
+
+    vary_on 声明哪些参数影响缓存结果（默认所有查询/路径参数）；
+    vary_on_user=True 时按 user_param 指定参数中的用户 ID 区分缓存，匿名用户记为 anon
+    """
+    bound = signature.bind_partial(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+    user = arguments.pop(user_param, None)
+
+    if vary_on is not None:
+        arguments = {name: arguments.get(name) for name in vary_on}
+
+    if vary_on_user:
+        arguments["__user__"] = getattr(user, "id", None) or "anon"
+
+    return generate_cache_key(prefix, **arguments)
+
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCacheTier:
+    """Redis 二级缓存（L2），Redis 不可用时自动熔断，退化为仅使用 L1"""
+
+    # 与缓存值共用前缀的内部键：标签索引、统计快照、重算锁 / 租约，按模式删除缓存值时跳过
+    INTERNAL_NAMESPACES = ("tag:", "stats:", "lock:")
+
+    def __init__(self, key_prefix: str, channel: str, retry_after: int):
+        self.key_prefix = key_prefix
+        self.channel = channel
+        self.retry_after = retry_after
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return (
+            settings.CACHE_REDIS_ENABLED
+            and get_redis_connection is not None
+            and time.monotonic() >= self._down_until
+        )
+
+    def mark_down(self, error: Exception) -> None:
+        if time.monotonic() >= self._down_until:
+            logger.warning(f"Redis cache tier unavailable, falling back to memory cache: {error}")
+        self._down_until = time.monotonic() + self.retry_after
+
+    def redis_key(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+
+    @staticmethod
+    def _load_envelope(raw: Optional[bytes]) -> Optional[dict]:
+        if raw is None:
+            return None
+        try:
+            return codecs.decode(raw)
+        except codecs.CodecError as e:
+            logger.warning(f"Discarding undecodable cache value: {e}")
+            return None
+
+    async def get(self, key: str) -> Optional[dict]:
+        """读取缓存信封 ``{"v": 值, "e": 过期时间戳}``，未命中或异常时返回 None"""
+        if not self.available:
+            return None
+        try:
+            r = await get_redis_connection()
+            raw = await r.get(self.redis_key(key))
+        except Exception as e:
+            self.mark_down(e)
+            return None
+        return self._load_envelope(raw)
 
-    # 处理位置参数
-    for arg in args:
-        if hasattr(arg, 'id'):
-            key_parts.append(f"{type(arg).__name__}:{arg.id}")
+    async def get_many(self, keys: Sequence[str]) -> dict[str, dict]:
+        """用一次 MGET 读取多个缓存信封，只返回命中的键"""
+        if not keys or not self.available:
+            return {}
+        try:
+            r = await get_redis_connection()
+            values = await r.mget([self.redis_key(key) for key in keys])
+        except Exception as e:
+            self.mark_down(e)
+            return {}
+        envelopes = {}
+        for key, raw in zip(keys, values):
+            envelope = self._load_envelope(raw)
+            if envelope is not None:
+                envelopes[key] = envelope
+        return envelopes
+
+    async def set(self, key: str, envelope: dict, ttl: Optional[int], tags: Sequence[str] = ()) -> bool:
+        """
+        在一个 pipeline 中写入信封、登记依赖标签并广播失效消息
+
+        标签索引集合的过期时间不短于其中任何一个键
+        """
+        if not self.available:
+            return False
+        try:
+            payload = codecs.encode(envelope)
+        except codecs.CodecError as e:
+            logger.debug(f"Value for {key} is not serializable, keeping it in memory only: {e}")
+            return False
+        ex = ttl if ttl and ttl > 0 else None
+        try:
+            r = await get_redis_connection()
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.set(self.redis_key(key), payload, ex=ex)
+                for tag in tags:
+                    pipe.sadd(self.tag_key(tag), key)
+                    if ex:
+                        pipe.expire(self.tag_key(tag), ex, nx=True)
+                        pipe.expire(self.tag_key(tag), ex, gt=True)
+                pipe.publish(self.channel, self._message({"op": "delete", "keys": [key]}))
+                await pipe.execute()
+            return True
+        except Exception as e:
+            self.mark_down(e)
+            return False
+
+    async def delete(self, *keys: str) -> None:
+        if not keys or not self.available:
+            return
+        try:
+            r = await get_redis_connection()
+            await r.delete(*(self.redis_key(key) for key in keys))
+        except Exception as e:
+            self.mark_down(e)
+
+    async def delete_pattern(self, pattern: str) -> None:
+        if not self.available:
+            return
+        try:
+            r = await get_redis_connection()
+            cursor = 0
+            while True:
+                cursor, keys = await r.scan(cursor=cursor, match=self.redis_key(pattern), count=500)
+                keys = [key for key in keys if self.is_value_key(key)]
+                if keys:
+                    await r.delete(*keys)
+                if cursor == 0:
+                    break
+        except Exception as e:
+            self.mark_down(e)
+
+    def is_value_key(self, redis_key: Union[str, bytes]) -> bool:
+        if isinstance(redis_key, bytes):
+            redis_key = redis_key.decode()
+        return not redis_key[len(self.key_prefix):].startswith(self.INTERNAL_NAMESPACES)
+
+    def tag_key(self, tag: str) -> str:
+        return f"{self.key_prefix}tag:{tag}"
+
+    async def pop_tags(self, tags: Sequence[str]) -> Set[str]:
+        """取出并删除标签索引，返回其中登记的缓存键（一次往返）"""
+        if not tags or not self.available:
+            return set()
+        keys: Set[str] = set()
+        try:
+            r = await get_redis_connection()
+            async with r.pipeline(transaction=True) as pipe:
+                for tag in tags:
+                    pipe.smembers(self.tag_key(tag))
+                pipe.delete(*(self.tag_key(tag) for tag in tags))
+                results = await pipe.execute()
+        except Exception as e:
+            self.mark_down(e)
+            return keys
+        for members in results[:-1]:
+            keys.update(m.decode() if isinstance(m, bytes) else m for m in members)
+        return keys
+
+    @property
+    def stats_workers_key(self) -> str:
+        return f"{self.key_prefix}stats:workers"
+
+    def stats_key(self, instance_id: str) -> str:
+        return f"{self.key_prefix}stats:{instance_id}"
+
+    async def report_stats(self, snapshot: dict, ttl: int) -> None:
+        """上报本进程的统计快照，过期未刷新的 worker 会在汇总时被剔除"""
+        if not self.available:
+            return
+        try:
+            r = await get_redis_connection()
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.set(self.stats_key(snapshot["instance"]), json.dumps(snapshot), ex=ttl)
+                pipe.zadd(self.stats_workers_key, {snapshot["instance"]: time.time()})
+                await pipe.execute()
+        except Exception as e:
+            self.mark_down(e)
+
+    async def collect_stats(self, max_age: int) -> list[dict]:
+        """读取所有存活 worker 的统计快照"""
+        if not self.available:
+            return []
+        try:
+            r = await get_redis_connection()
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.zremrangebyscore(self.stats_workers_key, 0, time.time() - max_age)
+                pipe.zrange(self.stats_workers_key, 0, -1)
+                _, instances = await pipe.execute()
+            instances = [i.decode() if isinstance(i, bytes) else i for i in instances]
+            raw = await r.mget([self.stats_key(i) for i in instances]) if instances else []
+        except Exception as e:
+            self.mark_down(e)
+            return []
+        return [snapshot for snapshot in map(self._load_envelope, raw) if snapshot is not None]
+
+    async def ttls(self, keys: Sequence[str]) -> dict[str, Optional[int]]:
+        """查询 L2 中各键的剩余秒数：None 表示不存在，-1 表示不过期"""
+        if not keys or not self.available:
+            return {}
+        try:
+            r = await get_redis_connection()
+            async with r.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.ttl(self.redis_key(key))
+                results = await pipe.execute()
+        except Exception as e:
+            self.mark_down(e)
+            return {}
+        return {key: None if ttl == -2 else ttl for key, ttl in zip(keys, results)}
+
+    def lock_key(self, key: str) -> str:
+        return f"{self.key_prefix}lock:{key}"
+
+    async def acquire_lock(self, key: str, token: str, timeout: float) -> Optional[bool]:
+        """尝试获取重算锁（SET NX PX），Redis 不可用时返回 None"""
+        if not self.available:
+            return None
+        try:
+            r = await get_redis_connection()
+            acquired = await r.set(self.lock_key(key), token, nx=True, px=max(1, int(timeout * 1000)))
+            return bool(acquired)
+        except Exception as e:
+            self.mark_down(e)
+            return None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        """只释放自己持有的锁，锁已超时被他人获取时不做处理"""
+        if not self.available:
+            return
+        try:
+            r = await get_redis_connection()
+            await r.eval(_RELEASE_LOCK_SCRIPT, 1, self.lock_key(key), token)
+        except Exception as e:
+            self.mark_down(e)
+
+    async def lock_exists(self, key: str) -> bool:
+        if not self.available:
+            return False
+        try:
+            r = await get_redis_connection()
+            return bool(await r.exists(self.lock_key(key)))
+        except Exception as e:
+            self.mark_down(e)
+            return False
+
+    def _message(self, message: dict) -> str:
+        return json.dumps({**message, "origin": _instance_id})
+
+    async def publish(self, message: dict) -> None:
+        if not self.available:
+            return
+        try:
+            r = await get_redis_connection()
+            await r.publish(self.channel, self._message(message))
+        except Exception as e:
+            self.mark_down(e)
+
+
+_redis_tier = RedisCacheTier(
+    key_prefix=settings.CACHE_KEY_PREFIX,
+    channel=settings.CACHE_INVALIDATION_CHANNEL,
+    retry_after=settings.CACHE_REDIS_RETRY_SECONDS,
+)
+
+
+# 依赖标签 -> 缓存键 的进程内反向索引（只覆盖本进程 L1 中的键）
+_tag_index: dict[str, set[str]] = {}
+
+
+def _index_tags(key: str, tags: Optional[Sequence[str]]) -> None:
+    for tag in tags or ():
+        keys = _tag_index.setdefault(tag, set())
+        keys.add(key)
+        # 已被 LRU 淘汰或过期的键不会再被失效，索引过大时顺带清理
+        if len(keys) > _memory_cache.max_entries:
+            keys.intersection_update(_memory_cache.keys())
+
+
+def _drop_local_tags(tags: Sequence[str]) -> set[str]:
+    keys: set[str] = set()
+    for tag in tags:
+        keys.update(_tag_index.pop(tag, ()))
+    _memory_cache.delete_many(keys)
+    return keys
+
+
+def _clear_local() -> None:
+    _memory_cache.clear()
+    _tag_index.clear()
+
+
+# 单飞（single-flight）：同一个键同时未命中时只计算一次
+_inflight: dict[str, asyncio.Task] = {}
+_single_flight_stats = {
+    "leaders": 0,
+    "coalesced_local": 0,
+    "coalesced_remote": 0,
+    "lock_timeouts": 0,
+}
+
+
+def single_flight_stats() -> dict[str, int]:
+    """单飞统计：leaders 为实际执行计算的次数，coalesced_* 为被合并的等待者数量"""
+    return {**_single_flight_stats, "inflight": len(_inflight)}
+
+
+def _backfill(key: str, envelope: Optional[dict]) -> Optional[CacheEntry]:
+    """把 L2 信封写回 L1，软过期时间 ``f``/``s`` 为墙钟时间戳"""
+    if envelope is None:
+        return None
+    now = time.time()
+    expires_at = envelope.get("e")
+    ttl = None if expires_at is None else expires_at - now
+    if ttl is not None and ttl <= 0:
+        return None
+    fresh_until, stale_until = envelope.get("f"), envelope.get("s")
+    _index_tags(key, envelope.get("t"))
+    _memory_cache.set(
+        key,
+        envelope.get("v"),
+        ttl=ttl,
+        fresh_for=None if fresh_until is None else fresh_until - now,
+        stale_for=None if stale_until is None else stale_until - now,
+    )
+    return _memory_cache.get_entry(key, touch=False)
+
+
+async def cache_lookup(key: str) -> tuple[bool, Any, str]:
+    """依次查询 L1、L2；返回 (是否命中, 值, 新鲜度)，新鲜度见 CacheEntry.freshness"""
+    entry = _memory_cache.get_entry(key)
+    if entry is None:
+        entry = _backfill(key, await _redis_tier.get(key))
+    if entry is None:
+        return False, None, "missing"
+    return True, entry.value, entry.freshness(time.monotonic())
+
+
+async def cache_get(key: str) -> tuple[bool, Any]:
+    """依次查询 L1、L2；L2 命中时回填 L1。返回 (是否命中, 值)"""
+    hit, value, _ = await cache_lookup(key)
+    return hit, value
+
+
+async def cache_get_many(keys: Sequence[str]) -> dict[str, Any]:
+    """批量读取：先查 L1，剩余的键用一次 MGET 从 L2 读取并回填。只返回命中的键"""
+    found = {}
+    missing = []
+    for key in keys:
+        entry = _memory_cache.get_entry(key)
+        if entry is None:
+            missing.append(key)
         else:
-            key_parts.append(str(arg))
+            found[key] = entry.value
+    for key, envelope in (await _redis_tier.get_many(missing)).items():
+        entry = _backfill(key, envelope)
+        if entry is not None:
+            found[key] = entry.value
+    return found
+
+
+async def cache_set(
+        key: str,
+        value: Any,
+        expire: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        error_ttl: Optional[int] = None,
+        tags: Sequence[str] = (),
+) -> None:
+    """
+    写入 L1 与 L2，并通知其他进程丢弃各自的旧 L1 副本
+
+    tags 为依赖标签（如 ``post:1``、``tag:3``、``sidebar``），供 invalidate_tags 精确失效
+
+    设置 stale_ttl / error_ttl 时 expire 变为软过期：过期后再保留
+    stale_ttl 秒供后台刷新期间返回，以及 error_ttl 秒供重算失败时兜底
+    """
+    ttl = settings.CACHE_TTL if expire is None else expire
+    now = time.time()
+    envelope = {"v": value}
+    fresh_for = stale_for = None
+    if stale_ttl or error_ttl:
+        fresh_for = ttl
+        stale_for = ttl + (stale_ttl or 0)
+        envelope["f"] = now + fresh_for
+        envelope["s"] = now + stale_for
+        ttl = stale_for + (error_ttl or 0)
+    envelope["e"] = now + ttl if ttl and ttl > 0 else None
+    if tags:
+        envelope["t"] = list(tags)
+
+    _index_tags(key, tags)
+    _memory_cache.set(key, value, ttl=ttl, fresh_for=fresh_for, stale_for=stale_for)
+    await _redis_tier.set(key, envelope, ttl, tags=tags)
+
+
+async def cache_delete(*keys: str) -> None:
+    for key in keys:
+        _memory_cache.delete(key)
+    await _redis_tier.delete(*keys)
+    await _redis_tier.publish({"op": "delete", "keys": list(keys)})
+
+
+async def _wait_for_remote_fill(key: str) -> tuple[bool, Any]:
+    """等待持锁的其他进程写入 L2；锁释放或超时仍未写入时返回未命中"""
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+        entry = _backfill(key, await _redis_tier.get(key))
+        if entry is not None:
+            return True, entry.value
+        if not await _redis_tier.lock_exists(key):
+            return False, None
+    _single_flight_stats["lock_timeouts"] += 1
+    return False, None
+
+
+async def _load_and_store(key: str, compute: Callable, expire: Optional[int], **store_options) -> Any:
+    """跨进程只让持有 Redis 锁的一方执行计算，其余进程等待其结果"""
+    token = uuid.uuid4().hex
+    acquired = await _redis_tier.acquire_lock(key, token, settings.CACHE_LOCK_TIMEOUT)
+    if acquired is False:
+        _single_flight_stats["coalesced_remote"] += 1
+        _stats_for(key).coalesced += 1
+        hit, value = await _wait_for_remote_fill(key)
+        if hit:
+            return value
+
+    stats = _stats_for(key)
+    started = time.perf_counter()
+    try:
+        _single_flight_stats["leaders"] += 1
+        stats.recomputes += 1
+        try:
+            result = await compute()
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.recompute_seconds += elapsed
+            stats.recompute_max_seconds = max(stats.recompute_max_seconds, elapsed)
+        if result is not None:
+            try:
+                await cache_set(key, result, expire, **store_options)
+                logger.debug(f"Cache set: {key}")
+            except Exception as e:
+                logger.error(f"Cache error: {e}")
+        return result
+    finally:
+        if acquired:
+            await _redis_tier.release_lock(key, token)
+
+
+async def _single_flight(key: str, load: Callable) -> Any:
+    """
+    进程内合并同一个键的并发未命中，等待者共享第一个请求的结果或异常
+
+    计算在独立任务中进行，领头请求被取消（如客户端断开）时计算照常完成，
+    等待者不会各自重算
+    """
+    task = _inflight.get(key)
+    if task is not None:
+        _single_flight_stats["coalesced_local"] += 1
+        _stats_for(key).coalesced += 1
+    else:
+        task = asyncio.create_task(load())
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _finish_flight(key, done))
+    return await asyncio.shield(task)
+
+
+def _finish_flight(key: str, task: asyncio.Task) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # 没有等待者时避免 "exception was never retrieved" 警告
+    if not task.cancelled():
+        task.exception()
+
+
+async def cache_get_or_set(key: str, compute: Callable[[], Awaitable[Any]], expire: Optional[int] = None, **store_options) -> Any:
+    """读取缓存，未命中时通过单飞只计算一次并写入（store_options 同 cache_set）"""
+    hit, value = await cache_get(key)
+    stats = _stats_for(key)
+    if hit:
+        stats.hits += 1
+        return value
+    stats.misses += 1
+    return await _single_flight(key, lambda: _load_and_store(key, compute, expire, **store_options))
+
+
+def _format_tags(templates: Sequence[str], signature: inspect.Signature, args: tuple, kwargs: dict) -> list[str]:
+    bound = signature.bind_partial(*args, **kwargs)
+    bound.apply_defaults()
+    return [template.format(**bound.arguments) for template in templates]
 
-    # 处理关键字参数
-    for k, v in sorted(kwargs.items()):
-        if v is not None:
-            key_parts.append(f"{k}:{v}")
 
-    # 生成哈希值以避免键过长
-    key_string = ":".join(key_parts)
-    if len(key_string) > 200:
-        key_hash = hashlib.md5(key_string.encode()).hexdigest()
-        return f"{prefix}:hash:{key_hash}"
+_refresh_tasks: dict[str, asyncio.Task] = {}
 
-    return key_string
+
+def _with_fresh_session(args: tuple, kwargs: dict, session: AsyncSession) -> tuple[tuple, dict]:
+    """后台刷新时请求的数据库会话已关闭，替换为新会话"""
+    args = tuple(session if isinstance(arg, AsyncSession) else arg for arg in args)
+    kwargs = {name: session if isinstance(value, AsyncSession) else value for name, value in kwargs.items()}
+    return args, kwargs
+
+
+async def _refresh(key: str, func: Callable, args: tuple, kwargs: dict, expire: int, store_options: dict) -> None:
+    try:
+        async with async_session() as session:
+            args, kwargs = _with_fresh_session(args, kwargs, session)
+            await _single_flight(
+                key,
+                lambda: _load_and_store(key, lambda: func(*args, **kwargs), expire, **store_options),
+            )
+    except Exception as e:
+        logger.warning(f"Background cache refresh failed for {key}: {e}")
+
+
+def _schedule_refresh(key: str, func: Callable, args: tuple, kwargs: dict, expire: int, store_options: dict) -> None:
+    """在事件循环上调度一次后台刷新，同一个键已有计算在进行时跳过"""
+    if key in _inflight or key in _refresh_tasks:
+        return
+    task = asyncio.create_task(_refresh(key, func, args, kwargs, expire, store_options))
+    _refresh_tasks[key] = task
+    task.add_done_callback(lambda _: _refresh_tasks.pop(key, None))
 
 
 def cache_key_wrapper(
         prefix: str,
         expire: int = None,
         key_func: Optional[Callable] = None,
-        condition: Optional[Callable] = None
+        condition: Optional[Callable] = None,
+        vary_on: Optional[Sequence[str]] = None,
+        vary_on_user: bool = False,
+        stale_ttl: Optional[int] = None,
+        stale_if_error: bool = False,
+        tags: Sequence[str] = (),
 ):
     """
-    缓存装饰器 - 简化版本
+    缓存装饰器
+
+    先查进程内 L1，再查 Redis L2，未命中时执行函数并写入两级缓存；
+    Redis 不可用时只使用 L1。结果按 expire 秒过期（默认 CACHE_TTL）
+
+    同一个键的并发未命中会被合并：进程内只有一个请求执行函数，
+    跨进程通过短期 Redis 锁保证只有一个 worker 重新计算
+
+    缓存键只由查询/路径参数决定（见 build_route_cache_key），
+    vary_on / vary_on_user 用于按路由声明哪些参数和调用者身份影响结果
+
+    stale_ttl：expire 之后的 stale_ttl 秒内直接返回旧值并在后台刷新；
+    stale_if_error=True：超过该窗口后重算失败时返回最后一次的结果
+    （旧值额外保留 CACHE_STALE_IF_ERROR_TTL 秒）
+
+    tags：依赖标签模板，用函数参数格式化，如 ``("tag:{tag_id}",)``
     """
     if expire is None:
         expire = settings.CACHE_TTL
+    store_options = {
+        "stale_ttl": stale_ttl,
+        "error_ttl": settings.CACHE_STALE_IF_ERROR_TTL if stale_if_error else None,
+    }
 
     def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
             # 检查是否启用缓存
@@ -65,28 +741,42 @@ def cache_key_wrapper(
             if key_func:
                 cache_key = key_func(*args, **kwargs)
             else:
-                cache_key = generate_cache_key(prefix, *args, **kwargs)
+                cache_key = build_route_cache_key(
+                    prefix, signature, args, kwargs, vary_on=vary_on, vary_on_user=vary_on_user
+                )
+            options = store_options
+            if tags:
+                options = {**store_options, "tags": _format_tags(tags, signature, args, kwargs)}
 
+            hit, value, freshness = False, None, "missing"
             try:
-                # 尝试获取缓存（简化版本 - 使用内存缓存）
-                if cache_key in _memory_cache:
-                    logger.debug(f"Cache hit: {cache_key}")
-                    return _memory_cache[cache_key]
-
-                # 执行函数
-                result = await func(*args, **kwargs)
-
-                # 设置缓存（简化版本）
-                if result is not None:
-                    _memory_cache[cache_key] = result
-                    logger.debug(f"Cache set: {cache_key}")
+                hit, value, freshness = await cache_lookup(cache_key)
+            except Exception as e:
+                logger.error(f"Cache error: {e}")
 
-                return result
+            stats = _stats_for(cache_key)
+            if hit and freshness == "fresh":
+                stats.hits += 1
+                logger.debug(f"Cache hit: {cache_key}")
+                return value
+            if hit and freshness == "stale":
+                stats.stale_hits += 1
+                logger.debug(f"Cache stale hit, revalidating: {cache_key}")
+                _schedule_refresh(cache_key, func, args, kwargs, expire, options)
+                return value
 
+            # 执行函数（函数自身的异常直接抛出，不做重试）
+            stats.misses += 1
+            try:
+                return await _single_flight(
+                    cache_key,
+                    lambda: _load_and_store(cache_key, lambda: func(*args, **kwargs), expire, **options),
+                )
             except Exception as e:
-                logger.error(f"Cache error: {e}")
-                # 缓存错误时直接执行函数
-                return await func(*args, **kwargs)
+                if not (hit and stale_if_error):
+                    raise
+                logger.warning(f"Serving stale cache for {cache_key} after error: {e}")
+                return value
 
         return wrapper
 
@@ -94,36 +784,309 @@ def cache_key_wrapper(
 
 
 async def invalidate_cache_pattern(pattern: str):
-    """按模式删除缓存 - 简化版本"""
-    keys_to_delete = [key for key in _memory_cache.keys() if pattern.replace('*', '') in key]
-    for key in keys_to_delete:
-        del _memory_cache[key]
-    logger.debug(f"Cache pattern invalidated: {pattern}")
+    """按 glob 模式删除缓存（所有进程），如 ``tags:*``"""
+    deleted = _memory_cache.delete_pattern(pattern)
+    await _redis_tier.delete_pattern(pattern)
+    await _redis_tier.publish({"op": "pattern", "pattern": pattern})
+    logger.debug(f"Cache pattern invalidated: {pattern} ({deleted} local keys)")
+
+
+_invalidation_hooks: dict[str, list[Callable[[], Any]]] = {}
+
+
+def on_invalidate(tag: str, callback: Callable[[], Any]) -> None:
+    """
+    登记标签失效回调（如重建快照）；只在发起失效的进程中调用一次
+
+    回调在删除键之前执行，返回 awaitable 时会等待其完成，保证依赖它的页面被
+    删除后重新渲染时读到的已是新数据
+    """
+    _invalidation_hooks.setdefault(tag, []).append(callback)
+
+
+async def acquire_lease(name: str, seconds: float) -> bool:
+    """
+    跨进程的定时租约：同一时间只有一个进程能拿到，到期自动释放
+
+    用于让周期任务在多个 worker 中只执行一次；Redis 不可用时总是返回 True
+    """
+    acquired = await _redis_tier.acquire_lock(name, uuid.uuid4().hex, seconds)
+    return acquired is not False
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """按依赖标签失效缓存（所有进程），只删除登记在这些标签下的键"""
+    tags = tuple(dict.fromkeys(tag for tag in tags if tag))
+    if not tags:
+        return
+    for tag in tags:
+        for callback in _invalidation_hooks.get(tag, ()):
+            try:
+                result = callback()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"Invalidation hook for tag {tag} failed: {e}")
+    keys = _drop_local_tags(tags)
+    keys |= await _redis_tier.pop_tags(tags)
+    if keys:
+        await _redis_tier.delete(*keys)
+    await _redis_tier.publish({"op": "tags", "tags": list(tags)})
+    logger.debug(f"Cache tags invalidated: {', '.join(tags)} ({len(keys)} keys)")
 
 
 # 为兼容性提供的函数
 async def invalidate_cache(prefix: str, *args, **kwargs):
     """删除特定缓存"""
     cache_key = generate_cache_key(prefix, *args, **kwargs)
-    if cache_key in _memory_cache:
-        del _memory_cache[cache_key]
+    await cache_delete(cache_key)
     logger.debug(f"Cache invalidated: {cache_key}")
 
 
+_message_handlers: dict[str, Callable[[dict], Any]] = {}
+_resubscribe_hooks: list[Callable[[], Any]] = []
+
+
+def on_message(op: str, handler: Callable[[dict], Any]) -> None:
+    """登记自定义广播消息的处理函数（通过失效频道在 worker 之间同步其他进程内状态）"""
+    _message_handlers[op] = handler
+
+
+def on_resubscribe(callback: Callable[[], Any]) -> None:
+    """登记（重新）订阅失效频道后的回调；断线期间错过的消息需要由回调重新同步"""
+    _resubscribe_hooks.append(callback)
+
+
+async def publish_message(op: str, **payload: Any) -> None:
+    """向其他 worker 广播自定义消息（Redis 不可用时忽略）"""
+    await _redis_tier.publish({"op": op, **payload})
+
+
+def _apply_invalidation_message(message: dict) -> None:
+    """处理其他进程广播的失效消息，只作用于本进程 L1"""
+    if message.get("origin") == _instance_id:
+        return
+    op = message.get("op")
+    if op == "delete":
+        _memory_cache.delete_many(message.get("keys") or [])
+    elif op == "pattern" and message.get("pattern"):
+        _memory_cache.delete_pattern(message["pattern"])
+    elif op == "tags":
+        _drop_local_tags(message.get("tags") or [])
+    elif op == "clear":
+        _clear_local()
+    elif op in _message_handlers:
+        _message_handlers[op](message)
+
+
+_SUMMED_PREFIX_FIELDS = (
+    "hits", "stale_hits", "misses", "coalesced", "recomputes", "errors",
+    "recompute_seconds", "evictions", "entries", "bytes",
+)
+_SUMMED_OVERALL_FIELDS = (
+    "entries", "bytes", "l1_hits", "l1_misses", "evictions", "expirations",
+    "leaders", "coalesced_local", "coalesced_remote", "lock_timeouts",
+)
+
+
+def _finish_prefix_stats(stats: dict) -> dict:
+    served = stats["hits"] + stats["stale_hits"]
+    lookups = served + stats["misses"]
+    stats["hit_rate"] = round(served / lookups, 4) if lookups else 0.0
+    stats["avg_recompute_ms"] = (
+        round(stats["recompute_seconds"] * 1000 / stats["recomputes"], 2) if stats["recomputes"] else 0.0
+    )
+    stats["max_recompute_ms"] = round(stats.pop("recompute_max_seconds") * 1000, 2)
+    stats.pop("recompute_seconds")
+    return stats
+
+
+def local_stats_snapshot() -> dict:
+    """本进程的统计快照（原始计数，未计算比率）"""
+    prefixes = {prefix: asdict(stats) for prefix, stats in _prefix_stats.items()}
+    for key, entry in _memory_cache.items():
+        prefix = prefixes.setdefault(key_prefix(key), asdict(PrefixStats()))
+        prefix["entries"] = prefix.get("entries", 0) + 1
+        prefix["bytes"] = prefix.get("bytes", 0) + entry.size
+    for prefix in prefixes.values():
+        prefix.setdefault("entries", 0)
+        prefix.setdefault("bytes", 0)
+
+    memory = _memory_cache.stats()
+    flights = single_flight_stats()
+    return {
+        "instance": _instance_id,
+        "pid": os.getpid(),
+        "updated_at": time.time(),
+        "overall": {
+            "entries": memory["entries"],
+            "bytes": memory["bytes"],
+            "l1_hits": memory["hits"],
+            "l1_misses": memory["misses"],
+            "evictions": memory["evictions"],
+            "expirations": memory["expirations"],
+            "leaders": flights["leaders"],
+            "coalesced_local": flights["coalesced_local"],
+            "coalesced_remote": flights["coalesced_remote"],
+            "lock_timeouts": flights["lock_timeouts"],
+        },
+        "prefixes": prefixes,
+    }
+
+
+def merge_stats_snapshots(snapshots: Sequence[dict]) -> dict:
+    """把多个 worker 的快照汇总成整体与按前缀的指标"""
+    overall = dict.fromkeys(_SUMMED_OVERALL_FIELDS, 0)
+    prefixes: dict[str, dict] = {}
+    for snapshot in snapshots:
+        for field in _SUMMED_OVERALL_FIELDS:
+            overall[field] += snapshot.get("overall", {}).get(field, 0)
+        for prefix, stats in snapshot.get("prefixes", {}).items():
+            merged = prefixes.setdefault(prefix, {**dict.fromkeys(_SUMMED_PREFIX_FIELDS, 0), "recompute_max_seconds": 0.0})
+            for field in _SUMMED_PREFIX_FIELDS:
+                merged[field] += stats.get(field, 0)
+            merged["recompute_max_seconds"] = max(merged["recompute_max_seconds"], stats.get("recompute_max_seconds", 0.0))
+
+    prefixes = {prefix: _finish_prefix_stats(stats) for prefix, stats in sorted(prefixes.items())}
+    served = sum(stats["hits"] + stats["stale_hits"] for stats in prefixes.values())
+    lookups = served + sum(stats["misses"] for stats in prefixes.values())
+    overall["hit_rate"] = round(served / lookups, 4) if lookups else 0.0
+    overall["coalesced"] = overall["coalesced_local"] + overall["coalesced_remote"]
+    return {"workers": len(snapshots), "overall": overall, "prefixes": prefixes}
+
+
 class CacheManager:
-    """缓存管理器 - 简化版本"""
+    """缓存管理器"""
+
+    def __init__(self):
+        self._listener_task: Optional[asyncio.Task] = None
+        self._stats_task: Optional[asyncio.Task] = None
+        self.listener_connected = False
+
+    async def start(self):
+        """启动失效广播订阅与统计上报（在应用 lifespan 中调用）"""
+        if settings.CACHE_REDIS_ENABLED and get_redis_connection is not None:
+            if self._listener_task is None:
+                self._listener_task = asyncio.create_task(self._listen())
+            if self._stats_task is None:
+                self._stats_task = asyncio.create_task(self._report_stats())
 
-    async def get_stats(self) -> dict:
-        """获取缓存统计信息"""
+    async def stop(self):
+        for task in (self._listener_task, self._stats_task):
+            await cancel_task(task)
+        self._listener_task = None
+        self._stats_task = None
+        self.listener_connected = False
+
+    async def _report_stats(self):
+        interval = settings.CACHE_STATS_REPORT_INTERVAL
+        while True:
+            await _redis_tier.report_stats(local_stats_snapshot(), ttl=interval * 3)
+            await asyncio.sleep(interval)
+
+    async def _listen(self):
+        while True:
+            pubsub = None
+            try:
+                r = await get_redis_connection()
+                pubsub = r.pubsub()
+                await pubsub.subscribe(_redis_tier.channel)
+                self.listener_connected = True
+                # 订阅断开期间可能错过了失效消息，重连后清空 L1 以免读到旧数据
+                _clear_local()
+                for callback in _resubscribe_hooks:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.warning(f"Cache resubscribe hook failed: {e}")
+                logger.info(f"Subscribed to cache invalidation channel {_redis_tier.channel}")
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        _apply_invalidation_message(json.loads(message["data"]))
+                    except (TypeError, ValueError) as e:
+                        logger.warning(f"Ignoring malformed cache invalidation message: {e}")
+            except asyncio.CancelledError:
+                if pubsub is not None:
+                    await pubsub.close()
+                raise
+            except Exception as e:
+                if self.listener_connected:
+                    logger.warning(f"Cache invalidation subscription lost: {e}")
+                self.listener_connected = False
+                await asyncio.sleep(settings.CACHE_REDIS_RETRY_SECONDS)
+
+    async def get_stats(self, aggregate: bool = True) -> dict:
+        """
+        获取缓存统计信息
+
+        aggregate=True 时汇总所有 gunicorn worker 上报的快照（Redis 不可用时只含本进程）
+        """
+        snapshot = local_stats_snapshot()
+        snapshots = [snapshot]
+        if aggregate:
+            max_age = settings.CACHE_STATS_REPORT_INTERVAL * 3
+            await _redis_tier.report_stats(snapshot, ttl=max_age)
+            remote = await _redis_tier.collect_stats(max_age)
+            if remote:
+                snapshots = [s for s in remote if s.get("instance") != _instance_id] + [snapshot]
+
+        merged = merge_stats_snapshots(snapshots)
+        overall = merged["overall"]
         return {
-            "total_keys": len(_memory_cache),
-            "memory_usage": "N/A",
-            "hit_rate": "N/A",
+            "total_keys": overall["entries"],
+            "memory_usage": overall["bytes"],
+            "hit_rate": overall["hit_rate"],
+            "evictions": overall["evictions"],
+            "expirations": overall["expirations"],
+            "coalesced": overall["coalesced"],
+            "workers": merged["workers"],
+            "redis_available": _redis_tier.available,
+            "invalidation_listener": self.listener_connected,
+            "overall": overall,
+            "prefixes": merged["prefixes"],
         }
 
+    async def inspect_keys(self, prefix: Optional[str] = None, order_by: str = "bytes", limit: int = 50) -> list[dict]:
+        """列出本进程 L1 中的缓存键（按大小或命中数排序），附带 L1/L2 剩余 TTL"""
+        now = time.monotonic()
+        entries = [
+            (key, entry) for key, entry in _memory_cache.items()
+            if prefix is None or key.startswith(prefix)
+        ]
+        sort_key = (lambda item: item[1].hits) if order_by == "hits" else (lambda item: item[1].size)
+        entries = sorted(entries, key=sort_key, reverse=True)[:limit]
+
+        l2_ttls = await _redis_tier.ttls([key for key, _ in entries])
+        key_tags: dict[str, list[str]] = {}
+        for tag, keys in _tag_index.items():
+            for key in keys:
+                key_tags.setdefault(key, []).append(tag)
+
+        return [
+            {
+                "key": key,
+                "prefix": key_prefix(key),
+                "bytes": entry.size,
+                "hits": entry.hits,
+                "ttl": None if entry.expires_at is None else round(entry.ttl(now), 1),
+                "l2_ttl": l2_ttls.get(key),
+                "freshness": entry.freshness(now),
+                "tags": sorted(key_tags.get(key, [])),
+            }
+            for key, entry in entries
+        ]
+
+    async def purge_prefix(self, prefix: str) -> None:
+        """按前缀清除缓存（所有进程）"""
+        await invalidate_cache_pattern(f"{prefix}*")
+
     async def clear_all(self):
-        """清除所有缓存"""
-        _memory_cache.clear()
+        """清除所有缓存值（所有进程）；标签索引、统计与锁 / 租约不受影响"""
+        _clear_local()
+        await _redis_tier.delete_pattern("*")
+        await _redis_tier.publish({"op": "clear"})
         logger.warning("All cache cleared")
 
 
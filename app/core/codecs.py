@@ -0,0 +1,214 @@
+# app/core/codecs.py - Redis 缓存值的序列化与压缩
+"""
+缓存值编码格式：``<标记字节><负载>``
+
+标记字节低 4 位为编解码器（JSON / MessagePack），最高 2 位为压缩算法（无 / zlib / zstd）。
+没有标记字节的旧数据按 JSON 解析，因此新旧格式可以在滚动发布期间共存。
+"""
+import json
+import uuid
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Optional
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ModuleNotFoundError:  # 未安装 orjson 时退回标准库 json
+    orjson = None
+
+try:
+    import msgpack
+except ModuleNotFoundError:  # 未安装 msgpack 时只使用 JSON 编码
+    msgpack = None
+
+try:
+    import zstandard
+except ModuleNotFoundError:  # 未安装 zstandard 时使用 zlib 压缩
+    zstandard = None
+
+
+CODEC_JSON = 0x01
+CODEC_MSGPACK = 0x02
+
+COMPRESSION_NONE = 0x00
+COMPRESSION_ZLIB = 0x40
+COMPRESSION_ZSTD = 0x80
+
+# 所有合法标记字节（0x01/0x02/0x41/0x42/0x81/0x82）都不可能是 JSON 文本的首字节
+_CODEC_MASK = 0x0F
+_COMPRESSION_MASK = 0xC0
+
+
+class CodecError(ValueError):
+    """缓存值无法编码或解码"""
+
+
+def _to_builtin(value: Any) -> Any:
+    """把 JSON 不支持的常见类型转换为基础类型"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+class JsonCodec:
+    """JSON 编码（优先使用 orjson），datetime 等类型编码为字符串"""
+
+    marker = CODEC_JSON
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(value, default=_to_builtin, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(value, default=_to_builtin, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def loads(self, data: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+# MessagePack 扩展类型编号
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+_EXT_DECIMAL = 3
+_EXT_UUID = 4
+_EXT_TIME = 5
+
+
+class MsgpackCodec:
+    """MessagePack 编码，datetime/date/Decimal/UUID 通过扩展类型原样还原"""
+
+    marker = CODEC_MSGPACK
+    name = "msgpack"
+
+    @staticmethod
+    def _default(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return msgpack.ExtType(_EXT_DATETIME, value.isoformat().encode())
+        if isinstance(value, date):
+            return msgpack.ExtType(_EXT_DATE, value.isoformat().encode())
+        if isinstance(value, time):
+            return msgpack.ExtType(_EXT_TIME, value.isoformat().encode())
+        if isinstance(value, Decimal):
+            return msgpack.ExtType(_EXT_DECIMAL, str(value).encode())
+        if isinstance(value, uuid.UUID):
+            return msgpack.ExtType(_EXT_UUID, value.bytes)
+        if hasattr(value, "model_dump"):
+            return value.model_dump()
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+    @staticmethod
+    def _ext_hook(code: int, data: bytes) -> Any:
+        if code == _EXT_DATETIME:
+            return datetime.fromisoformat(data.decode())
+        if code == _EXT_DATE:
+            return date.fromisoformat(data.decode())
+        if code == _EXT_TIME:
+            return time.fromisoformat(data.decode())
+        if code == _EXT_DECIMAL:
+            return Decimal(data.decode())
+        if code == _EXT_UUID:
+            return uuid.UUID(bytes=data)
+        return msgpack.ExtType(code, data)
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=self._default, use_bin_type=True, datetime=False)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, ext_hook=self._ext_hook, raw=False, strict_map_key=False)
+
+
+_json_codec = JsonCodec()
+_codecs = {CODEC_JSON: _json_codec}
+if msgpack is not None:
+    _codecs[CODEC_MSGPACK] = MsgpackCodec()
+
+
+def get_codec(name: Optional[str] = None):
+    """按名称获取编解码器，所需依赖未安装时退回 JSON"""
+    name = name or settings.CACHE_CODEC
+    for codec in _codecs.values():
+        if codec.name == name:
+            return codec
+    return _json_codec
+
+
+def _compression_marker(name: str) -> int:
+    if name == "zstd" and zstandard is not None:
+        return COMPRESSION_ZSTD
+    if name in ("zstd", "zlib"):
+        return COMPRESSION_ZLIB
+    return COMPRESSION_NONE
+
+
+def _compress(marker: int, data: bytes) -> bytes:
+    if marker == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=settings.CACHE_COMPRESSION_LEVEL).compress(data)
+    return zlib.compress(data, settings.CACHE_COMPRESSION_LEVEL)
+
+
+def _decompress(marker: int, data: bytes) -> bytes:
+    if marker == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise CodecError("zstd-compressed cache value but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if marker == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    raise CodecError(f"Unknown compression marker {marker:#x}")
+
+
+def encode(value: Any, codec: Optional[str] = None) -> bytes:
+    """编码缓存值；超过 CACHE_COMPRESS_THRESHOLD 字节且压缩后更小时进行压缩"""
+    selected = get_codec(codec)
+    try:
+        payload = selected.dumps(value)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise CodecError(str(e)) from e
+
+    marker = selected.marker
+    if len(payload) >= settings.CACHE_COMPRESS_THRESHOLD:
+        compression = _compression_marker(settings.CACHE_COMPRESSION)
+        if compression != COMPRESSION_NONE:
+            compressed = _compress(compression, payload)
+            if len(compressed) < len(payload):
+                payload = compressed
+                marker |= compression
+    return bytes([marker]) + payload
+
+
+def decode(data: bytes) -> Any:
+    """解码缓存值；没有标记字节的旧数据按 JSON 解析"""
+    if isinstance(data, str):
+        data = data.encode()
+    if not data:
+        raise CodecError("Empty cache value")
+
+    marker = data[0]
+    codec = _codecs.get(marker & _CODEC_MASK)
+    if codec is None or marker & ~(_CODEC_MASK | _COMPRESSION_MASK):
+        try:
+            return json.loads(data)
+        except ValueError as e:
+            raise CodecError(str(e)) from e
+
+    payload = data[1:]
+    compression = marker & _COMPRESSION_MASK
+    try:
+        if compression != COMPRESSION_NONE:
+            payload = _decompress(compression, payload)
+        return codec.loads(payload)
+    except CodecError:
+        raise
+    except Exception as e:
+        raise CodecError(str(e)) from e
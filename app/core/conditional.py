@@ -0,0 +1,156 @@
+# app/core/conditional.py - ETag / Last-Modified 条件请求
+import hashlib
+import inspect
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import wraps
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+
+# 注入到没有声明 Request / Response 参数的路由中
+_REQUEST_PARAM = "conditional_request"
+_RESPONSE_PARAM = "conditional_response"
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
+    def headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["ETag"] = self.etag
+        if self.last_modified is not None:
+            headers["Last-Modified"] = http_date(self.last_modified)
+        return headers
+
+
+def make_etag(*parts: Any) -> str:
+    """由若干廉价的版本信号生成弱 ETag（压缩前后的内容共用同一个 ETag）"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_utc(value).replace(microsecond=0), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match 使用弱比较
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in header.split(","))
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    """请求的 If-None-Match / If-Modified-Since 与当前版本一致时返回 True"""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # 同时出现时以 If-None-Match 为准
+        return bool(validators.etag) and _etag_matches(if_none_match, validators.etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validators.last_modified is not None:
+        try:
+            since = _utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        return _utc(validators.last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def not_modified_response(validators: Validators) -> Response:
+    return Response(status_code=304, headers=validators.headers())
+
+
+def apply_validators(response: Response, validators: Validators) -> None:
+    for name, value in validators.headers().items():
+        response.headers[name] = value
+
+
+def table_version(model, *criteria) -> list:
+    """模型表的 (max(updated_at), count(*)) 标量子查询，作为廉价的版本信号"""
+    return [
+        select(func.max(model.updated_at)).where(*criteria).scalar_subquery(),
+        select(func.count()).select_from(model).where(*criteria).scalar_subquery(),
+    ]
+
+
+async def fetch_validators(db: AsyncSession, *columns, extra: tuple = ()) -> Validators:
+    """
+    用一条 SELECT 读取若干版本信号（如 table_version 的结果）并生成校验器
+
+    Last-Modified 取其中最新的时间，extra 中的值（如当前用户）只参与 ETag
+    """
+    row = (await db.execute(select(*columns))).one()
+    return validators_from(row, *extra)
+
+
+def validators_from(values, *extra) -> Validators:
+    """由一组版本信号生成校验器：全部参与 ETag，其中最新的时间作为 Last-Modified"""
+    timestamps = [_utc(value) for value in values if isinstance(value, datetime)]
+    return Validators(
+        etag=make_etag(*values, *extra),
+        last_modified=max(timestamps, default=None),
+    )
+
+
+def conditional(validator: Callable[..., Awaitable[Optional[Validators]]]):
+    """
+    条件 GET 装饰器
+
+    validator 按参数名接收路由的部分参数（如 ``db``、``slug``、``current_user``），
+    在加载完整数据和渲染模板之前计算校验器；请求的 If-None-Match /
+    If-Modified-Since 匹配时直接返回 304，否则给响应加上 ETag 与 Last-Modified。
+    validator 返回 None 时不做条件处理（如资源不存在）
+    """
+    validator_params = set(inspect.signature(validator).parameters)
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        params = list(signature.parameters.values())
+        request_param = next((p.name for p in params if p.annotation is Request), None)
+        response_param = next((p.name for p in params if p.annotation is Response), None)
+        extra = []
+        if request_param is None:
+            extra.append(inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+        if response_param is None:
+            extra.append(inspect.Parameter(_RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            request = kwargs[request_param] if request_param else kwargs.pop(_REQUEST_PARAM)
+            response = kwargs[response_param] if response_param else kwargs.pop(_RESPONSE_PARAM)
+            validators = await validator(**{name: kwargs[name] for name in validator_params if name in kwargs})
+            if validators is None:
+                return await func(*args, **kwargs)
+            if is_not_modified(request, validators):
+                return not_modified_response(validators)
+
+            result = await func(*args, **kwargs)
+            target = result if isinstance(result, Response) else response
+            if target.status_code in (None, 200):
+                apply_validators(target, validators)
+            return result
+
+        if extra:
+            positional = [p for p in params if p.kind != inspect.Parameter.VAR_KEYWORD]
+            variadic = [p for p in params if p.kind == inspect.Parameter.VAR_KEYWORD]
+            wrapper.__signature__ = signature.replace(parameters=positional + extra + variadic)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,102 @@
+# app/core/counts.py - 分页列表的总数（缓存计数、估算与封顶）
+import json
+import logging
+from typing import Optional, Sequence
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.core.cache import cache_get_or_set, generate_cache_key
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RowCount(int):
+    """
+    列表总数
+
+    行为与 int 相同（模板里的 total / total_pages 计算不受影响），
+    渲染时封顶的计数显示为「1000+」，估算值显示为「~12000」
+    """
+
+    approximate: bool = False
+    capped: bool = False
+
+    def __new__(cls, value: int, *, approximate: bool = False, capped: bool = False):
+        count = super().__new__(cls, value)
+        count.approximate = approximate
+        count.capped = capped
+        return count
+
+    def __str__(self) -> str:
+        if self.capped:
+            return f"{int(self)}+"
+        if self.approximate:
+            return f"~{int(self)}"
+        return str(int(self))
+
+    def to_payload(self) -> dict:
+        return {"n": int(self), "a": self.approximate, "c": self.capped}
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "RowCount":
+        return cls(payload["n"], approximate=payload.get("a", False), capped=payload.get("c", False))
+
+
+async def estimate_rows(db: AsyncSession, query: Select) -> Optional[int]:
+    """PostgreSQL 规划器对查询结果行数的估算（基于 reltuples 与统计信息），其他数据库返回 None"""
+    if db.bind.dialect.name != "postgresql":
+        return None
+    compiled = query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _count(db: AsyncSession, query: Select, cap: Optional[int], estimate: bool) -> RowCount:
+    query = query.order_by(None)
+    if estimate:
+        try:
+            estimated = await estimate_rows(db, query)
+        except Exception as e:
+            logger.warning(f"Row estimate failed, counting exactly: {e}")
+            estimated = None
+        if estimated is not None and estimated >= settings.COUNT_ESTIMATE_THRESHOLD:
+            return RowCount(estimated, approximate=True)
+    if cap is not None:
+        # 只数到 cap + 1 行就停止
+        limited = (await db.execute(select(func.count()).select_from(query.limit(cap + 1).subquery()))).scalar_one()
+        return RowCount(min(limited, cap), capped=limited > cap)
+    return RowCount((await db.execute(select(func.count()).select_from(query.subquery()))).scalar_one())
+
+
+async def count_rows(
+        db: AsyncSession,
+        query: Select,
+        name: str,
+        /,
+        *,
+        tags: Sequence[str] = ("posts",),
+        cap: Optional[int] = None,
+        estimate: bool = False,
+        expire: Optional[int] = None,
+        **filters,
+) -> RowCount:
+    """
+    列表查询的总行数，按 name 与筛选参数缓存
+
+    tags 为计数依赖的缓存标签（文章的发布 / 下架 / 删除会失效 ``posts``）；
+    estimate 为 True 时大结果集直接采用规划器估算；cap 限制最多数多少行
+    """
+    key = generate_cache_key(f"count:{name}", **filters)
+
+    async def compute() -> dict:
+        return (await _count(db, query, cap, estimate)).to_payload()
+
+    payload = await cache_get_or_set(
+        key, compute, expire=settings.COUNT_CACHE_TTL if expire is None else expire, tags=tags,
+    )
+    return RowCount.from_payload(payload)
@@ -1,14 +1,18 @@
 # app/core/database.py - 修复数据库URL处理
+import asyncio
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional, Sequence
 import logging
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base, DeclarativeMeta
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import declarative_base, DeclarativeMeta, Session
 from sqlalchemy.pool import NullPool
-from sqlalchemy import event, MetaData, text
+from sqlalchemy import Delete, Insert, Update, event, MetaData, text
+from starlette.requests import Request
 
 from app.core.config import settings
+from app.core.tasks import cancel_task
 
 logger = logging.getLogger(__name__)
 
@@ -27,21 +31,24 @@ Base: DeclarativeMeta = declarative_base(metadata=metadata)
 # 修复：正确获取数据库URL
 database_url = settings.get_database_url(async_mode=True)
 
-use_null_pool = (
-    settings.ENVIRONMENT in {"development", "testing"}
-    or settings.DB_USE_NULL_POOL
-    or database_url.startswith("sqlite")
-)
 
-if use_null_pool:
-    engine = create_async_engine(
-        database_url,
-        echo=settings.DEBUG if settings.ENVIRONMENT != "testing" else False,
-        poolclass=NullPool,
+def _use_null_pool(url: str) -> bool:
+    return (
+        settings.ENVIRONMENT in {"development", "testing"}
+        or settings.DB_USE_NULL_POOL
+        or url.startswith("sqlite")
     )
-else:
-    engine = create_async_engine(
-        database_url,
+
+
+def create_engine_for(url: str) -> AsyncEngine:
+    if _use_null_pool(url):
+        return create_async_engine(
+            url,
+            echo=settings.DEBUG if settings.ENVIRONMENT != "testing" else False,
+            poolclass=NullPool,
+        )
+    return create_async_engine(
+        url,
         echo=settings.DEBUG,
         pool_size=settings.DB_POOL_SIZE,
         max_overflow=settings.DB_MAX_OVERFLOW,
@@ -53,24 +60,158 @@ else:
         }
     )
 
+
+use_null_pool = _use_null_pool(database_url)
+engine = create_engine_for(database_url)
+replica_engines = [
+    create_engine_for(settings.get_database_url(async_mode=True, url=url))
+    for url in settings.DATABASE_REPLICA_URLS
+]
+
+# 会话 info 中的标记：True 表示本会话的读可以走只读副本
+READ_ONLY = "read_only"
+# 写请求之后在这个 Cookie 有效期内的读都走主库（读到自己刚写入的数据）
+PRIMARY_STICKY_COOKIE = "db_primary_until"
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaRouter:
+    """只读流量在健康的副本之间轮询；复制延迟超过阈值或不可达的副本暂时退回主库"""
+
+    def __init__(self, primary: AsyncEngine, replicas: Sequence[AsyncEngine]):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.healthy = [True] * len(self.replicas)
+        self.lag: list[Optional[float]] = [None] * len(self.replicas)
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def pick(self) -> AsyncEngine:
+        for _ in range(len(self.replicas)):
+            index = self._next % len(self.replicas)
+            self._next += 1
+            if self.healthy[index]:
+                return self.replicas[index]
+        return self.primary
+
+    def record_lag(self, index: int, lag: Optional[float]) -> None:
+        """lag 为 None 表示检查失败"""
+        healthy = lag is not None and lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+        if healthy != self.healthy[index]:
+            if healthy:
+                logger.info(f"Replica {index} back in rotation (lag {lag:.2f}s)")
+            else:
+                logger.warning(f"Replica {index} removed from rotation (lag {lag})")
+        self.lag[index] = lag
+        self.healthy[index] = healthy
+
+    async def _measure_lag(self, replica: AsyncEngine) -> float:
+        if replica.dialect.name != "postgresql":
+            return 0.0
+        async with replica.connect() as conn:
+            return float((await conn.execute(_REPLICA_LAG_SQL)).scalar() or 0.0)
+
+    async def check(self) -> None:
+        for index, replica in enumerate(self.replicas):
+            try:
+                lag = await self._measure_lag(replica)
+            except Exception as e:
+                logger.warning(f"Replica {index} lag check failed: {e}")
+                lag = None
+            self.record_lag(index, lag)
+
+    async def _monitor(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+
+    async def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._monitor())
+
+    async def stop(self) -> None:
+        await cancel_task(self._task)
+        self._task = None
+
+    def status(self) -> list[dict]:
+        return [
+            {"replica": index, "healthy": self.healthy[index], "lag_seconds": self.lag[index]}
+            for index in range(len(self.replicas))
+        ]
+
+
+replica_router = ReplicaRouter(engine, replica_engines)
+
+
+class RoutingSession(Session):
+    """
+    读写分离会话
+
+    只有 info[READ_ONLY] 为 True 的会话才会把查询发往副本（每个会话固定使用同一个副本）；
+    flush、INSERT/UPDATE/DELETE 和 SELECT ... FOR UPDATE 总是走主库，并且之后本会话的
+    读也改走主库
+    """
+
+    router: ReplicaRouter = replica_router
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        primary_bind = super().get_bind(mapper, clause=clause, **kw)
+        if not self.router.replicas or not self.info.get(READ_ONLY):
+            return primary_bind
+        if (
+            self._flushing
+            or isinstance(clause, (Insert, Update, Delete))
+            or getattr(clause, "_for_update_arg", None) is not None
+        ):
+            self.info[READ_ONLY] = False
+            return primary_bind
+        replica = self.info.get("replica")
+        if replica is None:
+            replica = self.info["replica"] = self.router.pick()
+        return replica.sync_engine
+
+
 # 创建异步会话工厂
 async_session = async_sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
 )
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+def prefers_replica(request: Optional[Request]) -> bool:
+    """安全方法的请求可以读副本，除非该客户端刚刚写入过（见 PRIMARY_STICKY_COOKIE）"""
+    if request is None or request.method not in _SAFE_METHODS:
+        return False
+    try:
+        sticky_until = float(request.cookies.get(PRIMARY_STICKY_COOKIE, 0))
+    except ValueError:
+        sticky_until = 0
+    return sticky_until < time.time()
+
+
+def read_session() -> AsyncSession:
+    """只读会话（后台构建快照等），查询可以走副本"""
+    return async_session(info={READ_ONLY: True})
+
+
+async def get_db(request: Request = None) -> AsyncGenerator[AsyncSession, None]:
     """
-    依赖函数，提供数据库会话
+    依赖函数，提供数据库会话（GET 等只读请求的查询会路由到只读副本）
 
     Yields:
         AsyncSession: 数据库会话
     """
-    async with async_session() as session:
+    async with async_session(info={READ_ONLY: prefers_replica(request)}) as session:
         try:
             yield session
         except Exception as e:
@@ -145,6 +286,8 @@ class DatabaseManager:
     async def close():
         """关闭数据库连接"""
         await engine.dispose()
+        for replica in replica_engines:
+            await replica.dispose()
         logger.info("Database connections closed")
 
 
@@ -0,0 +1,215 @@
+# app/core/memory_cache.py - 进程内 LRU/TTL 缓存引擎
+import fnmatch
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """粗略估算对象占用的字节数（递归统计常见容器）"""
+    size = sys.getsizeof(value)
+    if _depth > 8:
+        return size
+
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, _depth + 1) + estimate_size(item, _depth + 1)
+        return size
+    if isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+        return size
+    if hasattr(value, "__dict__"):
+        size += estimate_size(vars(value), _depth + 1)
+    return size
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    size: int
+    expires_at: Optional[float]
+    hits: int = 0
+    fresh_until: Optional[float] = None
+    stale_until: Optional[float] = None
+
+    def is_expired(self, now: float) -> bool:
+        return self.expires_at is not None and now >= self.expires_at
+
+    def freshness(self, now: float) -> str:
+        """fresh：新鲜；stale：可直接返回但需后台刷新；expired：仅在重算失败时兜底使用"""
+        if self.fresh_until is None or now < self.fresh_until:
+            return "fresh"
+        if self.stale_until is not None and now < self.stale_until:
+            return "stale"
+        return "expired"
+
+    def ttl(self, now: float) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - now)
+
+
+class MemoryCache:
+    """带容量上限的进程内缓存：按条目 TTL 过期，按条目数和近似字节数做 LRU 淘汰"""
+
+    def __init__(
+            self,
+            max_entries: int = 10000,
+            max_bytes: int = 64 * 1024 * 1024,
+            on_evict: Optional[Callable[[str, CacheEntry], None]] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._data: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get_entry(key, touch=False) is not None
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def get_entry(self, key: str, touch: bool = True) -> Optional[CacheEntry]:
+        """获取未过期的缓存条目，touch=True 时计入命中统计并刷新 LRU 顺序"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                if touch:
+                    self.misses += 1
+                return None
+            if entry.is_expired(now):
+                self._remove(key)
+                self.expirations += 1
+                if touch:
+                    self.misses += 1
+                return None
+            if touch:
+                self._data.move_to_end(key)
+                entry.hits += 1
+                self.hits += 1
+            return entry
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self.get_entry(key)
+        return default if entry is None else entry.value
+
+    def set(
+            self,
+            key: str,
+            value: Any,
+            ttl: Optional[float] = None,
+            fresh_for: Optional[float] = None,
+            stale_for: Optional[float] = None,
+    ) -> bool:
+        """
+        写入缓存；ttl 为 None 或 <= 0 表示不过期。单个值超过字节上限时不缓存
+
+        fresh_for / stale_for 为软过期时间（秒），条目在 ttl 到期前仍保留在缓存中
+        """
+        size = estimate_size(value) + estimate_size(key)
+        if size > self.max_bytes:
+            return False
+
+        now = time.monotonic()
+        expires_at = now + ttl if ttl and ttl > 0 else None
+        entry = CacheEntry(
+            value=value,
+            size=size,
+            expires_at=expires_at,
+            fresh_until=None if fresh_for is None else now + fresh_for,
+            stale_until=None if stale_for is None else now + stale_for,
+        )
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = entry
+            self._bytes += size
+            self._evict()
+        return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._remove(key)
+            return True
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        with self._lock:
+            return sum(1 for key in list(keys) if self.delete(key))
+
+    def delete_pattern(self, pattern: str) -> int:
+        """按 glob 模式删除缓存键，如 ``tags:*``"""
+        with self._lock:
+            matched = [key for key in self._data if fnmatch.fnmatchcase(key, pattern)]
+            for key in matched:
+                self._remove(key)
+            return len(matched)
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._data.keys())
+
+    def items(self) -> list[tuple[str, CacheEntry]]:
+        """返回所有未过期条目的快照（不影响 LRU 顺序与命中统计）"""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, entry) for key, entry in self._data.items() if not entry.is_expired(now)]
+
+    def purge_expired(self) -> int:
+        """主动清理已过期条目"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._data.items() if entry.is_expired(now)]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+            return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            key, entry = self._data.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key, entry)
@@ -7,6 +7,9 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
+from app.core.config import settings
+from app.core.database import PRIMARY_STICKY_COOKIE, replica_engines
+
 logger = logging.getLogger(__name__)
 
 
@@ -133,3 +136,21 @@ class RateLimitContextMiddleware(BaseHTTPMiddleware):
             response.headers["X-RateLimit-Reset"] = str(request.state.rate_limit_reset)
 
         return response
+
+
+async def primary_after_write(request: Request, call_next: Callable) -> Response:
+    """写请求成功后设置 Cookie，让该客户端之后一段时间内的读取走主库"""
+    response = await call_next(request)
+    if (
+            replica_engines
+            and request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400
+    ):
+        response.set_cookie(
+            PRIMARY_STICKY_COOKIE,
+            f"{time.time() + settings.DB_REPLICA_STICKY_SECONDS:.3f}",
+            max_age=settings.DB_REPLICA_STICKY_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
@@ -0,0 +1,173 @@
+# app/core/page_cache.py - 匿名访客的整页 HTML 缓存
+import gzip
+import logging
+from email.utils import parsedate_to_datetime
+from functools import wraps
+from typing import Any, Awaitable, Callable, Optional, Sequence, Union
+from urllib.parse import urlencode
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.cache import cache_get, cache_set, generate_cache_key
+from app.core.conditional import Validators, is_not_modified, not_modified_response
+from app.core.config import settings
+from app.core.warmup import is_warmup_request
+
+logger = logging.getLogger(__name__)
+
+PageTags = Union[Sequence[str], Callable[[dict], Sequence[str]]]
+
+# 这些查询参数不影响页面内容，不参与缓存键
+_IGNORED_QUERY_PARAMS = {"fbclid", "gclid", "ref"}
+_GZIP_MIN_SIZE = 1000
+
+
+def is_anonymous(request: Request) -> bool:
+    """没有登录 Cookie 也没有 Authorization 头的请求视为匿名访客"""
+    return (
+        settings.ACCESS_COOKIE_NAME not in request.cookies
+        and "authorization" not in request.headers
+    )
+
+
+def normalized_query(request: Request) -> str:
+    """按参数名排序、去掉空值和跟踪参数后的查询字符串"""
+    params = sorted(
+        (name, value)
+        for name, value in request.query_params.multi_items()
+        if value != "" and name not in _IGNORED_QUERY_PARAMS and not name.startswith("utm_")
+    )
+    return urlencode(params)
+
+
+def page_cache_key(name: str, request: Request) -> str:
+    return generate_cache_key(f"page:{name}", path=request.url.path, query=normalized_query(request))
+
+
+def _accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "")
+
+
+def _build_response(entry: dict, request: Request) -> Response:
+    headers = dict(entry.get("headers") or {})
+    body = entry["body"]
+    if entry.get("gzip") is not None and _accepts_gzip(request):
+        # 已压缩的变体带 Content-Encoding，GZipMiddleware 会原样透传
+        body = entry["gzip"]
+        headers["Content-Encoding"] = "gzip"
+    if entry.get("gzip") is not None:
+        headers["Vary"] = "Accept-Encoding"
+    headers["X-Cache"] = "HIT"
+    return Response(content=body, status_code=entry.get("status", 200), headers=headers, media_type=entry.get("media_type"))
+
+
+def _entry_validators(entry: dict) -> Validators:
+    """缓存条目保存的 ETag / Last-Modified（由内层的 conditional 装饰器生成）"""
+    headers = entry.get("headers") or {}
+    last_modified = headers.get("last-modified")
+    try:
+        last_modified = parsedate_to_datetime(last_modified) if last_modified else None
+    except (TypeError, ValueError):
+        last_modified = None
+    return Validators(etag=headers.get("etag"), last_modified=last_modified)
+
+
+def _cacheable(response: Response) -> bool:
+    return (
+        response.status_code == 200
+        and "set-cookie" not in response.headers
+        and isinstance(getattr(response, "body", None), bytes)
+    )
+
+
+def cache_page(
+        name: str,
+        expire: Optional[int] = None,
+        tags: PageTags = (),
+        meta: Optional[Callable[[dict], dict]] = None,
+        on_hit: Optional[Callable[[dict], Awaitable[Any]]] = None,
+):
+    """
+    匿名访客整页缓存装饰器（用于返回 TemplateResponse 的页面路由）
+
+    只缓存没有登录凭据的 GET 请求，键为路径 + 规范化查询参数；同时保存原始与 gzip
+    两个内容编码变体。tags 为依赖标签（或根据模板上下文计算标签的函数），
+    相关数据变更时通过 invalidate_tags 清除。meta 从模板上下文提取需要随缓存
+    保存的数据，命中时传给 on_hit（如记录阅读量，预热请求不调用）。命中且请求的 ETag /
+    Last-Modified 与条目一致时直接返回 304，不调用 on_hit（与登录用户经 conditional
+    得到的 304 一致，重新验证不算访问）。响应带 ``X-Cache`` 头
+    """
+    if expire is None:
+        expire = settings.PAGE_CACHE_TTL
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Optional[Request] = kwargs.get("request")
+            if request is None:
+                request = next((arg for arg in args if isinstance(arg, Request)), None)
+            if (
+                not settings.ENABLE_CACHE
+                or not settings.PAGE_CACHE_ENABLED
+                or request is None
+                or request.method != "GET"
+                or not is_anonymous(request)
+            ):
+                response = await func(*args, **kwargs)
+                if isinstance(response, Response):
+                    response.headers["X-Cache"] = "BYPASS"
+                return response
+
+            cache_key = page_cache_key(name, request)
+            try:
+                hit, entry = await cache_get(cache_key)
+            except Exception as e:
+                logger.error(f"Page cache error: {e}")
+                hit, entry = False, None
+            if hit and isinstance(entry, dict):
+                # 304 与 conditional 装饰器一样在路由之前返回，不算一次访问
+                validators = _entry_validators(entry)
+                if is_not_modified(request, validators):
+                    response = not_modified_response(validators)
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+                # 预热请求不触发 on_hit 的副作用（如阅读量），与未命中时路由内的判断一致
+                if on_hit is not None and not is_warmup_request(request):
+                    try:
+                        await on_hit(entry.get("meta") or {})
+                    except Exception as e:
+                        logger.warning(f"Page cache hit hook failed for {cache_key}: {e}")
+                return _build_response(entry, request)
+
+            response = await func(*args, **kwargs)
+            if isinstance(response, Response):
+                response.headers["X-Cache"] = "MISS"
+                if _cacheable(response):
+                    await _store(cache_key, response, expire, tags, meta)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+async def _store(cache_key: str, response: Response, expire: int, tags: PageTags, meta) -> None:
+    context = getattr(response, "context", None) or {}
+    try:
+        page_tags = list(tags(context) if callable(tags) else tags)
+        body = bytes(response.body)
+        entry = {
+            "status": response.status_code,
+            "media_type": response.media_type,
+            "headers": {
+                name: value for name, value in response.headers.items()
+                if name.lower() not in ("content-length", "x-cache", "set-cookie")
+            },
+            "body": body,
+            "gzip": gzip.compress(body) if len(body) >= _GZIP_MIN_SIZE else None,
+            "meta": meta(context) if meta is not None else {},
+        }
+        await cache_set(cache_key, entry, expire, tags=["pages", *page_tags])
+    except Exception as e:
+        logger.error(f"Page cache store failed for {cache_key}: {e}")
@@ -1,48 +1,158 @@
 # app/core/redis.py
-import json
-from typing import Any, Optional
+import asyncio
+from typing import Any, Iterable, Mapping, Optional
 import redis.asyncio as redis
+from . import codecs
 from .config import settings
 
-# 创建Redis连接池
-redis_pool = redis.ConnectionPool.from_url(str(settings.REDIS_URL))
+# 进程内共享的 Redis 客户端（自带连接池），在应用 lifespan 中创建和关闭
+_client: Optional[redis.Redis] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+# 每个客户端在其事件循环上挂一个守护任务，循环结束前由它关闭连接池（见 _close_with_loop）
+_guards: set[asyncio.Task] = set()
+_client_guard: Optional[asyncio.Task] = None
+
+
+def _create_client() -> redis.Redis:
+    pool = redis.ConnectionPool.from_url(
+        str(settings.REDIS_URL),
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def get_redis() -> redis.Redis:
+    """
+    获取共享的 Redis 客户端
+
+    连接绑定在创建它的事件循环上；在新的事件循环中调用（如 Celery 任务里的
+    asyncio.run）时会为该循环重新创建客户端
+    """
+    global _client, _client_loop, _client_guard
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _client is None or (loop is not None and _client_loop is not loop):
+        _client = _create_client()
+        _client_loop = loop
+        _client_guard = None
+        if loop is not None:
+            _client_guard = loop.create_task(_close_with_loop(_client))
+            _guards.add(_client_guard)
+            _client_guard.add_done_callback(_guards.discard)
+    return _client
+
+
+async def _close_with_loop(client: redis.Redis) -> None:
+    """
+    一直挂起，直到所在事件循环结束时被取消，然后关闭 client 的连接池
+
+    asyncio.run 返回前会取消并等待所有剩余任务，此时循环仍可用；等循环关闭后
+    连接就无法再正常断开了。切换到新循环的旧客户端因此不会遗留连接池
+    """
+    global _client, _client_loop
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        if _client is client:
+            _client = None
+            _client_loop = None
+        try:
+            await client.aclose(close_connection_pool=True)
+        except Exception:
+            pass
+
+
+async def init_redis() -> redis.Redis:
+    """创建共享客户端（在应用启动时调用）"""
+    return get_redis()
+
+
+async def close_redis() -> None:
+    """关闭共享客户端及其连接池（在应用关闭时调用）"""
+    global _client, _client_loop, _client_guard
+    guard, client = _client_guard, _client
+    _client = None
+    _client_loop = None
+    _client_guard = None
+    if guard is not None and not guard.done() and guard.get_loop() is asyncio.get_running_loop():
+        guard.cancel()
+        await asyncio.gather(guard, return_exceptions=True)
+    elif client is not None:
+        await client.aclose(close_connection_pool=True)
+
 
 async def get_redis_connection():
-    """获取Redis连接"""
-    return redis.Redis(connection_pool=redis_pool)
+    """获取Redis连接（共享客户端，调用方无需关闭）"""
+    return get_redis()
+
+
+def _decode(value: Optional[bytes]) -> Optional[Any]:
+    """解码缓存值；兼容旧的纯 JSON 和纯文本值"""
+    if not value:
+        return None
+    try:
+        return codecs.decode(value)
+    except codecs.CodecError:
+        return value.decode()
+
 
 async def set_cache(key: str, value: Any, expire: int = 3600):
     """设置缓存"""
-    r = await get_redis_connection()
-    if isinstance(value, (dict, list)):
-        value = json.dumps(value)
-    await r.set(key, value, ex=expire)
-    await r.close()
+    await get_redis().set(key, codecs.encode(value), ex=expire)
+
 
 async def get_cache(key: str) -> Optional[Any]:
     """获取缓存"""
-    r = await get_redis_connection()
-    value = await r.get(key)
-    await r.close()
-    if value:
-        try:
-            return json.loads(value)
-        except json.JSONDecodeError:
-            return value.decode()
-    return None
+    return _decode(await get_redis().get(key))
+
 
 async def delete_cache(key: str):
     """删除缓存"""
-    r = await get_redis_connection()
-    await r.delete(key)
-    await r.close()
+    await get_redis().delete(key)
+
+
+async def get_many(keys: Iterable[str]) -> dict[str, Any]:
+    """用一次 MGET 批量读取缓存，只返回命中的键"""
+    keys = list(keys)
+    if not keys:
+        return {}
+    values = await get_redis().mget(keys)
+    result = {}
+    for key, value in zip(keys, values):
+        decoded = _decode(value)
+        if decoded is not None:
+            result[key] = decoded
+    return result
+
+
+async def set_many(mapping: Mapping[str, Any], expire: int = 3600):
+    """用一个 pipeline 批量写入缓存（一次往返）"""
+    if not mapping:
+        return
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for key, value in mapping.items():
+            pipe.set(key, codecs.encode(value), ex=expire)
+        await pipe.execute()
+
+
+async def delete_many(keys: Iterable[str]) -> int:
+    """批量删除缓存，返回实际删除的键数"""
+    keys = list(keys)
+    if not keys:
+        return 0
+    return await get_redis().delete(*keys)
+
 
 async def flush_cache_by_pattern(pattern: str):
     """按模式批量删除缓存"""
-    r = await get_redis_connection()
+    r = get_redis()
     cursor = b'0'
     while cursor:
         cursor, keys = await r.scan(cursor=cursor, match=pattern, count=100)
         if keys:
             await r.delete(*keys)
-    await r.close()
@@ -0,0 +1,152 @@
+# app/core/snapshot.py - 预计算的只读数据快照（如侧边栏）
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import acquire_lease, cache_get, cache_get_or_set, cache_set, on_invalidate
+from app.core.database import read_session
+from app.core.tasks import cancel_task
+
+logger = logging.getLogger(__name__)
+
+_registry: dict[str, "Snapshot"] = {}
+
+
+class Snapshot:
+    """
+    预先计算好的纯 dict 数据，保存在 L1 与 Redis 中，供页面处理函数直接读取
+
+    builder 接收一个新的数据库会话并返回可序列化的数据。快照由后台循环定期重建
+    （多个 worker 之间用租约保证只重建一次）。rebuild_on 中的标签失效时，
+    invalidate_tags 会等重建完成后才删除页面缓存，避免页面用旧快照重新渲染并被
+    缓存整个 TTL；重建期间其他读取继续返回旧快照。快照记录构建时间 built_at
+    与耗时 build_seconds
+    """
+
+    def __init__(
+            self,
+            name: str,
+            builder: Callable[[AsyncSession], Awaitable[dict]],
+            refresh_interval: int,
+            ttl: int,
+            rebuild_on: Sequence[str] = (),
+            default: Optional[dict] = None,
+    ):
+        self.name = name
+        self.key = f"snapshot:{name}"
+        self.builder = builder
+        self.refresh_interval = refresh_interval
+        self.ttl = ttl
+        self.default = default or {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._rebuild_pending = False
+        for tag in rebuild_on:
+            on_invalidate(tag, self._rebuild_on_invalidate)
+        _registry[name] = self
+
+    async def _build(self) -> dict:
+        started = time.perf_counter()
+        async with read_session() as db:
+            data = await self.builder(db)
+        elapsed = time.perf_counter() - started
+        logger.debug(f"Snapshot {self.name} built in {elapsed * 1000:.1f}ms")
+        return {
+            "data": data,
+            "built_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "build_seconds": round(elapsed, 4),
+        }
+
+    async def get_payload(self) -> Optional[dict]:
+        """读取快照（含构建信息）；冷启动时单飞构建一次"""
+        try:
+            payload = await cache_get_or_set(self.key, self._build, self.ttl)
+        except Exception as e:
+            logger.error(f"Snapshot {self.name} unavailable: {e}")
+            return None
+        return payload if isinstance(payload, dict) else None
+
+    async def get(self) -> dict:
+        """读取快照数据，构建失败时返回 default"""
+        payload = await self.get_payload()
+        if payload is None:
+            return self.default
+        return payload.get("data") or self.default
+
+    async def rebuild(self) -> dict:
+        """立即重建并写入缓存（所有进程可见）"""
+        payload = await self._build()
+        await cache_set(self.key, payload, self.ttl)
+        return payload
+
+    async def info(self) -> dict:
+        """快照的构建时间与耗时，不触发构建"""
+        hit, payload = await cache_get(self.key)
+        payload = payload if hit and isinstance(payload, dict) else {}
+        return {
+            "name": self.name,
+            "built": bool(payload),
+            "built_at": payload.get("built_at"),
+            "build_seconds": payload.get("build_seconds"),
+            "refresh_interval": self.refresh_interval,
+        }
+
+    def schedule_rebuild(self) -> None:
+        """在后台重建；已有重建在进行时合并为其结束后的一次"""
+        if self._rebuild_task is not None and not self._rebuild_task.done():
+            self._rebuild_pending = True
+            return
+        self._rebuild_task = asyncio.create_task(self._run_rebuilds())
+
+    async def _rebuild_on_invalidate(self) -> None:
+        # shield：发起失效的请求被取消时重建照常完成
+        self.schedule_rebuild()
+        await asyncio.shield(self._rebuild_task)
+
+    async def _run_rebuilds(self) -> None:
+        while True:
+            self._rebuild_pending = False
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.warning(f"Snapshot {self.name} rebuild failed: {e}")
+            if not self._rebuild_pending:
+                return
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                if await acquire_lease(f"{self.key}:refresh", self.refresh_interval * 0.9):
+                    await self.rebuild()
+            except Exception as e:
+                logger.warning(f"Snapshot {self.name} refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def start(self) -> None:
+        if self._refresh_task is None and self.refresh_interval > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        for task in (self._refresh_task, self._rebuild_task):
+            await cancel_task(task)
+        self._refresh_task = None
+        self._rebuild_task = None
+
+
+def registered_snapshots() -> list[Snapshot]:
+    return list(_registry.values())
+
+
+async def start_snapshots() -> None:
+    """启动所有快照的后台刷新（在应用 lifespan 中调用）"""
+    for snapshot in _registry.values():
+        await snapshot.start()
+
+
+async def stop_snapshots() -> None:
+    for snapshot in _registry.values():
+        await snapshot.stop()
@@ -0,0 +1,20 @@
+# app/core/tasks.py - 后台任务的停止
+import asyncio
+from typing import Optional
+
+
+async def cancel_task(task: Optional[asyncio.Task], retry_interval: float = 0.1) -> None:
+    """
+    取消后台任务并等待它真正结束
+
+    取消恰好落在驱动内部的 wait_for 上时（如 asyncpg 建立连接期间）可能被吞掉，
+    任务随后会进入长时间的 sleep；这里持续重发取消直到任务结束
+    """
+    if task is None:
+        return
+    while not task.done():
+        task.cancel()
+        await asyncio.wait({task}, timeout=retry_interval)
+    if not task.cancelled():
+        # 取出异常，避免 "exception was never retrieved" 警告
+        task.exception()
@@ -0,0 +1,145 @@
+# app/core/warmup.py - worker 启动预热（连接池、Redis、热点缓存）
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional, Sequence
+from urllib.parse import urlsplit
+
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+from starlette.requests import Request
+from starlette.types import ASGIApp
+
+from app.core.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# 预热请求带这个头，页面据此跳过阅读量统计等副作用
+WARMUP_HEADER = "x-warmup"
+
+WarmupStep = tuple[str, Callable[[], Awaitable[Any]]]
+
+
+@dataclass
+class WarmupState:
+    status: str = "pending"  # pending / running / ready / timeout / skipped
+    seconds: Optional[float] = None
+    steps: dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("ready", "timeout", "skipped")
+
+
+warmup_state = WarmupState()
+
+
+def is_warmup_request(request: Request) -> bool:
+    return request.headers.get(WARMUP_HEADER) == "1"
+
+
+async def prefill_db_pool(size: Optional[int] = None) -> int:
+    """同时打开 size 个连接并各执行一次查询，返回预热的连接数（NullPool 时为 0）"""
+    if isinstance(engine.pool, NullPool):
+        return 0
+    size = settings.DB_POOL_SIZE if size is None else size
+    async with AsyncExitStack() as stack:
+        connections = await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(size))
+        )
+        await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in connections))
+    return len(connections)
+
+
+async def asgi_get(app: ASGIApp, path: str) -> int:
+    """不经过网络直接向应用发起一次匿名 GET，返回状态码"""
+    base = urlsplit(settings.APP_BASE_URL)
+    target = urlsplit(path)
+    host = base.hostname or "localhost"
+    port = base.port or (443 if base.scheme == "https" else 80)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": base.scheme or "http",
+        "path": target.path,
+        "raw_path": target.path.encode(),
+        "query_string": target.query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", base.netloc.encode() or host.encode()),
+            (b"accept-encoding", b"gzip"),
+            (WARMUP_HEADER.encode(), b"1"),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": (host, port),
+    }
+    status = 0
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            return {"type": "http.disconnect"}
+        request_sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def prime_pages(app: ASGIApp, paths: Sequence[str]) -> dict[str, int]:
+    """依次请求页面，让页面缓存和查询路径变热"""
+    return {path: await asgi_get(app, path) for path in paths}
+
+
+async def run_warmup(steps: Sequence[WarmupStep], timeout: Optional[float] = None) -> WarmupState:
+    """
+    依次执行预热步骤并记录每一步的耗时
+
+    单个步骤失败只记录错误；总耗时超过 timeout 时放弃剩余步骤。
+    结束（完成或超时）后 warmup_state 才标记为可以接收流量
+    """
+    timeout = settings.WARMUP_TIMEOUT if timeout is None else timeout
+    warmup_state.status = "running"
+    warmup_state.steps = {}
+    started = time.perf_counter()
+
+    async def run_steps():
+        for name, step in steps:
+            step_started = time.perf_counter()
+            record: dict[str, Any] = {}
+            warmup_state.steps[name] = record
+            try:
+                record["result"] = await step()
+            except Exception as e:
+                record["error"] = str(e)
+                logger.warning(f"Warm-up step {name} failed: {e}")
+            record["seconds"] = round(time.perf_counter() - step_started, 3)
+            logger.info(f"Warm-up step {name} finished in {record['seconds'] * 1000:.0f}ms")
+
+    try:
+        await asyncio.wait_for(run_steps(), timeout)
+        warmup_state.status = "ready"
+    except asyncio.TimeoutError:
+        warmup_state.status = "timeout"
+        for record in warmup_state.steps.values():
+            if "seconds" not in record:
+                record["error"] = "timeout"
+        logger.warning(f"Warm-up timed out after {timeout}s, accepting traffic anyway")
+    warmup_state.seconds = round(time.perf_counter() - started, 3)
+    logger.info(f"Warm-up {warmup_state.status} in {warmup_state.seconds * 1000:.0f}ms")
+    return warmup_state
+
+
+def skip_warmup() -> None:
+    warmup_state.status = "skipped"
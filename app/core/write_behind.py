@@ -0,0 +1,255 @@
+# app/core/write_behind.py - 写回计数器（先聚合增量，再批量写入数据库）
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Iterable, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.cache import acquire_lease
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.tasks import cancel_task
+
+try:
+    from app.core.redis import get_redis_connection
+except ModuleNotFoundError:  # 未安装 redis 时只在进程内聚合
+    get_redis_connection = None
+
+logger = logging.getLogger(__name__)
+
+_registry: dict[str, "WriteBehindCounter"] = {}
+
+
+class WriteBehindCounter:
+    """
+    写回计数器（如文章阅读量）
+
+    incr 只把增量记到 Redis 哈希（HINCRBY，所有 worker 共享）或 Redis 不可用时的
+    进程内字典，不触碰数据库行；后台每 flush_interval 秒把累积的增量按 batch_size
+    分批交给 apply(db, {id: 增量})，一批一条 UPDATE。Redis 中待写入的哈希在写入前
+    先 RENAME 为 flushing 键，写入中断时下次优先重试它。pending / merge 用于展示时
+    叠加尚未写入的增量，attribute 为 merge 默认写入的属性（可用点号指向关联对象，如 counters.views）
+    """
+
+    def __init__(
+            self,
+            name: str,
+            apply: Callable[[AsyncSession, dict[int, int]], Awaitable[None]],
+            flush_interval: Optional[float] = None,
+            batch_size: Optional[int] = None,
+            attribute: str = "views",
+    ):
+        self.name = name
+        self.apply = apply
+        self.attribute = attribute
+        self.flush_interval = settings.WRITE_BEHIND_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.batch_size = settings.WRITE_BEHIND_BATCH_SIZE if batch_size is None else batch_size
+        self.pending_key = f"counters:{name}:pending"
+        self.flushing_key = f"counters:{name}:flushing"
+        self.since_key = f"counters:{name}:since"
+        self._local: dict[int, int] = {}
+        self._local_since: Optional[float] = None
+        self._inflight: dict[int, int] = {}
+        self._down_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.increments = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.flushed_total = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_flush_at: Optional[float] = None
+        self.last_flush_seconds: Optional[float] = None
+        self.last_batch_size = 0
+        self.last_lag_seconds: Optional[float] = None
+        _registry[name] = self
+
+    @property
+    def redis_available(self) -> bool:
+        return (
+            settings.CACHE_REDIS_ENABLED
+            and get_redis_connection is not None
+            and time.monotonic() >= self._down_until
+        )
+
+    def _mark_down(self, error: Exception) -> None:
+        if time.monotonic() >= self._down_until:
+            logger.warning(f"Counter {self.name} falling back to in-process buffer: {error}")
+        self._down_until = time.monotonic() + settings.CACHE_REDIS_RETRY_SECONDS
+
+    async def incr(self, id: int, amount: int = 1) -> None:
+        self.increments += amount
+        if self.redis_available:
+            try:
+                r = await get_redis_connection()
+                async with r.pipeline(transaction=False) as pipe:
+                    pipe.hincrby(self.pending_key, id, amount)
+                    pipe.set(self.since_key, time.time(), nx=True)
+                    await pipe.execute()
+                return
+            except Exception as e:
+                self._mark_down(e)
+        self._local[id] = self._local.get(id, 0) + amount
+        if self._local_since is None:
+            self._local_since = time.time()
+
+    async def pending(self, ids: Iterable[int]) -> dict[int, int]:
+        """尚未写入数据库的增量（本进程缓冲 + Redis 中待写入和正在写入的部分）"""
+        ids = list(dict.fromkeys(ids))
+        deltas = {id: self._local.get(id, 0) + self._inflight.get(id, 0) for id in ids}
+        if ids and self.redis_available:
+            try:
+                r = await get_redis_connection()
+                async with r.pipeline(transaction=False) as pipe:
+                    pipe.hmget(self.pending_key, ids)
+                    pipe.hmget(self.flushing_key, ids)
+                    results = await pipe.execute()
+                for values in results:
+                    for id, value in zip(ids, values):
+                        if value:
+                            deltas[id] += int(value)
+            except Exception as e:
+                self._mark_down(e)
+        return {id: delta for id, delta in deltas.items() if delta}
+
+    async def merge(self, objects: Iterable, attribute: Optional[str] = None) -> None:
+        """把尚未写入的增量叠加到已加载的 ORM 对象上（不标记为修改）"""
+        *path, attribute = (attribute or self.attribute).split(".")
+        objects = list(objects)
+        deltas = await self.pending(obj.id for obj in objects)
+        for obj in objects:
+            delta = deltas.get(obj.id)
+            target = obj
+            for name in path:
+                state = inspect(target, raiseerr=False)
+                if state is not None and name in state.unloaded:
+                    # 未加载的关联（如 lazy="raise"）不在这里触发加载，也就没有可叠加的值
+                    target = None
+                    break
+                target = getattr(target, name, None)
+            if delta and target is not None:
+                set_committed_value(target, attribute, (getattr(target, attribute) or 0) + delta)
+
+    async def _apply_batches(self, deltas: dict[int, int], on_applied: Callable[[dict[int, int]], Awaitable[None]]):
+        items = list(deltas.items())
+        for start in range(0, len(items), self.batch_size):
+            batch = dict(items[start:start + self.batch_size])
+            async with async_session() as db:
+                await self.apply(db, batch)
+                await db.commit()
+            await on_applied(batch)
+            self.last_batch_size = len(batch)
+            self.flushed_rows += len(batch)
+            self.flushed_total += sum(batch.values())
+
+    async def _flush_local(self) -> None:
+        if not self._local:
+            return
+        self._inflight, self._local = self._local, {}
+        since, self._local_since = self._local_since, None
+
+        async def applied(batch: dict[int, int]) -> None:
+            for id in batch:
+                self._inflight.pop(id, None)
+
+        try:
+            await self._apply_batches(dict(self._inflight), applied)
+        finally:
+            # 未写入的部分放回缓冲区，下次重试
+            for id, delta in self._inflight.items():
+                self._local[id] = self._local.get(id, 0) + delta
+            if self._inflight and self._local_since is None:
+                self._local_since = since
+            self._inflight = {}
+        if since is not None:
+            self.last_lag_seconds = round(time.time() - since, 3)
+
+    async def _flush_redis(self) -> None:
+        # 多个 worker 之间只由一个写入
+        if not await acquire_lease(f"counters:{self.name}:flush", max(self.flush_interval, 10)):
+            return
+        r = await get_redis_connection()
+        since = None
+        if not await r.exists(self.flushing_key):
+            if not await r.exists(self.pending_key):
+                return
+            async with r.pipeline(transaction=True) as pipe:
+                pipe.rename(self.pending_key, self.flushing_key)
+                pipe.get(self.since_key)
+                pipe.delete(self.since_key)
+                _, since, _ = await pipe.execute()
+        raw = await r.hgetall(self.flushing_key)
+        deltas = {int(id): int(delta) for id, delta in raw.items() if int(delta)}
+
+        async def applied(batch: dict[int, int]) -> None:
+            await r.hdel(self.flushing_key, *batch)
+
+        await self._apply_batches(deltas, applied)
+        await r.delete(self.flushing_key)
+        if since is not None:
+            self.last_lag_seconds = round(time.time() - float(since), 3)
+
+    async def flush(self) -> None:
+        """把累积的增量写入数据库；失败只记录，增量保留到下次"""
+        started = time.perf_counter()
+        try:
+            await self._flush_local()
+            if self.redis_available:
+                await self._flush_redis()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.warning(f"Counter {self.name} flush failed: {e}")
+            return
+        self.flushes += 1
+        self.last_flush_at = time.time()
+        self.last_flush_seconds = round(time.perf_counter() - started, 4)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        await cancel_task(self._task)
+        self._task = None
+        # 进程内缓冲的增量在退出前写入
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "backend": "redis" if self.redis_available else "memory",
+            "increments": self.increments,
+            "local_pending": sum(self._local.values()),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "flushed_total": self.flushed_total,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_at": self.last_flush_at,
+            "last_flush_seconds": self.last_flush_seconds,
+            "last_lag_seconds": self.last_lag_seconds,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+def counter_stats() -> list[dict]:
+    return [counter.stats() for counter in _registry.values()]
+
+
+async def start_counters() -> None:
+    for counter in _registry.values():
+        await counter.start()
+
+
+async def stop_counters() -> None:
+    for counter in _registry.values():
+        await counter.stop()
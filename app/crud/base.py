@@ -1,8 +1,15 @@
-from typing import Any, Generic, Optional, Type, TypeVar
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Generic, Optional, Sequence, Type, TypeVar
 
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
 
 ModelType = TypeVar("ModelType")
@@ -10,6 +17,62 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def upsert(db: AsyncSession, table):
+    """当前数据库方言的 INSERT（支持 on_conflict_do_nothing），table 可以是表或模型"""
+    return (pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert)(table)
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析（被篡改或与排序键不匹配）"""
+
+
+def _encode_key(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode_key(column, value: Any) -> Any:
+    python_type = column.type.python_type
+    if value is not None and python_type in (datetime, date):
+        return python_type.fromisoformat(value)
+    return value
+
+
+def encode_cursor(values: Sequence[Any], page: int) -> str:
+    """排序键的值和它所指向的页码编码为不透明的游标"""
+    payload = json.dumps({"k": [_encode_key(value) for value in values], "p": page}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence) -> tuple[list[Any], int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = payload["k"]
+        page = max(1, int(payload.get("p", 1)))
+        if len(values) != len(keys) or any(value is None for value in values):
+            raise ValueError("cursor does not match sort keys")
+        return [_decode_key(key, value) for key, value in zip(keys, values)], page
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise InvalidCursor(str(e)) from e
+
+
+@dataclass
+class KeysetPage(Generic[ModelType]):
+    items: list[ModelType]
+    page: int = 1
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
@@ -21,6 +84,60 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         result = await db.execute(select(self.model).offset(skip).limit(limit))
         return result.scalars().all()
 
+    async def paginate(
+        self,
+        db: AsyncSession,
+        query: Optional[Select] = None,
+        *,
+        keys: Sequence,
+        descending: bool = True,
+        limit: int = 20,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        page: int = 1,
+        offset: Optional[int] = None,
+    ) -> KeysetPage[ModelType]:
+        """
+        键集（游标）分页
+
+        keys 是模型上非空且组合唯一的列（如 ``(Post.published_at, Post.id)``），按同一方向排序；
+        after / before 为上一次结果中的 next_cursor / prev_cursor，用 ``(keys) < (游标值)``
+        定位而不是 OFFSET，翻到多深都只读取 limit + 1 行。不带游标时从 offset
+        （默认 ``(page - 1) * limit``）开始，用于代价不大的前几页页码跳转
+        """
+        query = select(self.model) if query is None else query
+        cursor = after or before
+        backwards = after is None and before is not None
+        if cursor is not None:
+            values, page = decode_cursor(cursor, keys)
+            row, bound = tuple_(*keys), tuple_(*(literal(value, key.type) for key, value in zip(keys, values)))
+            query = query.where(row < bound if descending != backwards else row > bound)
+        else:
+            offset = (page - 1) * limit if offset is None else offset
+            if offset:
+                query = query.offset(offset)
+        reverse = descending != backwards
+        query = query.order_by(None).order_by(*(key.desc() if reverse else key.asc() for key in keys))
+        items = list((await db.execute(query.limit(limit + 1))).scalars().unique().all())
+
+        more = len(items) > limit
+        items = items[:limit]
+        if backwards:
+            items.reverse()
+            has_prev, has_next = more, True
+        else:
+            has_prev, has_next = cursor is not None or bool(offset), more
+
+        def key_values(item) -> list[Any]:
+            return [getattr(item, key.key) for key in keys]
+
+        return KeysetPage(
+            items=items,
+            page=page,
+            next_cursor=encode_cursor(key_values(items[-1]), page + 1) if items and has_next else None,
+            prev_cursor=encode_cursor(key_values(items[0]), max(1, page - 1)) if items and has_prev else None,
+        )
+
     async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
         db_obj = self.model(**obj_in.model_dump())
         db.add(db_obj)
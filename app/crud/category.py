@@ -4,32 +4,20 @@ from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
+from app.crud.slugs import category_slug
 from app.models.category import Category
 from app.models.post import Post
 from app.schemas.category import CategoryCreate, CategoryUpdate
-from app.utils.slug import generate_slug
 
 
 class CRUDCategory(CRUDBase[Category, CategoryCreate, CategoryUpdate]):
     async def create(self, db: AsyncSession, *, obj_in: CategoryCreate) -> Category:
-        slug = await self._build_unique_slug(db, obj_in.name)
-        db_obj = Category(**obj_in.model_dump(), slug=slug)
-        db.add(db_obj)
+        db_obj = Category(**obj_in.model_dump())
+        await category_slug.assign(db, db_obj, obj_in.name)
         await db.commit()
         await db.refresh(db_obj)
         return db_obj
 
-    async def _build_unique_slug(self, db: AsyncSession, name: str) -> str:
-        base_slug = generate_slug(name)
-        slug = base_slug
-        suffix = 1
-        while True:
-            result = await db.execute(select(Category.id).where(Category.slug == slug))
-            if result.scalar_one_or_none() is None:
-                return slug
-            slug = f"{base_slug}-{suffix}"
-            suffix += 1
-
     async def get_by_slug(self, db: AsyncSession, *, slug: str) -> Optional[Category]:
         result = await db.execute(select(Category).where(Category.slug == slug))
         return result.scalar_one_or_none()
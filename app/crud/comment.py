@@ -6,7 +6,7 @@ from sqlalchemy.orm import selectinload
 
 from app.crud.base import CRUDBase
 from app.models.comment import COMMENT_STATUS_APPROVED, Comment
-from app.models.post import Post
+from app.models.post import PostCounter
 from app.schemas.comment import CommentCreate, CommentUpdate
 
 
@@ -20,12 +20,12 @@ class CRUDComment(CRUDBase[Comment, CommentCreate, CommentUpdate]):
     ) -> Comment:
         db_obj = Comment(**obj_in.model_dump(), author_id=author_id)
         db.add(db_obj)
-        post = await db.get(Post, obj_in.post_id)
-        if post is not None:
+        counters = await db.get(PostCounter, obj_in.post_id)
+        if counters is not None:
             result = await db.execute(
                 select(Comment.id).where(Comment.post_id == obj_in.post_id, Comment.moderation_status == COMMENT_STATUS_APPROVED)
             )
-            post.comment_count = len(result.scalars().all())
+            counters.comment_count = len(result.scalars().all())
         await db.commit()
         return await self.get_with_author(db, id=db_obj.id)
 
@@ -33,7 +33,7 @@ class CRUDComment(CRUDBase[Comment, CommentCreate, CommentUpdate]):
         result = await db.execute(
             select(Comment)
             .where(Comment.id == id)
-            .options(selectinload(Comment.author), selectinload(Comment.likes), selectinload(Comment.replies))
+            .options(selectinload(Comment.author), selectinload(Comment.replies))
         )
         return result.scalar_one_or_none()
 
@@ -58,7 +58,6 @@ class CRUDComment(CRUDBase[Comment, CommentCreate, CommentUpdate]):
         result = await db.execute(
             query.options(
                 selectinload(Comment.author),
-                selectinload(Comment.likes),
                 selectinload(Comment.replies).selectinload(Comment.author),
             )
             .order_by(Comment.created_at.desc())
@@ -103,9 +102,9 @@ class CRUDComment(CRUDBase[Comment, CommentCreate, CommentUpdate]):
         comment = await self.get(db, id=id)
         if comment is None:
             return None
-        post = await db.get(Post, comment.post_id)
-        if post is not None:
-            post.comment_count = max(0, post.comment_count - 1)
+        counters = await db.get(PostCounter, comment.post_id)
+        if counters is not None:
+            counters.comment_count = max(0, counters.comment_count - 1)
         await db.delete(comment)
         await db.commit()
         return comment
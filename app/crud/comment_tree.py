@@ -0,0 +1,202 @@
+# app/crud/comment_tree.py - 文章页的评论树（单条查询 + 内存组装）
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import Integer, func, literal, literal_column, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.base import decode_cursor, encode_cursor
+from app.models.comment import COMMENT_STATUS_APPROVED, Comment
+from app.models.like import CommentLike
+from app.models.user import User
+
+
+@dataclass
+class CommentAuthor:
+    id: int
+    username: str
+    full_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+
+
+@dataclass
+class CommentNode:
+    """展示用的评论（只含已通过审核的），字段与 schemas.comment.Comment 对齐"""
+
+    id: int
+    post_id: int
+    parent_id: Optional[int]
+    author_id: int
+    content: str
+    is_edited: bool
+    like_count: int
+    created_at: datetime
+    updated_at: datetime
+    author: CommentAuthor
+    depth: int = 0
+    reply_count: int = 0  # 已通过审核的直接回复总数（不只是已加载的）
+    replies: list["CommentNode"] = field(default_factory=list)
+    replies_cursor: Optional[str] = None  # 继续加载回复时作为 after 传回；为空且 has_more_replies 时从头加载
+    is_liked: bool = False
+    moderation_status: str = COMMENT_STATUS_APPROVED
+    is_approved: bool = True
+    is_visible: bool = True
+    is_pending: bool = False
+    is_hidden: bool = False
+
+    @property
+    def has_more_replies(self) -> bool:
+        return self.reply_count > len(self.replies)
+
+
+@dataclass
+class CommentThread:
+    comments: list[CommentNode]
+    next_cursor: Optional[str] = None
+
+    def walk(self) -> Iterator[CommentNode]:
+        stack = list(reversed(self.comments))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.replies))
+
+
+class CommentTreeLoader:
+    """
+    一条查询取出一页评论及其回复树
+
+    递归 CTE 从这一页的顶层评论（或某条评论的一页回复）出发，只沿已通过审核的回复向下走
+    max_depth 层；外层查询 JOIN 作者列，用窗口函数给每组兄弟回复编号，只保留每组前
+    replies_limit 条，并用相关子查询带出每条评论的回复总数。点赞数直接读
+    comments.like_count。结果按 (depth, created_at, id) 排序，父评论总在子评论之前，
+    组装成树只需一次遍历；被截掉的回复通过 replies_cursor 调用 load(parent_id=...) 继续加载。
+    顶层评论按时间倒序，回复按时间正序
+    """
+
+    keys = (Comment.created_at, Comment.id)
+
+    async def load(
+            self,
+            db: AsyncSession,
+            *,
+            post_id: int,
+            parent_id: Optional[int] = None,
+            after: Optional[str] = None,
+            limit: Optional[int] = None,
+            replies_limit: Optional[int] = None,
+            max_depth: Optional[int] = None,
+    ) -> CommentThread:
+        """after 无效时抛出 InvalidCursor"""
+        limit = limit or settings.COMMENT_PAGE_SIZE
+        replies_limit = settings.COMMENT_REPLIES_PAGE_SIZE if replies_limit is None else replies_limit
+        max_depth = settings.COMMENT_MAX_DEPTH if max_depth is None else max_depth
+        descending = parent_id is None
+
+        page = select(Comment.id).where(
+            Comment.post_id == post_id,
+            Comment.moderation_status == COMMENT_STATUS_APPROVED,
+            Comment.parent_id.is_(None) if parent_id is None else Comment.parent_id == parent_id,
+        )
+        if after is not None:
+            values, _ = decode_cursor(after, self.keys)
+            row = tuple_(*self.keys)
+            bound = tuple_(*(literal(value, key.type) for key, value in zip(self.keys, values)))
+            page = page.where(row < bound if descending else row > bound)
+        order = [key.desc() if descending else key.asc() for key in self.keys]
+        # 多取一条用来判断是否还有下一页；pos 随递归向下传递，多出的这条不展开回复
+        page = page.add_columns(func.row_number().over(order_by=order).label("pos")).order_by(*order)
+        page = page.limit(limit + 1).subquery("page")
+
+        columns = [
+            Comment.id, Comment.post_id, Comment.parent_id, Comment.author_id, Comment.content,
+            Comment.is_edited, Comment.like_count, Comment.created_at, Comment.updated_at,
+        ]
+        anchor = select(*columns, literal_column("0", Integer).label("depth"), page.c.pos).join(
+            page, page.c.id == Comment.id
+        )
+        thread = anchor.cte("thread", recursive=True)
+        reply = Comment.__table__.alias("reply")
+        thread = thread.union_all(
+            select(*(reply.c[column.key] for column in columns), thread.c.depth + 1, thread.c.pos)
+            .join(thread, reply.c.parent_id == thread.c.id)
+            .where(
+                reply.c.moderation_status == COMMENT_STATUS_APPROVED,
+                thread.c.depth < max_depth,
+                thread.c.pos <= limit,
+            )
+        )
+
+        replies = Comment.__table__.alias("replies")
+        reply_count = (
+            select(func.count())
+            .select_from(replies)
+            .where(replies.c.parent_id == thread.c.id, replies.c.moderation_status == COMMENT_STATUS_APPROVED)
+            .scalar_subquery()
+        )
+        ranked = select(
+            thread,
+            User.username,
+            User.full_name,
+            User.avatar_url,
+            reply_count.label("reply_count"),
+            func.row_number().over(
+                partition_by=thread.c.parent_id, order_by=(thread.c.created_at, thread.c.id)
+            ).label("sibling_rank"),
+        ).join(User, User.id == thread.c.author_id).subquery("ranked")
+        rows = (
+            await db.execute(
+                select(ranked)
+                .where(or_(ranked.c.depth == 0, ranked.c.sibling_rank <= replies_limit))
+                .order_by(ranked.c.depth, ranked.c.created_at, ranked.c.id)
+            )
+        ).mappings()
+
+        nodes: dict[int, CommentNode] = {}
+        roots: list[CommentNode] = []
+        for row in rows:
+            node = CommentNode(
+                **{column.key: row[column.key] for column in columns},
+                author=CommentAuthor(row["author_id"], row["username"], row["full_name"], row["avatar_url"]),
+                depth=row["depth"],
+                reply_count=row["reply_count"],
+            )
+            if node.depth == 0:
+                roots.append(node)
+                nodes[node.id] = node
+            elif (parent := nodes.get(node.parent_id)) is not None:
+                # 父评论被截掉时这条也不展示，随父评论的“加载更多回复”一起出现
+                parent.replies.append(node)
+                nodes[node.id] = node
+        if descending:
+            roots.reverse()
+
+        more = len(roots) > limit
+        roots = roots[:limit]
+        result = CommentThread(comments=roots, next_cursor=self._cursor(roots[-1]) if more else None)
+        for node in result.walk():
+            if node.replies and node.has_more_replies:
+                node.replies_cursor = self._cursor(node.replies[-1])
+        return result
+
+    async def mark_liked(self, db: AsyncSession, thread: CommentThread, user_id: int) -> None:
+        """一次查询标出当前用户点过赞的评论"""
+        nodes = {node.id: node for node in thread.walk()}
+        if not nodes:
+            return
+        result = await db.execute(
+            select(CommentLike.comment_id).where(
+                CommentLike.user_id == user_id,
+                CommentLike.comment_id.in_(list(nodes)),
+            )
+        )
+        for comment_id in result.scalars():
+            nodes[comment_id].is_liked = True
+
+    def _cursor(self, node: CommentNode) -> str:
+        return encode_cursor([node.created_at, node.id], 1)
+
+
+comment_tree = CommentTreeLoader()
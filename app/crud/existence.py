@@ -0,0 +1,18 @@
+# app/crud/existence.py - 各个唯一值列的 Bloom 存在性过滤器
+from app.core.bloom import ExistenceFilter
+from app.models.category import Category
+from app.models.post import Post
+from app.models.tag import Tag
+from app.models.user import User
+from app.utils.slug import generate_slug
+
+post_slugs = ExistenceFilter("post_slugs", Post.slug)
+# 旧数据的 slug 可能为空，页面访问时才按名称补全，所以预先放入将要生成的 slug
+category_slugs = ExistenceFilter(
+    "category_slugs", Category.slug, fallback=(Category.name, lambda name: generate_slug(name, max_length=100)),
+)
+tag_slugs = ExistenceFilter(
+    "tag_slugs", Tag.slug, fallback=(Tag.name, lambda name: generate_slug(name, max_length=255)),
+)
+usernames = ExistenceFilter("usernames", User.username)
+emails = ExistenceFilter("emails", User.email)
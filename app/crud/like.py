@@ -1,12 +1,127 @@
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Optional
+
+from sqlalchemy import and_, delete, func, literal, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, update
-from app.models.like import PostLike, CommentLike
-from app.models.post import Post
+
+from app.crud.base import upsert
 from app.models.comment import Comment
+from app.models.like import CommentLike, PostLike
+from app.models.post import PostCounter
+
+
+@dataclass
+class LikeResult:
+    liked: bool
+    changed: bool  # 这次请求是否真的新增 / 删除了点赞（重复点击为 False）
+    like_count: Optional[int]  # 被点赞的对象不存在时为 None
+
+
+class LikeEngine:
+    """
+    点赞 / 取消点赞的原子写入
+
+    点赞是一条 INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING（SELECT 同时确认目标存在），
+    取消是一条 DELETE ... RETURNING；只有真的插入 / 删除了行才把计数加减 1。PostgreSQL 上两步
+    合并成一条带 CTE 的语句，其他数据库在同一事务里紧接着执行条件 UPDATE ... RETURNING。
+    并发的重复点击由唯一约束去重，计数只在行上原子加减，不会丢失或重复计数；
+    counter 为空时计数直接 count(*) 点赞表。reconcile 用于核对冗余计数与点赞表是否一致
+    """
+
+    def __init__(self, model, target, parent_key, counter=None):
+        self.model = model
+        self.table = model.__table__
+        self.target = target
+        self.parent_key = parent_key
+        self.counter = counter
+
+    def _insert(self, db: AsyncSession, user_id: int, target_id: int):
+        now = literal(datetime.utcnow(), self.table.c.created_at.type)
+        rows = select(literal(user_id), self.parent_key, now, now).where(self.parent_key == target_id)
+        return (
+            upsert(db, self.table)
+            .from_select(["user_id", self.target.key, "created_at", "updated_at"], rows)
+            .on_conflict_do_nothing(index_elements=["user_id", self.target.key])
+            .returning(self.table.c[self.target.key])
+        )
+
+    def _delete(self, user_id: int, target_id: int):
+        return (
+            delete(self.table)
+            .where(self.table.c.user_id == user_id, self.table.c[self.target.key] == target_id)
+            .returning(self.table.c[self.target.key])
+        )
+
+    def _bump(self, delta: int):
+        values = {self.counter.key: self.counter + delta}
+        if "updated_at" in self.counter.table.c:
+            # 点赞不算内容修改，不触发 updated_at 的 onupdate
+            values["updated_at"] = self.counter.table.c.updated_at
+        return update(self.counter.table).values(values).returning(self.counter)
+
+    def _actual_count(self):
+        return select(func.count()).select_from(self.table).where(self.target == self.parent_key).scalar_subquery()
+
+    def _current_count(self, target_id: int):
+        count = self.counter if self.counter is not None else self._actual_count()
+        return select(count).where(self.parent_key == target_id)
+
+    async def _apply(self, db: AsyncSession, statement, delta: int, target_id: int) -> tuple[bool, Optional[int]]:
+        if self.counter is not None and db.bind.dialect.name == "postgresql":
+            # WITH changed AS (INSERT / DELETE ... RETURNING) UPDATE ... FROM changed RETURNING
+            changed = statement.cte("changed")
+            row = (
+                await db.execute(self._bump(delta).where(self.parent_key == changed.c[self.target.key]))
+            ).first()
+            if row is not None:
+                return True, row[0]
+        else:
+            if (await db.execute(statement)).first() is not None:
+                if self.counter is None:
+                    return True, (await db.execute(self._current_count(target_id))).scalar_one_or_none()
+                row = (await db.execute(self._bump(delta).where(self.parent_key == target_id))).first()
+                return True, row[0] if row is not None else None
+        # 重复点赞 / 本就未点赞，或者目标不存在
+        return False, (await db.execute(self._current_count(target_id))).scalar_one_or_none()
+
+    async def like(self, db: AsyncSession, *, user_id: int, target_id: int) -> LikeResult:
+        changed, count = await self._apply(db, self._insert(db, user_id, target_id), 1, target_id)
+        await db.commit()
+        return LikeResult(liked=count is not None, changed=changed, like_count=count)
+
+    async def unlike(self, db: AsyncSession, *, user_id: int, target_id: int) -> LikeResult:
+        changed, count = await self._apply(db, self._delete(user_id, target_id), -1, target_id)
+        await db.commit()
+        return LikeResult(liked=False, changed=changed, like_count=count)
+
+    async def reconcile(self, db: AsyncSession, *, fix: bool = False, limit: int = 1000) -> list[dict]:
+        """
+        找出冗余计数与点赞表实际行数不一致的对象（最多 limit 个）
+
+        fix 为 True 时把这些计数改回实际值并提交；返回 [{"id", "stored", "actual"}]
+        """
+        actual = self._actual_count()
+        rows = (
+            await db.execute(
+                select(self.parent_key, self.counter, actual).where(self.counter != actual).limit(limit)
+            )
+        ).all()
+        drift = [{"id": id, "stored": stored, "actual": count} for id, stored, count in rows]
+        if fix and drift:
+            values = {self.counter.key: actual}
+            if "updated_at" in self.counter.table.c:
+                values["updated_at"] = self.counter.table.c.updated_at
+            await db.execute(
+                update(self.counter.table).where(self.parent_key.in_([item["id"] for item in drift])).values(values)
+            )
+            await db.commit()
+        return drift
 
 
 class CRUDPostLike:
+    engine = LikeEngine(PostLike, PostLike.post_id, PostCounter.post_id, PostCounter.like_count)
+
     async def get(
             self,
             db: AsyncSession,
@@ -23,32 +138,21 @@ class CRUDPostLike:
         result = await db.execute(query)
         return result.scalar_one_or_none()
 
+    async def like(self, db: AsyncSession, *, user_id: int, post_id: int) -> LikeResult:
+        return await self.engine.like(db, user_id=user_id, target_id=post_id)
+
+    async def unlike(self, db: AsyncSession, *, user_id: int, post_id: int) -> LikeResult:
+        return await self.engine.unlike(db, user_id=user_id, target_id=post_id)
+
     async def create(
             self,
             db: AsyncSession,
             *,
             user_id: int,
             post_id: int
-    ) -> PostLike:
-        # 检查是否已经点赞
-        existing = await self.get(db, user_id=user_id, post_id=post_id)
-        if existing:
-            return existing
-
-        # 创建点赞记录
-        db_obj = PostLike(user_id=user_id, post_id=post_id)
-        db.add(db_obj)
-
-        # 更新文章点赞数
-        await db.execute(
-            update(Post)
-            .where(Post.id == post_id)
-            .values(like_count=Post.like_count + 1)
-        )
-
-        await db.commit()
-        await db.refresh(db_obj)
-        return db_obj
+    ) -> Optional[PostLike]:
+        await self.like(db, user_id=user_id, post_id=post_id)
+        return await self.get(db, user_id=user_id, post_id=post_id)
 
     async def remove(
             self,
@@ -57,23 +161,7 @@ class CRUDPostLike:
             user_id: int,
             post_id: int
     ) -> bool:
-        # 查找点赞记录
-        like = await self.get(db, user_id=user_id, post_id=post_id)
-        if not like:
-            return False
-
-        # 删除点赞记录
-        await db.delete(like)
-
-        # 更新文章点赞数
-        await db.execute(
-            update(Post)
-            .where(Post.id == post_id)
-            .values(like_count=Post.like_count - 1)
-        )
-
-        await db.commit()
-        return True
+        return (await self.unlike(db, user_id=user_id, post_id=post_id)).changed
 
     async def check_liked(
             self,
@@ -87,6 +175,8 @@ class CRUDPostLike:
 
 
 class CRUDCommentLike:
+    engine = LikeEngine(CommentLike, CommentLike.comment_id, Comment.id, Comment.like_count)
+
     async def get(
             self,
             db: AsyncSession,
@@ -103,24 +193,21 @@ class CRUDCommentLike:
         result = await db.execute(query)
         return result.scalar_one_or_none()
 
+    async def like(self, db: AsyncSession, *, user_id: int, comment_id: int) -> LikeResult:
+        return await self.engine.like(db, user_id=user_id, target_id=comment_id)
+
+    async def unlike(self, db: AsyncSession, *, user_id: int, comment_id: int) -> LikeResult:
+        return await self.engine.unlike(db, user_id=user_id, target_id=comment_id)
+
     async def create(
             self,
             db: AsyncSession,
             *,
             user_id: int,
             comment_id: int
-    ) -> CommentLike:
-        # 检查是否已经点赞
-        existing = await self.get(db, user_id=user_id, comment_id=comment_id)
-        if existing:
-            return existing
-
-        # 创建点赞记录
-        db_obj = CommentLike(user_id=user_id, comment_id=comment_id)
-        db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
-        return db_obj
+    ) -> Optional[CommentLike]:
+        await self.like(db, user_id=user_id, comment_id=comment_id)
+        return await self.get(db, user_id=user_id, comment_id=comment_id)
 
     async def remove(
             self,
@@ -129,15 +216,7 @@ class CRUDCommentLike:
             user_id: int,
             comment_id: int
     ) -> bool:
-        # 查找点赞记录
-        like = await self.get(db, user_id=user_id, comment_id=comment_id)
-        if not like:
-            return False
-
-        # 删除点赞记录
-        await db.delete(like)
-        await db.commit()
-        return True
+        return (await self.unlike(db, user_id=user_id, comment_id=comment_id)).changed
 
     async def check_liked(
             self,
@@ -1,45 +1,68 @@
 from datetime import datetime
 from typing import Any, Optional
 
-from sqlalchemy import func, select
+from sqlalchemy import Integer, case, column, func, select, update, values
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import contains_eager, selectinload
 
+from app.core.write_behind import WriteBehindCounter
 from app.crud.base import CRUDBase
+from app.crud.slugs import post_slug
+from app.crud.tag import crud_tag
 from app.models.like import PostLike
-from app.models.post import Post
+from app.models.post import Post, PostCounter
 from app.models.tag import Tag
 from app.schemas.post import PostCreate, PostUpdate
-from app.utils.slug import generate_slug
 
+# 键集分页的排序键与方向；已发布文章的 published_at 一定非空，草稿按 created_at 排
+POST_SORTS = {
+    "newest": ((Post.published_at, Post.id), True),
+    "oldest": ((Post.published_at, Post.id), False),
+    "popular": ((PostCounter.views, Post.id), True),
+}
+
+# 热门程度：阅读 + 点赞 * 2 + 评论 * 3（需要 JOIN post_counters）
+popularity = PostCounter.views + PostCounter.like_count * 2 + PostCounter.comment_count * 3
+
+
+def counters_version(*criteria) -> list:
+    """
+    文章点赞数、评论数合计的标量子查询，作为列表页的版本信号
+
+    计数在 post_counters 中更新，不会改动 posts.updated_at，只看 table_version(Post) 会漏掉这类变化
+    """
+    return [
+        select(func.coalesce(func.sum(getattr(PostCounter, name)), 0))
+        .join(Post, Post.id == PostCounter.post_id)
+        .where(*criteria)
+        .scalar_subquery()
+        for name in ("like_count", "comment_count")
+    ]
+
+
+def post_sort_keys(sort: str, published: Optional[bool] = True) -> tuple[tuple, bool]:
+    keys, descending = POST_SORTS[sort]
+    if published is not True and keys[0] is Post.published_at:
+        keys = (Post.created_at, Post.id)
+    return keys, descending
 
-class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
-    async def _build_unique_slug(self, db: AsyncSession, title: str, requested_slug: Optional[str] = None) -> str:
-        base_slug = requested_slug or generate_slug(title, max_length=200)
-        slug = base_slug
-        suffix = 1
-        while True:
-            result = await db.execute(select(Post.id).where(Post.slug == slug))
-            if result.scalar_one_or_none() is None:
-                return slug
-            slug = f"{base_slug}-{suffix}"
-            suffix += 1
-
-    async def _resolve_tags(self, db: AsyncSession, tag_names: list[str]) -> list[Tag]:
-        tags: list[Tag] = []
-        for raw_name in tag_names:
-            name = raw_name.strip().lower()
-            if not name:
-                continue
-            result = await db.execute(select(Tag).where(func.lower(Tag.name) == name))
-            tag = result.scalars().first()
-            if tag is None:
-                tag = Tag(name=name, slug=generate_slug(name, max_length=255))
-                db.add(tag)
-                await db.flush()
-            tags.append(tag)
-        return tags
 
+def join_counters(query):
+    """文章查询显式 JOIN post_counters（按计数排序 / 筛选时用），并用这次 JOIN 填充 post.counters"""
+    return query.join(Post.counters).options(contains_eager(Post.counters))
+
+
+def with_counters(query):
+    """展示计数但不按计数排序的文章查询：用一次 IN 查询加载 post.counters，不给主查询加 JOIN"""
+    return query.options(selectinload(Post.counters))
+
+
+def sort_posts_query(query, sort: str):
+    """按计数排序时 JOIN post_counters，否则单独加载计数"""
+    return join_counters(query) if POST_SORTS[sort][0][0] is PostCounter.views else with_counters(query)
+
+
+class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
     async def create_with_author(
         self,
         db: AsyncSession,
@@ -47,23 +70,20 @@ class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
         obj_in: PostCreate,
         author_id: int,
     ) -> Post:
-        slug = await self._build_unique_slug(db, obj_in.title, obj_in.slug)
         db_obj = Post(
             **obj_in.model_dump(exclude={"tags", "slug"}),
-            slug=slug,
             author_id=author_id,
             published_at=datetime.utcnow() if obj_in.published else None,
         )
-        db.add(db_obj)
-        await db.flush()
-        db_obj.tags = await self._resolve_tags(db, obj_in.tags)
+        await post_slug.assign(db, db_obj, obj_in.title, requested=obj_in.slug)
+        db_obj.tags = await crud_tag.resolve(db, obj_in.tags)
         await db.commit()
         return await self.get_by_id_with_relations(db, post_id=db_obj.id)
 
     async def update_with_tags(self, db: AsyncSession, *, db_obj: Post, obj_in: PostUpdate) -> Post:
         update_data = obj_in.model_dump(exclude_unset=True, exclude={"tags"})
         if "title" in update_data and "slug" not in update_data:
-            db_obj.slug = await self._build_unique_slug(db, update_data["title"])
+            await post_slug.assign(db, db_obj, update_data["title"])
         if "slug" in update_data and update_data["slug"]:
             db_obj.slug = update_data.pop("slug")
 
@@ -74,7 +94,7 @@ class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
             db_obj.published_at = datetime.utcnow()
 
         if obj_in.tags is not None:
-            db_obj.tags = await self._resolve_tags(db, obj_in.tags)
+            db_obj.tags = await crud_tag.resolve(db, obj_in.tags)
 
         await db.commit()
         return await self.get_by_id_with_relations(db, post_id=db_obj.id)
@@ -83,7 +103,12 @@ class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
         result = await db.execute(
             select(Post)
             .where(Post.id == post_id)
-            .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
+            .options(
+                selectinload(Post.author),
+                selectinload(Post.category),
+                selectinload(Post.tags),
+                selectinload(Post.counters),
+            )
         )
         return result.scalar_one_or_none()
 
@@ -97,7 +122,12 @@ class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
         result = await db.execute(
             select(Post)
             .where(Post.slug == slug)
-            .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
+            .options(
+                selectinload(Post.author),
+                selectinload(Post.category),
+                selectinload(Post.tags),
+                selectinload(Post.counters),
+            )
         )
         post = result.scalar_one_or_none()
         if post and current_user_id:
@@ -122,7 +152,12 @@ class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
         query = (
             select(Post)
             .where(Post.published == True)
-            .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
+            .options(
+                selectinload(Post.author),
+                selectinload(Post.category),
+                selectinload(Post.tags),
+                selectinload(Post.counters),
+            )
         )
         if category_id:
             query = query.where(Post.category_id == category_id)
@@ -157,7 +192,12 @@ class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
         result = await db.execute(
             select(Post)
             .where(Post.published == True, Post.is_featured == True)
-            .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
+            .options(
+                selectinload(Post.author),
+                selectinload(Post.category),
+                selectinload(Post.tags),
+                selectinload(Post.counters),
+            )
             .order_by(Post.published_at.desc().nullslast())
             .limit(limit)
         )
@@ -165,19 +205,34 @@ class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
 
     async def get_popular(self, db: AsyncSession, *, limit: int = 10, days: int = 7) -> list[Post]:
         result = await db.execute(
-            select(Post)
+            join_counters(select(Post))
             .where(Post.published == True)
             .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
-            .order_by((Post.views + Post.like_count * 2 + Post.comment_count * 3).desc())
+            .order_by(popularity.desc())
             .limit(limit)
         )
         return result.scalars().all()
 
     async def increment_view_count(self, db: AsyncSession, *, post_id: int) -> None:
-        post = await db.get(Post, post_id)
-        if post is not None:
-            post.views += 1
-            await db.commit()
+        await post_views.incr(post_id)
+
+    async def apply_view_deltas(self, db: AsyncSession, deltas: dict[int, int]) -> None:
+        """一条 UPDATE 把一批阅读量增量加到 post_counters 上（posts 行与 updated_at 不受影响）"""
+        if db.bind.dialect.name == "postgresql":
+            # UPDATE post_counters SET views = views + v.delta FROM (VALUES ...) AS v (id, delta) WHERE post_id = v.id
+            batch = values(column("id", Integer), column("delta", Integer), name="view_deltas").data(list(deltas.items()))
+            statement = (
+                update(PostCounter)
+                .where(PostCounter.post_id == batch.c.id)
+                .values(views=PostCounter.views + batch.c.delta)
+            )
+        else:
+            statement = (
+                update(PostCounter)
+                .where(PostCounter.post_id.in_(list(deltas)))
+                .values(views=PostCounter.views + case(deltas, value=PostCounter.post_id, else_=0))
+            )
+        await db.execute(statement)
 
     async def get_stats(self, db: AsyncSession, *, author_id: Optional[int] = None) -> dict[str, Any]:
         query = select(Post)
@@ -191,17 +246,14 @@ class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
         draft_result = await db.execute(
             select(func.count()).select_from(query.where(Post.published == False).subquery())
         )
-        stats_result = await db.execute(
-            select(
-                func.coalesce(func.sum(Post.views), 0),
-                func.coalesce(func.sum(Post.like_count), 0),
-                func.coalesce(func.sum(Post.comment_count), 0),
-            ).where(Post.author_id == author_id) if author_id else select(
-                func.coalesce(func.sum(Post.views), 0),
-                func.coalesce(func.sum(Post.like_count), 0),
-                func.coalesce(func.sum(Post.comment_count), 0),
-            )
+        stats_query = select(
+            func.coalesce(func.sum(PostCounter.views), 0),
+            func.coalesce(func.sum(PostCounter.like_count), 0),
+            func.coalesce(func.sum(PostCounter.comment_count), 0),
         )
+        if author_id:
+            stats_query = stats_query.join(Post, Post.id == PostCounter.post_id).where(Post.author_id == author_id)
+        stats_result = await db.execute(stats_query)
         stats = stats_result.first()
         return {
             "total_posts": total_result.scalar() or 0,
@@ -214,3 +266,4 @@ class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
 
 
 post = CRUDPost(Post)
+post_views = WriteBehindCounter("post_views", post.apply_view_deltas, attribute="counters.views")
@@ -0,0 +1,115 @@
+# app/crud/slugs.py - 唯一 slug 的分配（文章 / 标签 / 分类共用）
+import re
+from typing import Iterable, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.category import Category
+from app.models.post import Post
+from app.models.tag import Tag
+from app.utils.slug import generate_slug
+
+
+class SlugAllocator:
+    """
+    为某个模型的 slug 列分配不重复的值
+
+    slug 由 generate_slug 生成，被占用时依次尝试 base-1、base-2 ……；所有可能冲突的 slug
+    （等于 base 或以 "base-" 开头）用一条查询取回，空闲后缀在内存中计算，
+    不再每个后缀查一次。assign 写入时若与并发事务撞车（唯一约束冲突）会重新分配
+    """
+
+    def __init__(self, model, max_length: int, retries: int = 3):
+        self.model = model
+        self.column = model.slug
+        self.max_length = max_length
+        self.retries = retries
+
+    def base(self, text: str, requested: Optional[str] = None) -> str:
+        return requested or generate_slug(text, max_length=self.max_length) or self.model.__name__.lower()
+
+    async def taken(self, db: AsyncSession, bases: Iterable[str], exclude_id: Optional[int] = None) -> set[str]:
+        """与这些 base 可能冲突的已有 slug（一条查询）"""
+        bases = list(dict.fromkeys(bases))
+        if not bases:
+            return set()
+        query = select(self.column).where(
+            or_(
+                self.column.in_(bases),
+                *(self.column.like(f"{_escape_like(base)}-%", escape="\\") for base in bases),
+            )
+        )
+        if exclude_id is not None:
+            query = query.where(self.model.id != exclude_id)
+        return set((await db.execute(query)).scalars())
+
+    @staticmethod
+    def next_free(base: str, taken: set[str]) -> str:
+        if base not in taken:
+            return base
+        pattern = re.compile(rf"{re.escape(base)}-(\d+)")
+        used = {int(match.group(1)) for slug in taken if (match := pattern.fullmatch(slug))}
+        suffix = 1
+        while suffix in used:
+            suffix += 1
+        return f"{base}-{suffix}"
+
+    async def allocate(
+            self,
+            db: AsyncSession,
+            text: str,
+            *,
+            requested: Optional[str] = None,
+            exclude_id: Optional[int] = None,
+    ) -> str:
+        base = self.base(text, requested)
+        return self.next_free(base, await self.taken(db, [base], exclude_id))
+
+    async def allocate_many(self, db: AsyncSession, texts: Iterable[str]) -> list[str]:
+        """批量分配（如导入）：所有 base 一次查询，批内彼此也不重复"""
+        bases = [self.base(text) for text in texts]
+        taken = await self.taken(db, bases)
+        slugs = []
+        for base in bases:
+            slug = self.next_free(base, taken)
+            taken.add(slug)
+            slugs.append(slug)
+        return slugs
+
+    async def assign(self, db: AsyncSession, obj, text: str, *, requested: Optional[str] = None) -> str:
+        """
+        给 obj 分配 slug，并把它（新对象会先加入会话）在保存点内 flush
+
+        另一个事务恰好先写入了同一个 slug 时，回滚保存点后重新分配；
+        其他原因的唯一约束冲突（或重试用尽）照常抛出
+        """
+        for attempt in range(self.retries + 1):
+            slug = await self.allocate(db, text, requested=requested, exclude_id=obj.id)
+            try:
+                # begin_nested 会先 flush 之前的改动，slug 要在保存点开始之后再写入
+                async with db.begin_nested():
+                    obj.slug = slug
+                    db.add(obj)
+                    await db.flush()
+                return slug
+            except IntegrityError:
+                if attempt == self.retries or not await self._clashes(db, slug, obj.id):
+                    raise
+        return slug
+
+    async def _clashes(self, db: AsyncSession, slug: str, exclude_id: Optional[int]) -> bool:
+        query = select(self.model.id).where(self.column == slug)
+        if exclude_id is not None:
+            query = query.where(self.model.id != exclude_id)
+        return (await db.execute(query.limit(1))).first() is not None
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+post_slug = SlugAllocator(Post, max_length=200)
+tag_slug = SlugAllocator(Tag, max_length=255)
+category_slug = SlugAllocator(Category, max_length=100)
@@ -1,27 +1,16 @@
-from typing import Optional
+from typing import Iterable, Optional
 
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, upsert
+from app.crud.slugs import tag_slug
 from app.models.post import Post
 from app.models.tag import Tag, post_tag
 from app.schemas.tag import TagCreate, TagUpdate
-from app.utils.slug import generate_slug
 
 
 class CRUDTag(CRUDBase[Tag, TagCreate, TagUpdate]):
-    async def _build_unique_slug(self, db: AsyncSession, name: str) -> str:
-        base_slug = generate_slug(name, max_length=255)
-        slug = base_slug
-        suffix = 1
-        while True:
-            result = await db.execute(select(Tag.id).where(Tag.slug == slug))
-            if result.scalar_one_or_none() is None:
-                return slug
-            slug = f"{base_slug}-{suffix}"
-            suffix += 1
-
     async def get_by_name(self, db: AsyncSession, *, name: str) -> Optional[Tag]:
         result = await db.execute(select(Tag).where(func.lower(Tag.name) == func.lower(name)))
         return result.scalar_one_or_none()
@@ -31,8 +20,8 @@ class CRUDTag(CRUDBase[Tag, TagCreate, TagUpdate]):
         return result.scalar_one_or_none()
 
     async def create(self, db: AsyncSession, *, obj_in: TagCreate) -> Tag:
-        db_obj = Tag(name=obj_in.name, slug=await self._build_unique_slug(db, obj_in.name))
-        db.add(db_obj)
+        db_obj = Tag(name=obj_in.name)
+        await tag_slug.assign(db, db_obj, obj_in.name)
         await db.commit()
         await db.refresh(db_obj)
         return db_obj
@@ -43,10 +32,43 @@ class CRUDTag(CRUDBase[Tag, TagCreate, TagUpdate]):
             return tag
         return await self.create(db, obj_in=TagCreate(name=name))
 
+    async def _insert_missing(self, db: AsyncSession, rows: list[dict]) -> None:
+        if rows:
+            # 与其他事务同时创建同名 / 同 slug 的标签时不报错，冲突的行交给调用方重新读取
+            await db.execute(upsert(db, Tag).on_conflict_do_nothing(), rows)
+
+    async def resolve(self, db: AsyncSession, names: Iterable[str]) -> list[Tag]:
+        """
+        把文章提交的标签名解析为 Tag，不存在的就创建（按去重后的输入顺序返回）
+
+        名称统一为去掉首尾空白的小写；已有标签一条 lower(name) IN (...) 查出（走 ix_tags_name_lower），
+        缺少的一条 INSERT ... ON CONFLICT DO NOTHING 批量插入后再读回。两个编辑同时创建同一个标签时，
+        后到的一方插入被忽略，读回时拿到对方的行；slug 与其他名称撞车的标签再批量分配带后缀的 slug
+        """
+        normalized = list(dict.fromkeys(name.strip().lower() for name in names if name and name.strip()))
+        if not normalized:
+            return []
+
+        async def load(wanted: list[str]) -> dict[str, Tag]:
+            result = await db.execute(select(Tag).where(func.lower(Tag.name).in_(wanted)))
+            return {tag.name.lower(): tag for tag in result.scalars()}
+
+        found = await load(normalized)
+        missing = [name for name in normalized if name not in found]
+        if missing:
+            await self._insert_missing(db, [{"name": name, "slug": tag_slug.base(name)} for name in missing])
+            found.update(await load(missing))
+            missing = [name for name in missing if name not in found]
+        if missing:
+            slugs = await tag_slug.allocate_many(db, missing)
+            await self._insert_missing(db, [{"name": name, "slug": slug} for name, slug in zip(missing, slugs)])
+            found.update(await load(missing))
+        return [found[name] for name in normalized if name in found]
+
     async def update(self, db: AsyncSession, *, db_obj: Tag, obj_in: TagUpdate) -> Tag:
         if obj_in.name is not None and obj_in.name != db_obj.name:
             db_obj.name = obj_in.name
-            db_obj.slug = await self._build_unique_slug(db, obj_in.name)
+            await tag_slug.assign(db, db_obj, obj_in.name)
         await db.commit()
         await db.refresh(db_obj)
         return db_obj
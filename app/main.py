@@ -6,10 +6,11 @@ from pathlib import Path
 from typing import Optional, Any
 import math
 import logging
+from urllib.parse import urlencode
 from xml.sax.saxutils import escape as xml_escape
 
 from fastapi import FastAPI, Request, Depends, Query, HTTPException, status, Response, Cookie
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
@@ -24,21 +25,38 @@ from jose import JWTError
 from markdown import markdown as render_markdown
 from markupsafe import Markup
 
+from app.core.bloom import bloom_refresher
+from app.core.cache import cache_manager
+from app.core.conditional import Validators, conditional, fetch_validators, table_version, validators_from
+from app.core.counts import count_rows
+from app.core.page_cache import cache_page
+from app.core.snapshot import Snapshot, start_snapshots, stop_snapshots
+from app.core.write_behind import start_counters, stop_counters
+from app.core.warmup import is_warmup_request, prefill_db_pool, prime_pages, run_warmup, skip_warmup, warmup_state
 from app.core.config import settings
-from app.core.database import get_db, async_session  # async_session 是 sessionmaker 实例
+from app.core.database import get_db, async_session, replica_router  # async_session 是 sessionmaker 实例
 from app.core.logging import setup_logging
-from app.api.v1 import auth, comments, posts, users, categories, tags
+from app.api.v1 import auth, cache, comments, posts, users, categories, tags
+from app.crud.base import InvalidCursor, KeysetPage
+from app.crud.comment_tree import comment_tree
+from app.crud.existence import category_slugs, post_slugs, tag_slugs, usernames
+from app.crud.post import (
+    counters_version, join_counters, popularity, post as crud_post, post_sort_keys, post_views, sort_posts_query,
+    with_counters,
+)
+from app.crud.slugs import category_slug, tag_slug
 from app.models import import_all
 from app.models.comment import COMMENT_STATUS_APPROVED, COMMENT_STATUS_HIDDEN, COMMENT_STATUS_PENDING
 from app.models.like import PostLike
+from app.models.post import PostCounter
 from app.core.security import decode_access_token, decode_post_preview_token, get_password_hash
 from app.core.middleware import (
     SecurityHeadersMiddleware,
     RateLimitContextMiddleware,
     log_requests,
     add_process_time_header,
+    primary_after_write,
 )
-from app.utils.slug import generate_slug
 
 # 设置日志
 setup_logging()
@@ -49,12 +67,12 @@ User, Category, Tag, Post, post_tag, Comment = import_all()
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI):
+async def lifespan(application: FastAPI):
     logger.info(f"Starting {settings.PROJECT_NAME}")
     try:
-        from app.core.redis import get_redis_connection
+        from app.core.redis import init_redis
 
-        redis = await get_redis_connection()
+        redis = await init_redis()
         await redis.ping()
         logger.info("Redis connection successful")
     except ModuleNotFoundError as e:
@@ -62,8 +80,31 @@ async def lifespan(_: FastAPI):
     except Exception as e:
         logger.error(f"Redis connection failed: {e}")
 
+    await cache_manager.start()
+    await replica_router.start()
+    await start_snapshots()
+    await start_counters()
+    await bloom_refresher.start()
+
+    # 预热完成（或超时）之后 worker 才开始接收请求
+    if settings.warmup_enabled:
+        await run_warmup(build_warmup_steps(application))
+    else:
+        skip_warmup()
+
     yield
 
+    await bloom_refresher.stop()
+    await stop_counters()
+    await stop_snapshots()
+    await replica_router.stop()
+    await cache_manager.stop()
+    try:
+        from app.core.redis import close_redis
+
+        await close_redis()
+    except ModuleNotFoundError:
+        pass
     logger.info(f"Shutting down {settings.PROJECT_NAME}")
 
 # 创建应用
@@ -94,6 +135,7 @@ app.add_middleware(
 # 自定义中间件
 app.middleware("http")(log_requests)
 app.middleware("http")(add_process_time_header)
+app.middleware("http")(primary_after_write)
 
 # 设置静态文件
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -135,9 +177,20 @@ def excerpt_filter(value: Optional[str], length: int = 180) -> str:
     return plain_text[:length].rsplit(" ", 1)[0] + "..."
 
 
+_PAGINATION_PARAMS = ("page", "after", "before")
+
+
+def page_url(request: Request, **params: Any) -> str:
+    """当前页面换一页的链接：保留筛选条件，替换 page / after / before"""
+    query = [(name, value) for name, value in request.query_params.multi_items() if name not in _PAGINATION_PARAMS]
+    query.extend((name, value) for name, value in params.items() if value is not None and (name, value) != ("page", 1))
+    return f"{request.url.path}?{urlencode(query)}" if query else request.url.path
+
+
 templates.env.filters["markdown"] = markdown_filter
 templates.env.filters["excerpt"] = excerpt_filter
 templates.env.globals["static_asset"] = static_asset
+templates.env.globals["page_url"] = page_url
 
 # 注册API路由 - 统一使用 API 版本前缀
 api_v1_routers = [
@@ -147,6 +200,7 @@ api_v1_routers = [
     (comments.router, "comments", ["评论"]),
     (categories.router, "categories", ["分类"]),
     (tags.router, "tags", ["标签"]),
+    (cache.router, "cache", ["缓存"]),
 ]
 
 
@@ -169,6 +223,18 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """就绪检查：启动预热结束（完成或超时）后返回 200，附带各步骤耗时"""
+    payload = {
+        "status": "ready" if warmup_state.finished else "starting",
+        "warmup": warmup_state.status,
+        "warmup_seconds": warmup_state.seconds,
+        "steps": warmup_state.steps,
+    }
+    return JSONResponse(payload, status_code=200 if warmup_state.finished else 503)
+
+
 # --- 认证依赖函数 ---
 async def get_dashboard_user(
         request: Request,
@@ -279,11 +345,11 @@ async def get_current_user_optional(request: Request) -> Optional[User]:
         return None
 
 
-async def update_post_views(db: AsyncSession, post: Post):
-    """异步更新文章阅读量"""
-    post.views = (post.views or 0) + 1
-    await db.flush()
-    await db.commit()
+async def count_cached_post_view(meta: dict) -> None:
+    """整页缓存命中时仍然记录文章阅读量"""
+    post_id = meta.get("post_id")
+    if post_id is not None:
+        await post_views.incr(post_id)
 
 
 def serialize_category_counts(rows: list[tuple[Category, int]]) -> list[dict[str, Any]]:
@@ -322,110 +388,164 @@ def build_absolute_url(path: str) -> str:
 async def ensure_category_slug(db: AsyncSession, category: Category) -> str:
     if category.slug:
         return category.slug
-
-    base_slug = generate_slug(category.name, max_length=100)
-    slug = base_slug
-    suffix = 1
-    while True:
-        result = await db.execute(select(Category.id).where(Category.slug == slug, Category.id != category.id))
-        if result.scalar_one_or_none() is None:
-            category.slug = slug
-            await db.flush()
-            return slug
-        slug = f"{base_slug}-{suffix}"
-        suffix += 1
+    return await category_slug.assign(db, category, category.name)
 
 
 async def ensure_tag_slug(db: AsyncSession, tag: Tag) -> str:
     if tag.slug:
         return tag.slug
+    return await tag_slug.assign(db, tag, tag.name)
 
-    base_slug = generate_slug(tag.name, max_length=255)
-    slug = base_slug
-    suffix = 1
-    while True:
-        result = await db.execute(select(Tag.id).where(Tag.slug == slug, Tag.id != tag.id))
-        if result.scalar_one_or_none() is None:
-            tag.slug = slug
-            await db.flush()
-            return slug
-        slug = f"{base_slug}-{suffix}"
-        suffix += 1
-
-
-async def get_sidebar_data(db: AsyncSession) -> dict:
-    """获取侧边栏数据"""
-    try:
-        cat_query = (
-            select(Category, func.count(Post.id).label("post_count"))
-            .outerjoin(Post, and_(Category.id == Post.category_id, Post.published == True))
-            .group_by(Category.id)
-            .order_by(func.count(Post.id).desc(), Category.name.asc())
-        )
-        cat_result = await db.execute(cat_query)
-        categories = cat_result.all()
-
-        tag_query = (
-            select(Tag, func.count(Post.id).label("post_count"))
-            .outerjoin(post_tag, Tag.id == post_tag.c.tag_id)
-            .outerjoin(Post, and_(post_tag.c.post_id == Post.id, Post.published == True))
-            .group_by(Tag.id)
-            .order_by(func.count(Post.id).desc(), Tag.name.asc())
-            .limit(30)
-        )
-        tag_result = await db.execute(tag_query)
-        tags = tag_result.all()
-
-        slugs_updated = False
-        for category, _ in categories:
-            if not category.slug:
-                await ensure_category_slug(db, category)
-                slugs_updated = True
-        for tag, _ in tags:
-            if not tag.slug:
-                await ensure_tag_slug(db, tag)
-                slugs_updated = True
-        if slugs_updated:
-            await db.commit()
 
-        popular_query = (
-            select(Post)
-            .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
-            .where(Post.published == True)
-            .order_by((Post.views + Post.like_count * 2 + Post.comment_count * 3).desc(), Post.created_at.desc())
-            .limit(5)
-        )
-        popular_result = await db.execute(popular_query)
-        popular_posts = popular_result.scalars().all()
-
-        featured_query = (
-            select(Post)
-            .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
-            .where(Post.published == True, Post.is_featured == True)
-            .order_by(Post.published_at.desc().nullslast(), Post.created_at.desc())
-            .limit(3)
-        )
-        featured_result = await db.execute(featured_query)
-        featured_posts = featured_result.scalars().all()
-
-        for post in popular_posts:
-            _ = post.author
-            _ = post.category
-            _ = post.tags
-        for post in featured_posts:
-            _ = post.author
-            _ = post.category
-            _ = post.tags
+# 快照只保留正文开头，模板只用它生成摘要
+SIDEBAR_CONTENT_PREVIEW = 600
 
-        return {
-            "categories": serialize_category_counts(categories),
-            "tags": serialize_tag_counts(tags),
-            "popular_posts": popular_posts,
-            "featured_posts": featured_posts,
-        }
-    except Exception as e:
-        logger.error(f"Error fetching sidebar data: {e}")
-        return {"categories": [], "tags": [], "popular_posts": [], "featured_posts": []}
+
+def serialize_sidebar_post(post: Post) -> dict[str, Any]:
+    """侧边栏快照中的文章（纯 dict，字段与模板中的用法一致）"""
+    return {
+        "id": post.id,
+        "title": post.title,
+        "slug": post.slug,
+        "summary": post.summary,
+        "content": (post.content or "")[:SIDEBAR_CONTENT_PREVIEW],
+        "views": post.views or 0,
+        "comment_count": post.comment_count or 0,
+        "like_count": post.like_count or 0,
+        # 时间存为 ISO 字符串，快照内容与缓存编码方式（json / msgpack）无关，读取时再还原
+        "published_at": post.published_at.isoformat() if post.published_at else None,
+        "created_at": post.created_at.isoformat() if post.created_at else None,
+        "featured_image": post.featured_image,
+        "author": {
+            "username": post.author.username,
+            "full_name": post.author.full_name,
+        } if post.author else None,
+        "category": {"name": post.category.name, "slug": post.category.slug} if post.category else None,
+        "tags": [{"name": tag.name, "slug": tag.slug} for tag in post.tags],
+    }
+
+
+def restore_sidebar_post(data: dict[str, Any]) -> dict[str, Any]:
+    """把快照中的 ISO 时间字符串还原为 datetime，模板可以直接调用 strftime"""
+    restored = dict(data)
+    for key in ("published_at", "created_at"):
+        if isinstance(restored.get(key), str):
+            restored[key] = datetime.fromisoformat(restored[key])
+    return restored
+
+
+async def build_sidebar_data(db: AsyncSession) -> dict:
+    """计算侧边栏数据（分类、标签、热门与精选文章），结果只含纯 dict"""
+    cat_query = (
+        select(Category, func.count(Post.id).label("post_count"))
+        .outerjoin(Post, and_(Category.id == Post.category_id, Post.published == True))
+        .group_by(Category.id)
+        .order_by(func.count(Post.id).desc(), Category.name.asc())
+    )
+    cat_result = await db.execute(cat_query)
+    categories = cat_result.all()
+
+    tag_query = (
+        select(Tag, func.count(Post.id).label("post_count"))
+        .outerjoin(post_tag, Tag.id == post_tag.c.tag_id)
+        .outerjoin(Post, and_(post_tag.c.post_id == Post.id, Post.published == True))
+        .group_by(Tag.id)
+        .order_by(func.count(Post.id).desc(), Tag.name.asc())
+        .limit(30)
+    )
+    tag_result = await db.execute(tag_query)
+    tags = tag_result.all()
+
+    # 旧数据补全 slug 只在后台构建快照时进行，不再发生在页面请求中
+    slugs_updated = False
+    for category, _ in categories:
+        if not category.slug:
+            await ensure_category_slug(db, category)
+            slugs_updated = True
+    for tag, _ in tags:
+        if not tag.slug:
+            await ensure_tag_slug(db, tag)
+            slugs_updated = True
+    if slugs_updated:
+        await db.commit()
+
+    popular_query = (
+        join_counters(select(Post))
+        .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
+        .where(Post.published == True)
+        .order_by(popularity.desc(), Post.created_at.desc())
+        .limit(5)
+    )
+    popular_result = await db.execute(popular_query)
+    popular_posts = popular_result.scalars().all()
+
+    featured_query = (
+        with_counters(select(Post))
+        .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
+        .where(Post.published == True, Post.is_featured == True)
+        .order_by(Post.published_at.desc().nullslast(), Post.created_at.desc())
+        .limit(3)
+    )
+    featured_result = await db.execute(featured_query)
+    featured_posts = featured_result.scalars().all()
+
+    return {
+        "categories": serialize_category_counts(categories),
+        "tags": serialize_tag_counts(tags),
+        "popular_posts": [serialize_sidebar_post(post) for post in popular_posts],
+        "featured_posts": [serialize_sidebar_post(post) for post in featured_posts],
+    }
+
+
+sidebar_snapshot = Snapshot(
+    "sidebar",
+    build_sidebar_data,
+    refresh_interval=settings.SIDEBAR_REFRESH_INTERVAL,
+    ttl=settings.SIDEBAR_SNAPSHOT_TTL,
+    rebuild_on=("sidebar",),
+    default={"categories": [], "tags": [], "popular_posts": [], "featured_posts": []},
+)
+
+
+async def get_sidebar_data() -> dict:
+    """获取侧边栏数据（读取预计算的快照）"""
+    data = await sidebar_snapshot.get()
+    return {
+        **data,
+        "popular_posts": [restore_sidebar_post(post) for post in data.get("popular_posts", [])],
+        "featured_posts": [restore_sidebar_post(post) for post in data.get("featured_posts", [])],
+    }
+
+
+def build_warmup_steps(application: FastAPI) -> list:
+    """启动预热：填满数据库连接池、构建侧边栏快照、预先渲染首页前几页和热门文章页"""
+
+    async def warm_sidebar():
+        payload = await sidebar_snapshot.get_payload()
+        return payload.get("built_at") if payload else None
+
+    async def warm_index_pages():
+        paths = ["/"] + [f"/?page={page}" for page in range(2, settings.WARMUP_INDEX_PAGES + 1)]
+        return await prime_pages(application, paths)
+
+    async def warm_popular_posts():
+        async with async_session() as db:
+            result = await db.execute(
+                select(Post.slug)
+                .join(PostCounter, PostCounter.post_id == Post.id)
+                .where(Post.published == True)
+                .order_by(PostCounter.views.desc())
+                .limit(settings.WARMUP_POPULAR_POSTS)
+            )
+            slugs = result.scalars().all()
+        return await prime_pages(application, [f"/post/{slug}" for slug in slugs])
+
+    return [
+        ("db_pool", prefill_db_pool),
+        ("sidebar", warm_sidebar),
+        ("index_pages", warm_index_pages),
+        ("popular_posts", warm_popular_posts),
+    ]
 
 
 async def get_related_posts(db: AsyncSession, post: Post, limit: int = 5):
@@ -433,7 +553,7 @@ async def get_related_posts(db: AsyncSession, post: Post, limit: int = 5):
     try:
         tag_ids = [tag.id for tag in post.tags] if post.tags else []
 
-        query = select(Post).options(
+        query = with_counters(select(Post)).options(
             selectinload(Post.author),
             selectinload(Post.category),
             selectinload(Post.tags)
@@ -475,21 +595,109 @@ async def get_related_posts(db: AsyncSession, post: Post, limit: int = 5):
 
 
 # 在 index 函数中的修改部分
+def _viewer_id(current_user: Optional[User]) -> int:
+    return current_user.id if current_user is not None else 0
+
+
+async def index_validators(db: AsyncSession, current_user: Optional[User]) -> Validators:
+    """首页版本：已发布文章的 max(updated_at)/数量与计数合计、侧边栏快照版本与当前用户"""
+    sidebar = await sidebar_snapshot.get_payload() or {}
+    return await fetch_validators(
+        db,
+        *table_version(Post, Post.published == True),
+        *counters_version(Post.published == True),
+        extra=(_viewer_id(current_user), sidebar.get("built_at"), settings.VERSION),
+    )
+
+
+async def post_detail_validators(db: AsyncSession, slug: str, current_user: Optional[User]) -> Optional[Validators]:
+    """文章详情页版本：文章本身、评论与评论点赞的版本、相关文章所在表的版本与当前用户"""
+    if not post_slugs.might_contain(slug, record=False):
+        return None
+    row = (
+        await db.execute(
+            select(
+                Post.id,
+                Post.updated_at,
+                PostCounter.comment_count,
+                PostCounter.like_count,
+                select(func.max(Comment.updated_at)).where(Comment.post_id == Post.id).scalar_subquery(),
+                select(func.coalesce(func.sum(Comment.like_count), 0)).where(Comment.post_id == Post.id).scalar_subquery(),
+                *table_version(Post, Post.published == True),
+            )
+            .outerjoin(PostCounter, PostCounter.post_id == Post.id)
+            .where(Post.slug == slug, Post.published == True)
+        )
+    ).first()
+    if row is None:
+        return None
+    return validators_from(row, _viewer_id(current_user), settings.VERSION)
+
+
+async def paginate_posts(
+        db: AsyncSession,
+        query,
+        *,
+        page: int,
+        per_page: int,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        sort: str = "newest",
+) -> KeysetPage:
+    """文章列表页的键集分页；页码跳转只开放前 PAGINATION_MAX_OFFSET_PAGE 页，更深的页只能用游标"""
+    if page > settings.PAGINATION_MAX_OFFSET_PAGE and after is None and before is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="页码超出范围，请使用游标翻页")
+    keys, descending = post_sort_keys(sort)
+    try:
+        pagination = await crud_post.paginate(
+            db,
+            sort_posts_query(query, sort),
+            keys=keys,
+            descending=descending,
+            limit=per_page,
+            after=after,
+            before=before,
+            page=page,
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="分页参数无效")
+    await post_views.merge(pagination.items)
+    return pagination
+
+
+def pagination_context(pagination: KeysetPage, total: int, per_page: int) -> dict[str, Any]:
+    total_pages = math.ceil(total / per_page) if total else 0
+    return {
+        "page": pagination.page,
+        "per_page": per_page,
+        "total": total,
+        "total_pages": max(total_pages, pagination.page if pagination.items else 0),
+        "has_next": pagination.has_next,
+        "has_prev": pagination.has_prev,
+        "next_cursor": pagination.next_cursor,
+        "prev_cursor": pagination.prev_cursor,
+        "max_offset_page": settings.PAGINATION_MAX_OFFSET_PAGE,
+    }
+
+
 @app.get("/", response_class=HTMLResponse)
+@cache_page("index", tags=("posts", "sidebar"))
+@conditional(index_validators)
 async def index(
         request: Request,
         page: int = Query(1, ge=1),
         per_page: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
         sort: str = Query("newest", pattern="^(newest|oldest|popular)$"),
+        after: Optional[str] = None,
+        before: Optional[str] = None,
         category_id: Optional[int] = None,
         tag_name: Optional[str] = None,
         db: AsyncSession = Depends(get_db),
         current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """首页 - 支持分页、排序和筛选"""
-    posts_data = []
+    pagination = KeysetPage(items=[], page=page)
     total = 0
-    total_pages = 0
     sidebar_data = {"categories": [], "tags": [], "popular_posts": [], "featured_posts": []}
 
     try:
@@ -504,31 +712,21 @@ async def index(
         if tag_name:
             query = query.join(post_tag).join(Tag).where(Tag.name == tag_name)
 
-        order_mapping = {
-            "newest": Post.created_at.desc(),
-            "oldest": Post.created_at.asc(),
-            "popular": Post.views.desc()
-        }
-        query = query.order_by(order_mapping[sort])
-
-        count_query = select(func.count()).select_from(query.order_by(None).subquery())
-
-        total_result = await db.execute(count_query)
-        total = total_result.scalar_one_or_none() or 0
+        # 不带筛选的首页是最大的结果集，允许使用估算值
+        total = await count_rows(
+            db, query, "index",
+            estimate=not (category_id or tag_name), category_id=category_id, tag_name=tag_name,
+        )
 
         if total > 0:
-            offset = (page - 1) * per_page
-            query = query.offset(offset).limit(per_page)
-            result = await db.execute(query)
-            posts_data = result.scalars().all()
-            total_pages = math.ceil(total / per_page)
-            for post in posts_data:
-                _ = post.author
-                _ = post.category
-                _ = post.tags
-
-        sidebar_data = await get_sidebar_data(db)
+            pagination = await paginate_posts(
+                db, query, page=page, per_page=per_page, after=after, before=before, sort=sort,
+            )
 
+        sidebar_data = await get_sidebar_data()
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in index page data fetching: {str(e)}")
 
@@ -536,13 +734,8 @@ async def index(
         "index.html",
         {
             "request": request,
-            "posts": posts_data,
-            "page": page,
-            "per_page": per_page,
-            "total": total,
-            "total_pages": total_pages,
-            "has_next": page < total_pages if total_pages else False,
-            "has_prev": page > 1,
+            "posts": pagination.items,
+            **pagination_context(pagination, total, per_page),
             "sort": sort,
             "category_id": category_id,
             "tag_name": tag_name,
@@ -559,6 +752,13 @@ async def index(
 
 # 在 post_detail 函数中的修改
 @app.get("/post/{slug}", response_class=HTMLResponse)
+@cache_page(
+    "post_detail",
+    tags=lambda context: ["posts", "sidebar", f"post:{context['post'].id}"],
+    meta=lambda context: {"post_id": context["post"].id},
+    on_hit=count_cached_post_view,
+)
+@conditional(post_detail_validators)
 async def post_detail(
         request: Request,
         slug: str,
@@ -566,22 +766,24 @@ async def post_detail(
         current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """文章详情页"""
+    if not post_slugs.might_contain(slug):
+        return templates.TemplateResponse(
+            "404.html",
+            {"request": request, "current_year": datetime.now().year, "current_user": current_user},
+            status_code=404
+        )
     try:
-        query = select(Post).options(
-            selectinload(Post.comments).selectinload(Comment.author),
-            selectinload(Post.comments).selectinload(Comment.likes),
-            selectinload(Post.comments).selectinload(Comment.replies).selectinload(Comment.author),
-            selectinload(Post.comments).selectinload(Comment.replies).selectinload(Comment.likes),
+        query = with_counters(select(Post)).options(
             selectinload(Post.tags),
             selectinload(Post.category),
             selectinload(Post.author),
-            selectinload(Post.likes),
         ).where(Post.slug == slug, Post.published == True)
 
         result = await db.execute(query)
         post = result.scalars().first()
 
         if not post:
+            post_slugs.record_false_positive()
             return templates.TemplateResponse(
                 "404.html",
                 {"request": request, "current_year": datetime.now().year, "current_user": current_user},
@@ -591,53 +793,30 @@ async def post_detail(
         _ = post.author
         _ = post.category
         _ = post.tags
-        _ = post.comments
-        visible_comments = [
-            comment for comment in post.comments
-            if comment.parent_id is None and comment.moderation_status == COMMENT_STATUS_APPROVED
-        ]
-        for comment in visible_comments:
-            comment.replies = [
-                reply for reply in comment.replies if reply.moderation_status == COMMENT_STATUS_APPROVED
-            ]
-
-        await update_post_views(db, post)
+        comment_thread = await comment_tree.load(db, post_id=post.id)
+
+        # 阅读量先记在写回计数器里，由后台批量写入；展示时叠加未写入的增量
+        if not is_warmup_request(request):
+            await post_views.incr(post.id)
+        await post_views.merge([post])
         related_posts = await get_related_posts(db, post)
         stats = await get_post_stats(db, post)
         liked_post_ids: set[int] = set()
-        liked_comment_ids: set[int] = set()
 
         if current_user:
             liked_post_result = await db.execute(
                 select(PostLike.post_id).where(PostLike.user_id == current_user.id, PostLike.post_id == post.id)
             )
             liked_post_ids = set(liked_post_result.scalars().all())
-
-            comment_ids = [comment.id for comment in visible_comments]
-            reply_ids = [reply.id for comment in visible_comments for reply in comment.replies]
-            all_comment_ids = comment_ids + reply_ids
-            if all_comment_ids:
-                from app.models.like import CommentLike
-
-                liked_comment_result = await db.execute(
-                    select(CommentLike.comment_id).where(
-                        CommentLike.user_id == current_user.id,
-                        CommentLike.comment_id.in_(all_comment_ids),
-                    )
-                )
-                liked_comment_ids = set(liked_comment_result.scalars().all())
-
-        for comment in visible_comments:
-            comment.is_liked = comment.id in liked_comment_ids
-            for reply in comment.replies:
-                reply.is_liked = reply.id in liked_comment_ids
+            await comment_tree.mark_liked(db, comment_thread, current_user.id)
 
         return templates.TemplateResponse(
             "post.html",
             {
                 "request": request,
                 "post": post,
-                "comments": visible_comments,
+                "comments": comment_thread.comments,
+                "comments_cursor": comment_thread.next_cursor,
                 "related_posts": related_posts,
                 "stats": stats,
                 "post_is_liked": post.id in liked_post_ids,
@@ -675,15 +854,10 @@ async def post_preview_page(
         current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     result = await db.execute(
-        select(Post).options(
-            selectinload(Post.comments).selectinload(Comment.author),
-            selectinload(Post.comments).selectinload(Comment.likes),
-            selectinload(Post.comments).selectinload(Comment.replies).selectinload(Comment.author),
-            selectinload(Post.comments).selectinload(Comment.replies).selectinload(Comment.likes),
+        with_counters(select(Post)).options(
             selectinload(Post.tags),
             selectinload(Post.category),
             selectinload(Post.author),
-            selectinload(Post.likes),
         ).where(Post.id == post_id)
     )
     post = result.scalars().first()
@@ -752,10 +926,12 @@ async def get_author_stats(db: AsyncSession, author_id: int) -> dict[str, int]:
     result = await db.execute(
         select(
             func.count(Post.id),
-            func.coalesce(func.sum(Post.views), 0),
-            func.coalesce(func.sum(Post.like_count), 0),
-            func.coalesce(func.sum(Post.comment_count), 0),
-        ).where(Post.author_id == author_id, Post.published == True)
+            func.coalesce(func.sum(PostCounter.views), 0),
+            func.coalesce(func.sum(PostCounter.like_count), 0),
+            func.coalesce(func.sum(PostCounter.comment_count), 0),
+        )
+        .outerjoin(PostCounter, PostCounter.post_id == Post.id)
+        .where(Post.author_id == author_id, Post.published == True)
     )
     post_count, total_views, total_likes, total_comments = result.one()
     return {
@@ -881,7 +1057,7 @@ async def dashboard(
 
     async with async_session() as db:  # 为特定操作获取新会话或确保传递 db
         stats = await get_user_dashboard_stats(db, current_user)
-        recent_posts_query = select(Post).where(Post.author_id == current_user.id) \
+        recent_posts_query = with_counters(select(Post)).where(Post.author_id == current_user.id) \
             .order_by(Post.created_at.desc()).limit(10)
         recent_posts_result = await db.execute(recent_posts_query)
         recent_posts = recent_posts_result.scalars().all()
@@ -908,7 +1084,7 @@ async def my_posts(
         return current_user
 
     async with async_session() as db:
-        query = select(Post).options(selectinload(Post.category)) \
+        query = with_counters(select(Post)).options(selectinload(Post.category)) \
             .where(Post.author_id == current_user.id).order_by(Post.created_at.desc())
         result = await db.execute(query)
         posts_data = result.scalars().all()
@@ -986,7 +1162,7 @@ async def get_user_dashboard_stats(db: AsyncSession, user: User) -> dict:
         select(func.count(Post.id)).where(and_(Post.author_id == user.id, Post.published == True)))
     draft_posts_res = await db.execute(
         select(func.count(Post.id)).where(and_(Post.author_id == user.id, Post.published == False)))
-    total_views_res = await db.execute(select(func.sum(Post.views)).where(Post.author_id == user.id))
+    total_views_res = await db.execute(select(func.sum(PostCounter.views)).join(Post, Post.id == PostCounter.post_id).where(Post.author_id == user.id))
     total_comments_res = await db.execute(select(func.count(Comment.id)).join(Post).where(Post.author_id == user.id))
 
     return {
@@ -1016,7 +1192,7 @@ async def get_user_analytics_snapshot(
     period_days: int,
 ) -> dict[str, Any]:
     posts_result = await db.execute(
-        select(Post)
+        with_counters(select(Post))
         .options(selectinload(Post.category), selectinload(Post.tags))
         .where(Post.author_id == user.id)
         .order_by(Post.created_at.desc())
@@ -1402,14 +1578,15 @@ async def search(
         category: Optional[str] = None,
         tag: Optional[str] = None,
         page: int = Query(1, ge=1),
+        after: Optional[str] = None,
+        before: Optional[str] = None,
         db: AsyncSession = Depends(get_db),
         current_user: Optional[User] = Depends(get_current_user_optional)  # 可选认证
 ):
-    posts_data = []
+    pagination = KeysetPage(items=[], page=page)
     total = 0
-    total_pages = 0
     per_page = settings.DEFAULT_PAGE_SIZE
-    sidebar_data = await get_sidebar_data(db)
+    sidebar_data = await get_sidebar_data()
 
     if q or category or tag:
         query = select(Post).options(
@@ -1428,31 +1605,20 @@ async def search(
         if tag:
             query = query.join(post_tag).join(Tag).where(Tag.name == tag)
 
-        count_query = select(func.count()).select_from(query.order_by(None).subquery())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar_one_or_none() or 0
+        total = await count_rows(db, query, "search", cap=settings.COUNT_CAP, q=q, category=category, tag=tag)
 
         if total > 0:
-            offset = (page - 1) * per_page
-            query = query.offset(offset).limit(per_page)
-            result = await db.execute(query)
-            posts_data = result.scalars().all()
-            total_pages = math.ceil(total / per_page)
+            pagination = await paginate_posts(db, query, page=page, per_page=per_page, after=after, before=before)
 
     return templates.TemplateResponse(
         "search.html",
         {
             "request": request,
-            "posts": posts_data,
+            "posts": pagination.items,
             "query": q,
             "category": category,
             "tag": tag,
-            "page": page,
-            "total": total,
-            "total_pages": total_pages,
-            "per_page": per_page,
-            "has_next": page < total_pages if total_pages else False,
-            "has_prev": page > 1,
+            **pagination_context(pagination, total, per_page),
             "current_year": datetime.now().year,
             "user_is_authenticated": current_user is not None,
             "current_user": current_user,
@@ -1464,14 +1630,19 @@ async def search(
 
 
 @app.get("/categories/{slug}", response_class=HTMLResponse, name="category_page")
+@cache_page("category_page", tags=("posts", "sidebar", "categories"))
 async def category_page(
         request: Request,
         slug: str,
         page: int = Query(1, ge=1),
         per_page: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
+        after: Optional[str] = None,
+        before: Optional[str] = None,
         db: AsyncSession = Depends(get_db),
         current_user: Optional[User] = Depends(get_current_user_optional),
 ):
+    if not category_slugs.might_contain(slug):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="分类不存在")
     category_result = await db.execute(select(Category).where(Category.slug == slug, Category.is_active == True))
     category = category_result.scalars().first()
     if not category:
@@ -1484,25 +1655,21 @@ async def category_page(
                 await db.commit()
                 break
     if not category:
+        category_slugs.record_false_positive()
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="分类不存在")
 
     query = (
         select(Post)
         .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
         .where(Post.published == True, Post.category_id == category.id)
-        .order_by(Post.published_at.desc().nullslast(), Post.created_at.desc())
     )
-    count_query = select(func.count()).select_from(query.order_by(None).subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar_one_or_none() or 0
-    total_pages = math.ceil(total / per_page) if total else 0
+    total = await count_rows(db, query, "category", category_id=category.id)
 
-    posts_data = []
+    pagination = KeysetPage(items=[], page=page)
     if total:
-        result = await db.execute(query.offset((page - 1) * per_page).limit(per_page))
-        posts_data = result.scalars().all()
+        pagination = await paginate_posts(db, query, page=page, per_page=per_page, after=after, before=before)
 
-    sidebar_data = await get_sidebar_data(db)
+    sidebar_data = await get_sidebar_data()
 
     return templates.TemplateResponse(
         "taxonomy.html",
@@ -1513,13 +1680,8 @@ async def category_page(
             "topic_slug": category.slug,
             "topic_description": category.description or "按一条更清晰的主题线索把相关文章整理在一起。",
             "topic_badge": "Category",
-            "posts": posts_data,
-            "page": page,
-            "per_page": per_page,
-            "total": total,
-            "total_pages": total_pages,
-            "has_next": page < total_pages if total_pages else False,
-            "has_prev": page > 1,
+            "posts": pagination.items,
+            **pagination_context(pagination, total, per_page),
             "categories": sidebar_data["categories"],
             "tags": sidebar_data["tags"],
             "popular_posts": sidebar_data["popular_posts"],
@@ -1531,14 +1693,19 @@ async def category_page(
 
 
 @app.get("/tags/{slug}", response_class=HTMLResponse, name="tag_page")
+@cache_page("tag_page", tags=("posts", "sidebar", "tags"))
 async def tag_page(
         request: Request,
         slug: str,
         page: int = Query(1, ge=1),
         per_page: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
+        after: Optional[str] = None,
+        before: Optional[str] = None,
         db: AsyncSession = Depends(get_db),
         current_user: Optional[User] = Depends(get_current_user_optional),
 ):
+    if not tag_slugs.might_contain(slug):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="标签不存在")
     tag_result = await db.execute(select(Tag).where(Tag.slug == slug))
     tag = tag_result.scalars().first()
     if not tag:
@@ -1549,6 +1716,7 @@ async def tag_page(
                 await db.commit()
                 break
     if not tag:
+        tag_slugs.record_false_positive()
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="标签不存在")
 
     query = (
@@ -1556,19 +1724,14 @@ async def tag_page(
         .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
         .join(post_tag, Post.id == post_tag.c.post_id)
         .where(Post.published == True, post_tag.c.tag_id == tag.id)
-        .order_by(Post.published_at.desc().nullslast(), Post.created_at.desc())
     )
-    count_query = select(func.count()).select_from(query.order_by(None).subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar_one_or_none() or 0
-    total_pages = math.ceil(total / per_page) if total else 0
+    total = await count_rows(db, query, "tag", tag_id=tag.id)
 
-    posts_data = []
+    pagination = KeysetPage(items=[], page=page)
     if total:
-        result = await db.execute(query.offset((page - 1) * per_page).limit(per_page))
-        posts_data = result.scalars().unique().all()
+        pagination = await paginate_posts(db, query, page=page, per_page=per_page, after=after, before=before)
 
-    sidebar_data = await get_sidebar_data(db)
+    sidebar_data = await get_sidebar_data()
 
     return templates.TemplateResponse(
         "taxonomy.html",
@@ -1579,13 +1742,8 @@ async def tag_page(
             "topic_slug": tag.slug,
             "topic_description": f"围绕 #{tag.name} 的公开文章集合，适合顺着一个技术主题继续深入。",
             "topic_badge": "Tag",
-            "posts": posts_data,
-            "page": page,
-            "per_page": per_page,
-            "total": total,
-            "total_pages": total_pages,
-            "has_next": page < total_pages if total_pages else False,
-            "has_prev": page > 1,
+            "posts": pagination.items,
+            **pagination_context(pagination, total, per_page),
             "categories": sidebar_data["categories"],
             "tags": sidebar_data["tags"],
             "popular_posts": sidebar_data["popular_posts"],
@@ -1597,6 +1755,7 @@ async def tag_page(
 
 
 @app.get("/archive", response_class=HTMLResponse)
+@cache_page("archive_page", tags=("posts", "sidebar"))
 async def archive_page(
         request: Request,
         db: AsyncSession = Depends(get_db),
@@ -1623,7 +1782,7 @@ async def archive_page(
         archive_groups[group_key]["count"] += 1
         archive_groups[group_key]["posts"].append(post)
 
-    sidebar_data = await get_sidebar_data(db)
+    sidebar_data = await get_sidebar_data()
 
     return templates.TemplateResponse(
         "archive.html",
@@ -1640,7 +1799,12 @@ async def archive_page(
     )
 
 
+async def rss_validators(db: AsyncSession) -> Validators:
+    return await fetch_validators(db, *table_version(Post, Post.published == True), extra=(settings.VERSION,))
+
+
 @app.get("/rss.xml", include_in_schema=False)
+@conditional(rss_validators)
 async def rss_feed(db: AsyncSession = Depends(get_db)) -> Response:
     result = await db.execute(
         select(Post)
@@ -1680,51 +1844,47 @@ async def rss_feed(db: AsyncSession = Depends(get_db)) -> Response:
 
 
 @app.get("/authors/{username}", response_class=HTMLResponse, name="author_page")
+@cache_page("author_page", tags=lambda context: ["posts", "sidebar", f"user:{context['author'].id}"])
 async def author_page(
         request: Request,
         username: str,
         page: int = Query(1, ge=1),
         per_page: int = Query(settings.DEFAULT_PAGE_SIZE, le=settings.MAX_PAGE_SIZE),
+        after: Optional[str] = None,
+        before: Optional[str] = None,
         db: AsyncSession = Depends(get_db),
         current_user: Optional[User] = Depends(get_current_user_optional),
 ):
+    if not usernames.might_contain(username):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="作者不存在")
     author_result = await db.execute(select(User).where(User.username == username, User.is_active == True))
     author = author_result.scalars().first()
     if not author:
+        usernames.record_false_positive()
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="作者不存在")
 
     query = (
         select(Post)
         .options(selectinload(Post.author), selectinload(Post.category), selectinload(Post.tags))
         .where(Post.author_id == author.id, Post.published == True)
-        .order_by(Post.published_at.desc().nullslast(), Post.created_at.desc())
     )
-    count_query = select(func.count()).select_from(query.order_by(None).subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar_one_or_none() or 0
-    total_pages = math.ceil(total / per_page) if total else 0
+    total = await count_rows(db, query, "author", author_id=author.id)
 
-    posts_data = []
+    pagination = KeysetPage(items=[], page=page)
     if total:
-        result = await db.execute(query.offset((page - 1) * per_page).limit(per_page))
-        posts_data = result.scalars().all()
+        pagination = await paginate_posts(db, query, page=page, per_page=per_page, after=after, before=before)
 
     stats = await get_author_stats(db, author.id)
-    sidebar_data = await get_sidebar_data(db)
+    sidebar_data = await get_sidebar_data()
 
     return templates.TemplateResponse(
         "author.html",
         {
             "request": request,
             "author": author,
-            "posts": posts_data,
+            "posts": pagination.items,
             "stats": stats,
-            "page": page,
-            "per_page": per_page,
-            "total": total,
-            "total_pages": total_pages,
-            "has_next": page < total_pages if total_pages else False,
-            "has_prev": page > 1,
+            **pagination_context(pagination, total, per_page),
             "can_edit_profile": current_user is not None and current_user.id == author.id,
             "categories": sidebar_data["categories"],
             "tags": sidebar_data["tags"],
@@ -1736,7 +1896,20 @@ async def author_page(
     )
 
 
+async def sitemap_validators(db: AsyncSession) -> Validators:
+    # 静态页面的 lastmod 取当天日期，所以日期也是版本的一部分
+    return await fetch_validators(
+        db,
+        *table_version(Post, Post.published == True),
+        *table_version(Category, Category.is_active == True),
+        *table_version(Tag),
+        *table_version(User, User.is_active == True),
+        extra=(datetime.utcnow().date(), settings.VERSION),
+    )
+
+
 @app.get("/sitemap.xml", include_in_schema=False)
+@conditional(sitemap_validators)
 async def sitemap_xml(db: AsyncSession = Depends(get_db)) -> Response:
     now = datetime.utcnow()
     static_urls = [
@@ -1,7 +1,7 @@
 from app.models.category import Category
 from app.models.comment import Comment
 from app.models.like import CommentLike, PostLike
-from app.models.post import Post
+from app.models.post import Post, PostCounter
 from app.models.tag import Tag, post_tag, post_tags
 from app.models.user import User
 
@@ -15,6 +15,7 @@ __all__ = [
     "Category",
     "Tag",
     "Post",
+    "PostCounter",
     "post_tag",
     "post_tags",
     "Comment",
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Text, text
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -18,6 +18,8 @@ class Comment(Base, TimestampMixin):
     is_approved = Column(Boolean, default=False, nullable=False)
     moderation_status = Column(String(20), default=COMMENT_STATUS_PENDING, nullable=False, index=True)
     is_edited = Column(Boolean, default=False, nullable=False)
+    # 点赞数随点赞 / 取消点赞原子加减（见 app/crud/like.py），展示时不再加载 likes
+    like_count = Column(Integer, default=0, server_default=text("0"), nullable=False)
 
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -28,9 +30,19 @@ class Comment(Base, TimestampMixin):
     parent = relationship("Comment", remote_side="Comment.id", backref="replies")
     likes = relationship("CommentLike", back_populates="comment", cascade="all, delete-orphan")
 
-    @property
-    def like_count(self) -> int:
-        return len(self.likes)
+    __table_args__ = (
+        # 文章下的顶层评论：WHERE post_id = ? AND moderation_status = ? AND parent_id IS NULL ORDER BY created_at
+        Index(
+            "ix_comments_post_status_roots",
+            post_id,
+            moderation_status,
+            "created_at",
+            postgresql_where=parent_id.is_(None),
+            sqlite_where=parent_id.is_(None),
+        ),
+        # 某条评论下的回复
+        Index("ix_comments_parent_id_created_at", parent_id, "created_at"),
+    )
 
     @property
     def reply_count(self) -> int:
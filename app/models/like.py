@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Column, ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -35,6 +35,8 @@ class CommentLike(Base, TimestampMixin):
 
     __table_args__ = (
         UniqueConstraint("user_id", "comment_id", name="_user_comment_like_uc"),
+        # 批量查询评论的点赞：WHERE comment_id IN (...)（唯一约束以 user_id 开头，用不上）
+        Index("ix_comment_likes_comment_id_user_id", "comment_id", "user_id"),
     )
 
     def __repr__(self) -> str:
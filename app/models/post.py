@@ -1,12 +1,48 @@
+import logging
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    DDL, Boolean, CheckConstraint, Column, DateTime, ForeignKey, Index, Integer, String, Text, event, inspect, select,
+    text,
+)
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship, validates
 
 from app.core.database import Base
 from app.models.mixins import TimestampMixin
 from app.models.tag import post_tags
 
+logger = logging.getLogger(__name__)
+
+
+def _counter_property(name: str) -> hybrid_property:
+    """
+    Post 上的兼容属性：实例上读写 post.counters 中的对应计数（需先用 join_counters / with_counters 加载，
+    未加载时读到 0 并记录警告，而不是让页面报错）；
+    类级别是关联子查询，旧的 Post.views.desc() 之类写法仍然可用（热点查询应显式 JOIN PostCounter）
+    """
+
+    def fget(self) -> int:
+        if "counters" in inspect(self).unloaded:
+            logger.warning(f"Post.{name} read without loading counters (post_id={self.id}); use with_counters()")
+            return 0
+        return getattr(self.counters, name, None) or 0
+
+    def fset(self, value: int) -> None:
+        if self.counters is None:
+            self.counters = PostCounter()
+        setattr(self.counters, name, value)
+
+    def expression(cls):
+        return (
+            select(getattr(PostCounter, name))
+            .where(PostCounter.post_id == cls.id)
+            .scalar_subquery()
+            .label(name)
+        )
+
+    return hybrid_property(fget, fset).expression(expression)
+
 
 class Post(Base, TimestampMixin):
     __tablename__ = "posts"
@@ -27,10 +63,6 @@ class Post(Base, TimestampMixin):
     meta_description = Column(Text, nullable=True)
     meta_keywords = Column(String(500), nullable=True)
 
-    views = Column(Integer, default=0, nullable=False)
-    like_count = Column(Integer, default=0, nullable=False)
-    comment_count = Column(Integer, default=0, nullable=False)
-
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
 
@@ -39,6 +71,32 @@ class Post(Base, TimestampMixin):
     tags = relationship("Tag", secondary=post_tags, back_populates="posts")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
     likes = relationship("PostLike", back_populates="post", cascade="all, delete-orphan")
+    # 计数单独成表（见 PostCounter），默认不加载；要展示计数的查询用 join_counters / with_counters 显式加载
+    counters = relationship(
+        "PostCounter",
+        back_populates="post",
+        uselist=False,
+        lazy="raise",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # 已发布文章的 published_at 是键集分页的排序键，不能为空
+        CheckConstraint("NOT published OR published_at IS NOT NULL", name="published_at_required"),
+        # 公开列表：WHERE published ORDER BY published_at DESC, id DESC（键集分页的排序键）
+        Index(
+            "ix_posts_published_feed",
+            published_at.desc(),
+            id.desc(),
+            postgresql_where=published == True,
+            sqlite_where=published == True,
+        ),
+    )
+
+    views = _counter_property("views")
+    like_count = _counter_property("like_count")
+    comment_count = _counter_property("comment_count")
 
     @property
     def view_count(self) -> int:
@@ -52,6 +110,12 @@ class Post(Base, TimestampMixin):
     def is_published(self) -> bool:
         return self.published
 
+    @validates("published")
+    def _validate_published(self, key: str, value: bool) -> bool:
+        if value and not self.published_at:
+            self.published_at = datetime.utcnow()
+        return value
+
     def publish(self) -> None:
         self.published = True
         if not self.published_at:
@@ -59,3 +123,37 @@ class Post(Base, TimestampMixin):
 
     def __repr__(self) -> str:
         return f"<Post(id={self.id}, title='{self.title}', published={self.published})>"
+
+
+class PostCounter(Base):
+    """
+    文章的高频计数（阅读 / 点赞 / 评论数）
+
+    与 posts 拆开后，计数更新只改写这张窄表的行，不复制整行正文；
+    计数列上不建索引、表的 fillfactor 为 50，PostgreSQL 可以走 HOT 更新（页内更新，不动索引）
+    """
+    __tablename__ = "post_counters"
+
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    views = Column(Integer, default=0, server_default=text("0"), nullable=False)
+    like_count = Column(Integer, default=0, server_default=text("0"), nullable=False)
+    comment_count = Column(Integer, default=0, server_default=text("0"), nullable=False)
+
+    post = relationship("Post", back_populates="counters")
+
+    def __repr__(self) -> str:
+        return f"<PostCounter(post_id={self.post_id}, views={self.views})>"
+
+
+event.listen(
+    PostCounter.__table__,
+    "after_create",
+    DDL("ALTER TABLE post_counters SET (fillfactor = 50)").execute_if(dialect="postgresql"),
+)
+
+
+@event.listens_for(Post, "init")
+def _init_counters(target: Post, args, kwargs) -> None:
+    # 新文章总是带一行计数，计数相关的 JOIN 与 UPDATE 都不必考虑缺行
+    if "counters" not in kwargs:
+        target.counters = PostCounter(views=0, like_count=0, comment_count=0)
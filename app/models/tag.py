@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Table
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Table, func
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -10,6 +10,8 @@ post_tags = Table(
     Base.metadata,
     Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
     Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    # 主键是 (post_id, tag_id)，按标签查文章需要反向的索引
+    Index("ix_post_tag_tag_id_post_id", "tag_id", "post_id"),
 )
 
 post_tag = post_tags
@@ -24,5 +26,10 @@ class Tag(Base, TimestampMixin):
 
     posts = relationship("Post", secondary=post_tags, back_populates="tags")
 
+    __table_args__ = (
+        # 按名称（不区分大小写）批量查找标签
+        Index("ix_tags_name_lower", func.lower(name)),
+    )
+
     def __repr__(self) -> str:
         return f"<Tag(id={self.id}, name='{self.name}')>"
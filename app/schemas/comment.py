@@ -36,6 +36,9 @@ class Comment(CommentBase):
     reply_count: int = 0
     is_liked: bool = False
     replies: list["Comment"] = Field(default_factory=list)
+    # 评论树（app/crud/comment_tree.py）只带出前几条回复，其余用 GET /comments/{id}/replies?after= 继续加载
+    has_more_replies: bool = False
+    replies_cursor: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -83,6 +83,7 @@ class PostResponse(PostBase):
 
 class PostDetailResponse(PostResponse):
     comments: list[Comment] = Field(default_factory=list)
+    comments_cursor: Optional[str] = None
     is_liked_by_current_user: bool = False
 
 
@@ -1,3 +1,4 @@
+import logging
 from datetime import datetime, timedelta
 from sqlalchemy import func, and_
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
@@ -5,6 +6,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.future import select
 
 from app.core.config import settings
+from app.crud.like import comment_like, post_like
 from app.models.comment import Comment
 from app.models.post import Post
 from app.core.redis import set_cache
@@ -25,6 +27,8 @@ async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+logger = logging.getLogger(__name__)
+
 
 @shared_task
 def update_post_stats():
@@ -124,3 +128,22 @@ def update_post_stats():
     # 在Celery任务中运行异步代码
     import asyncio
     asyncio.run(_update())
+
+
+@shared_task
+def reconcile_like_counts():
+    """核对文章与评论的冗余点赞数与点赞表是否一致，修正出现的偏差"""
+
+    async def _reconcile():
+        async with async_session() as session:
+            drift = {
+                "posts": await post_like.engine.reconcile(session, fix=True),
+                "comments": await comment_like.engine.reconcile(session, fix=True),
+            }
+        for kind, items in drift.items():
+            if items:
+                logger.warning(f"Fixed {len(items)} drifted {kind} like counts: {items[:10]}")
+        return {kind: len(items) for kind, items in drift.items()}
+
+    import asyncio
+    return asyncio.run(_reconcile())
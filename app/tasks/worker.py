@@ -15,6 +15,7 @@ if celery_app is not None:
     celery_app.conf.task_routes = {
         "app.tasks.email.send_email": "email-queue",
         "app.tasks.posts.update_post_stats": "stats-queue",
+        "app.tasks.posts.reconcile_like_counts": "stats-queue",
     }
 
     celery_app.conf.update(
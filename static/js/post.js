@@ -7,6 +7,7 @@ document.addEventListener("DOMContentLoaded", function () {
     const postLikeButton = document.getElementById("post-like-button");
     const sharePostButton = document.getElementById("share-post");
     const commentsCount = document.querySelector(".comments-count");
+    const loadMoreCommentsButton = document.getElementById("load-more-comments");
 
     function showError(message) {
         if (!commentError) {
@@ -150,6 +151,61 @@ document.addEventListener("DOMContentLoaded", function () {
         return article;
     }
 
+    function renderThread(comment, isReply = false) {
+        const article = renderComment(comment, isReply);
+        const body = article.querySelector(".comment-card__body");
+        const replies = comment.replies || [];
+        if (replies.length) {
+            let replyList = body.querySelector(":scope > .reply-list");
+            if (!replyList) {
+                replyList = document.createElement("div");
+                replyList.className = "reply-list";
+                body.append(replyList);
+            }
+            replies.forEach((reply) => replyList.append(renderThread(reply, true)));
+        }
+        if (comment.has_more_replies) {
+            const loadMore = document.createElement("button");
+            loadMore.type = "button";
+            loadMore.className = "link-button load-more-replies";
+            loadMore.dataset.commentId = comment.id;
+            loadMore.dataset.cursor = comment.replies_cursor || "";
+            loadMore.textContent = "加载更多回复";
+            body.append(loadMore);
+        }
+        return article;
+    }
+
+    async function loadMore(button, url, container, isReply) {
+        button.disabled = true;
+        try {
+            const params = button.dataset.cursor ? { after: button.dataset.cursor } : {};
+            const response = await axios.get(url, { params });
+            response.data.forEach((comment) => container.append(renderThread(comment, isReply)));
+            const nextCursor = response.headers["x-next-cursor"];
+            if (nextCursor) {
+                button.dataset.cursor = nextCursor;
+                button.disabled = false;
+            } else {
+                button.remove();
+            }
+        } catch (error) {
+            button.disabled = false;
+            showError(parseApiError(error, "加载评论失败，请稍后再试。"));
+        }
+    }
+
+    async function loadMoreReplies(button) {
+        const body = button.closest(".comment-card__body");
+        let replyList = body.querySelector(":scope > .reply-list");
+        if (!replyList) {
+            replyList = document.createElement("div");
+            replyList.className = "reply-list";
+            button.before(replyList);
+        }
+        await loadMore(button, `/comments/${button.dataset.commentId}/replies`, replyList, true);
+    }
+
     async function submitComment({ postId, parentId = null, content }) {
         const payload = { content, post_id: parseInt(postId, 10) };
         if (parentId) {
@@ -235,6 +291,10 @@ document.addEventListener("DOMContentLoaded", function () {
 
     postLikeButton?.addEventListener("click", togglePostLike);
 
+    loadMoreCommentsButton?.addEventListener("click", function () {
+        loadMore(this, `/comments/post/${this.dataset.postId}`, commentList, false);
+    });
+
     sharePostButton?.addEventListener("click", async function () {
         const shareUrl = this.dataset.shareUrl;
         try {
@@ -301,6 +361,12 @@ document.addEventListener("DOMContentLoaded", function () {
             return;
         }
 
+        const loadMoreRepliesButton = event.target.closest(".load-more-replies");
+        if (loadMoreRepliesButton) {
+            await loadMoreReplies(loadMoreRepliesButton);
+            return;
+        }
+
         const commentLikeButton = event.target.closest(".comment-like-button");
         if (commentLikeButton) {
             await toggleCommentLike(commentLikeButton);
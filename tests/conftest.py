@@ -1,5 +1,11 @@
+import asyncio
+from dataclasses import dataclass
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import Engine, create_engine, event, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
 
 from app.main import app
 
@@ -8,3 +14,83 @@ from app.main import app
 def client() -> TestClient:
     with TestClient(app) as test_client:
         yield test_client
+
+
+@dataclass
+class TempDatabase:
+    """临时文件 SQLite：engine 供被测代码使用，初始数据通过同步连接写入"""
+
+    engine: AsyncEngine
+    sync_engine: Engine
+
+    def session(self, **kwargs) -> AsyncSession:
+        return AsyncSession(self.engine, **kwargs)
+
+    def add(self, *objects) -> None:
+        with Session(self.sync_engine) as session:
+            session.add_all(objects)
+            session.commit()
+
+    def insert(self, table, rows) -> None:
+        with self.sync_engine.begin() as conn:
+            conn.execute(insert(table), rows)
+
+    def run(self, callback, **kwargs):
+        """在新的事件循环里打开一个会话执行 callback(db)，返回其结果"""
+
+        async def with_session(engine):
+            async with self.session(**kwargs) as db:
+                return await callback(db)
+
+        return self.run_engine(with_session)
+
+    def run_engine(self, callback):
+        """在新的事件循环里执行 callback(engine)；连接池不能跨事件循环复用，结束时释放"""
+
+        async def main():
+            try:
+                return await callback(self.engine)
+            finally:
+                await self.engine.dispose()
+
+        return asyncio.run(main())
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """temp_db(tables=[...]) 在临时 SQLite 文件中建表并返回 TempDatabase"""
+    databases = []
+
+    def create(tables) -> TempDatabase:
+        path = tmp_path / f"db{len(databases)}.sqlite"
+        sync_engine = create_engine(f"sqlite:///{path}")
+        for table in tables:
+            getattr(table, "__table__", table).create(sync_engine)
+        database = TempDatabase(create_async_engine(f"sqlite+aiosqlite:///{path}"), sync_engine)
+        databases.append(database)
+        return database
+
+    yield create
+    for database in databases:
+        database.sync_engine.dispose()
+
+
+@pytest.fixture
+def record_statements():
+    """record_statements(engine) 开始记录该引擎执行的 SQL，返回记录列表（测试结束时取消监听）"""
+    listeners = []
+
+    def start(engine) -> list[str]:
+        statements = []
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        target = getattr(engine, "sync_engine", engine)
+        event.listen(target, "before_cursor_execute", listener)
+        listeners.append((target, listener))
+        return statements
+
+    yield start
+    for target, listener in listeners:
+        event.remove(target, "before_cursor_execute", listener)
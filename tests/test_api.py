@@ -17,3 +17,14 @@ def test_openapi_contains_core_routes(client):
     assert "/api/v1/auth/login" in paths
     assert "/api/v1/posts/" in paths
     assert "/api/v1/comments/post/{post_id}" in paths
+
+
+def test_cache_inspector_requires_authentication(client):
+    response = client.get("/api/v1/cache/stats")
+    assert response.status_code == 401
+
+
+def test_readiness_endpoint_reports_warmup_state(client):
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
@@ -0,0 +1,84 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core import bloom
+from app.core import cache as cache_module
+from app.models.user import User
+
+
+def _isolate(monkeypatch):
+    monkeypatch.setattr(bloom, "_filters", {})
+    monkeypatch.setattr(bloom.settings, "CACHE_REDIS_ENABLED", False)
+
+
+def _built_filter(monkeypatch, name, column, values):
+    existence_filter = bloom.ExistenceFilter(name, column)
+
+    async def load_values():
+        return list(values)
+
+    monkeypatch.setattr(existence_filter, "_load_values", load_values)
+    asyncio.run(existence_filter.rebuild())
+    return existence_filter
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom_filter = bloom.BloomFilter(capacity=2000, error_rate=0.01)
+    members = [f"post-{i}" for i in range(2000)]
+    for member in members:
+        bloom_filter.add(member)
+
+    assert all(member in bloom_filter for member in members)
+    false_positives = sum(f"missing-{i}" in bloom_filter for i in range(10000))
+    assert false_positives / 10000 < 0.03
+    assert bloom_filter.estimated_false_positive_rate() < 0.03
+
+
+def test_existence_filter_passes_everything_until_built(monkeypatch):
+    _isolate(monkeypatch)
+    existence_filter = bloom.ExistenceFilter("usernames", User.username)
+
+    assert existence_filter.might_contain("anyone") is True
+    assert existence_filter.stats()["checks"] == 0
+
+
+def test_existence_filter_reports_definite_misses_and_false_positive_rate(monkeypatch):
+    _isolate(monkeypatch)
+    existence_filter = _built_filter(monkeypatch, "usernames", User.username, ["alice", "bob"])
+
+    assert existence_filter.might_contain("alice") is True
+    assert existence_filter.might_contain("mallory") is False
+    existence_filter.record_false_positive()
+
+    stats = existence_filter.stats()
+    assert stats["entries"] == 2
+    assert stats["checks"] == 2
+    assert stats["definite_misses"] == 1
+    assert stats["observed_false_positive_rate"] == 0.5
+
+
+def test_existence_filter_is_not_trusted_while_invalidation_channel_is_down(monkeypatch):
+    _isolate(monkeypatch)
+    existence_filter = _built_filter(monkeypatch, "usernames", User.username, ["alice"])
+    monkeypatch.setattr(bloom.settings, "CACHE_REDIS_ENABLED", True)
+    monkeypatch.setattr(cache_module.cache_manager, "listener_connected", False)
+
+    assert existence_filter.might_contain("mallory") is True
+
+
+def test_flushed_and_broadcast_values_are_added(monkeypatch):
+    _isolate(monkeypatch)
+    existence_filter = _built_filter(monkeypatch, "usernames", User.username, [])
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+
+    with Session(engine) as session:
+        session.add(User(email="carol@example.com", username="carol", hashed_password="x"))
+        session.flush()
+    bloom._apply_broadcast({"op": "bloom", "values": {"usernames": ["dave"]}})
+
+    assert existence_filter.might_contain("carol") is True
+    assert existence_filter.might_contain("dave") is True
+    assert existence_filter.might_contain("erin") is False
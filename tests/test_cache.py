@@ -0,0 +1,575 @@
+import asyncio
+import fnmatch
+import inspect
+import json
+import time
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import cache as cache_module
+from app.core.memory_cache import MemoryCache
+
+
+def test_memory_cache_expires_entries_after_ttl(monkeypatch):
+    cache = MemoryCache(max_entries=10)
+    now = time.monotonic()
+    monkeypatch.setattr("app.core.memory_cache.time.monotonic", lambda: now)
+    cache.set("tags:list", ["python"], ttl=5)
+
+    assert cache.get("tags:list") == ["python"]
+
+    monkeypatch.setattr("app.core.memory_cache.time.monotonic", lambda: now + 6)
+    assert cache.get("tags:list") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_memory_cache_evicts_least_recently_used_entry():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_cache_respects_byte_budget():
+    cache = MemoryCache(max_entries=100, max_bytes=2000)
+    for index in range(10):
+        cache.set(f"key:{index}", "x" * 400)
+
+    assert cache.total_bytes <= 2000
+    assert cache.stats()["evictions"] > 0
+    assert cache.get("key:9") == "x" * 400
+    assert cache.set("too-big", "x" * 5000) is False
+
+
+def test_memory_cache_deletes_by_glob_pattern():
+    cache = MemoryCache()
+    cache.set("tags:list:limit:10", [])
+    cache.set("tags:cloud", {})
+    cache.set("categories:list", [])
+
+    assert cache.delete_pattern("tags:*") == 2
+    assert cache.keys() == ["categories:list"]
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.published = []
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        self.round_trips += 1
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.store.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key.decode() if isinstance(key, bytes) else key, None)
+
+    async def sadd(self, key, *members):
+        self.store.setdefault(key, set()).update(members)
+
+    async def smembers(self, key):
+        return {member.encode() for member in self.store.get(key, set())}
+
+    async def ttl(self, key):
+        return 60 if key in self.store else -2
+
+    async def expire(self, key, seconds, nx=False, gt=False):
+        return True
+
+    async def exists(self, key):
+        return int(key in self.store)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.store.get(key) == token:
+            del self.store[key]
+            return 1
+        return 0
+
+    async def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+    async def zadd(self, key, mapping):
+        self.store.setdefault(key, {}).update(mapping)
+
+    async def scan(self, cursor=0, match="*", count=None):
+        return 0, [key.encode() for key in self.store if fnmatch.fnmatchcase(key, match)]
+
+
+def _use_fake_redis(monkeypatch, fake):
+    async def get_connection():
+        return fake
+
+    monkeypatch.setattr(cache_module, "get_redis_connection", get_connection)
+    monkeypatch.setattr(cache_module._redis_tier, "_down_until", 0.0)
+    cache_module._memory_cache.clear()
+
+
+def test_cache_falls_back_to_memory_when_redis_is_unreachable(monkeypatch):
+    async def broken_connection():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache_module, "get_redis_connection", broken_connection)
+    monkeypatch.setattr(cache_module._redis_tier, "_down_until", 0.0)
+    cache_module._memory_cache.clear()
+    calls = []
+
+    @cache_module.cache_key_wrapper("tests:fallback", expire=60)
+    async def load(limit: int):
+        calls.append(limit)
+        return {"limit": limit}
+
+    assert asyncio.run(load(limit=5)) == {"limit": 5}
+    assert asyncio.run(load(limit=5)) == {"limit": 5}
+    assert calls == [5]
+    assert cache_module._redis_tier.available is False
+
+
+def test_cache_reads_through_to_redis_and_backfills_memory(monkeypatch):
+    fake = FakeRedis()
+    _use_fake_redis(monkeypatch, fake)
+
+    asyncio.run(cache_module.cache_set("tags:cloud", {"tags": []}, expire=60))
+    assert "cache:tags:cloud" in fake.store
+    assert fake.published[-1][1]["op"] == "delete"
+
+    cache_module._memory_cache.clear()
+    assert asyncio.run(cache_module.cache_get("tags:cloud")) == (True, {"tags": []})
+    assert cache_module._memory_cache.get("tags:cloud") == {"tags": []}
+
+
+def test_invalidation_messages_from_other_workers_drop_local_entries():
+    cache_module._memory_cache.clear()
+    cache_module._memory_cache.set("tags:list", [1])
+    cache_module._memory_cache.set("categories:list", [2])
+
+    cache_module._apply_invalidation_message({"origin": "other-worker", "op": "pattern", "pattern": "tags:*"})
+    assert cache_module._memory_cache.get("tags:list") is None
+
+    cache_module._apply_invalidation_message(
+        {"origin": cache_module._instance_id, "op": "delete", "keys": ["categories:list"]}
+    )
+    assert cache_module._memory_cache.get("categories:list") == [2]
+
+
+def test_route_cache_key_ignores_dependencies_and_normalises_arguments():
+    async def read_tags(skip: int = 0, limit: int = 100, db: AsyncSession = None, current_user=None):
+        return []
+
+    signature = inspect.signature(read_tags)
+    build = cache_module.build_route_cache_key
+
+    session_a = AsyncSession()
+    session_b = AsyncSession()
+    key_a = build("tags:list", signature, (0, 20), {"db": session_a})
+    key_b = build("tags:list", signature, (), {"limit": 20, "db": session_b})
+    assert key_a == key_b
+    assert key_a != build("tags:list", signature, (), {"limit": 50, "db": session_a})
+
+    alice = SimpleNamespace(id=1)
+    bob = SimpleNamespace(id=2)
+    per_user = [
+        build("tags:list", signature, (), {"current_user": user}, vary_on_user=True)
+        for user in (alice, bob, None)
+    ]
+    assert len(set(per_user)) == 3
+    assert build("tags:list", signature, (), {"current_user": alice}) == build("tags:list", signature, (), {})
+
+
+def test_route_cache_key_only_varies_on_declared_parameters():
+    async def read_category(category_id: int, trace_id: str = ""):
+        return {}
+
+    signature = inspect.signature(read_category)
+    key_a = cache_module.build_route_cache_key(
+        "categories:detail", signature, (3,), {"trace_id": "a"}, vary_on=("category_id",)
+    )
+    key_b = cache_module.build_route_cache_key(
+        "categories:detail", signature, (3,), {"trace_id": "b"}, vary_on=("category_id",)
+    )
+    assert key_a == key_b
+    assert key_a.startswith("categories:detail:")
+
+
+def test_concurrent_misses_are_coalesced_into_one_computation(monkeypatch):
+    fake = FakeRedis()
+    _use_fake_redis(monkeypatch, fake)
+    monkeypatch.setattr(cache_module, "_single_flight_stats", dict.fromkeys(cache_module._single_flight_stats, 0))
+    calls = []
+
+    @cache_module.cache_key_wrapper("tests:coalesce", expire=60)
+    async def tag_cloud(limit: int):
+        calls.append(limit)
+        await asyncio.sleep(0.01)
+        return {"limit": limit}
+
+    async def run():
+        return await asyncio.gather(*(tag_cloud(limit=10) for _ in range(10)))
+
+    assert asyncio.run(run()) == [{"limit": 10}] * 10
+    assert calls == [10]
+    stats = cache_module.single_flight_stats()
+    assert stats["leaders"] == 1
+    assert stats["coalesced_local"] == 9
+    assert stats["inflight"] == 0
+    assert not any(key.startswith("cache:lock:") for key in fake.store)
+
+
+def test_coalesced_waiters_share_the_leader_exception(monkeypatch):
+    _use_fake_redis(monkeypatch, FakeRedis())
+
+    @cache_module.cache_key_wrapper("tests:coalesce-error", expire=60)
+    async def broken():
+        await asyncio.sleep(0.01)
+        raise ValueError("database unavailable")
+
+    async def run():
+        return await asyncio.gather(broken(), broken(), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cache_module._inflight == {}
+
+
+def test_cancelled_leader_does_not_make_waiters_recompute(monkeypatch):
+    _use_fake_redis(monkeypatch, FakeRedis())
+    calls = []
+
+    @cache_module.cache_key_wrapper("tests:coalesce-cancel", expire=60)
+    async def tag_cloud():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"tags": 3}
+
+    async def run():
+        leader = asyncio.create_task(tag_cloud())
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(tag_cloud()) for _ in range(5)]
+        await asyncio.sleep(0.005)
+        # 模拟客户端断开：领头请求被取消
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        return leader.cancelled(), results
+
+    cancelled, results = asyncio.run(run())
+    assert cancelled
+    assert results == [{"tags": 3}] * 5
+    assert calls == [1]
+    assert cache_module._inflight == {}
+
+
+def test_worker_waits_for_the_lock_holder_instead_of_recomputing(monkeypatch):
+    fake = FakeRedis()
+    _use_fake_redis(monkeypatch, fake)
+    monkeypatch.setattr(cache_module.settings, "CACHE_LOCK_POLL_INTERVAL", 0.001)
+    calls = []
+
+    @cache_module.cache_key_wrapper("tests:remote", expire=60)
+    async def categories():
+        calls.append(1)
+        return ["local"]
+
+    key = "tests:remote"
+    fake.store[cache_module._redis_tier.lock_key(key)] = "other-worker"
+
+    async def other_worker_finishes():
+        await asyncio.sleep(0.005)
+        fake.store[cache_module._redis_tier.redis_key(key)] = json.dumps({"v": ["remote"], "e": None})
+        del fake.store[cache_module._redis_tier.lock_key(key)]
+
+    async def run():
+        result, _ = await asyncio.gather(categories(), other_worker_finishes())
+        return result
+
+    assert asyncio.run(run()) == ["remote"]
+    assert calls == []
+
+
+class _FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _broken_redis(monkeypatch):
+    async def broken_connection():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache_module, "get_redis_connection", broken_connection)
+    monkeypatch.setattr(cache_module._redis_tier, "_down_until", 0.0)
+    monkeypatch.setattr(cache_module, "async_session", _FakeSession)
+    cache_module._memory_cache.clear()
+
+
+def _skew_clock(monkeypatch):
+    """返回一个可向前拨动的单调时钟，保持事件循环计时器可用"""
+    real_monotonic = time.monotonic
+    offset = [0.0]
+    monkeypatch.setattr(time, "monotonic", lambda: real_monotonic() + offset[0])
+    return offset
+
+
+def test_stale_value_is_served_while_refreshing_in_background(monkeypatch):
+    _broken_redis(monkeypatch)
+    offset = _skew_clock(monkeypatch)
+    version = [1]
+
+    @cache_module.cache_key_wrapper("tests:swr", expire=60, stale_ttl=300)
+    async def tag_cloud():
+        return {"version": version[0]}
+
+    async def run():
+        assert await tag_cloud() == {"version": 1}
+        version[0] = 2
+        offset[0] += 120
+        assert await tag_cloud() == {"version": 1}
+        await asyncio.gather(*cache_module._refresh_tasks.values())
+        assert await tag_cloud() == {"version": 2}
+
+        offset[0] += 1000
+        version[0] = 3
+        assert await tag_cloud() == {"version": 3}
+
+    asyncio.run(run())
+
+
+def test_stale_value_is_served_when_recompute_fails(monkeypatch):
+    _broken_redis(monkeypatch)
+    offset = _skew_clock(monkeypatch)
+    failing = [False]
+
+    @cache_module.cache_key_wrapper("tests:stale-if-error", expire=60, stale_if_error=True)
+    async def categories():
+        if failing[0]:
+            raise ConnectionError("database unavailable")
+        return ["python"]
+
+    @cache_module.cache_key_wrapper("tests:no-stale", expire=60)
+    async def strict():
+        if failing[0]:
+            raise ConnectionError("database unavailable")
+        return ["python"]
+
+    async def run():
+        assert await categories() == ["python"]
+        assert await strict() == ["python"]
+        failing[0] = True
+        offset[0] += 3600
+        assert await categories() == ["python"]
+        try:
+            await strict()
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError("expected the error to propagate without stale_if_error")
+
+    asyncio.run(run())
+
+
+def test_invalidate_tags_only_drops_dependent_keys(monkeypatch):
+    fake = FakeRedis()
+    _use_fake_redis(monkeypatch, fake)
+
+    @cache_module.cache_key_wrapper("tests:tag-detail", expire=60, tags=("tag:{tag_id}",))
+    async def tag_detail(tag_id: int):
+        return {"id": tag_id}
+
+    async def run():
+        await tag_detail(tag_id=1)
+        await tag_detail(tag_id=2)
+        await cache_module.invalidate_tags("tag:1")
+
+    asyncio.run(run())
+
+    remaining = [key for key in fake.store if key.startswith("cache:tests:tag-detail")]
+    assert len(remaining) == 1
+    assert cache_module._memory_cache.keys() == [remaining[0][len("cache:"):]]
+    assert "cache:tag:tag:1" not in fake.store
+    assert "cache:tag:tag:2" in fake.store
+    assert fake.published[-1][1] == {"op": "tags", "tags": ["tag:1"], "origin": cache_module._instance_id}
+
+
+def test_clear_all_keeps_tag_indexes_stats_and_leases(monkeypatch):
+    fake = FakeRedis()
+    _use_fake_redis(monkeypatch, fake)
+
+    async def run():
+        await cache_module.cache_set("tags:cloud", {"tags": []}, expire=60, tags=("tags",))
+        assert await cache_module.acquire_lease("sidebar:refresh", 30)
+        await cache_module._redis_tier.report_stats({"instance": "w1"}, ttl=60)
+        await cache_module.cache_manager.clear_all()
+
+    asyncio.run(run())
+
+    assert "cache:tags:cloud" not in fake.store
+    assert {"cache:tag:tags", "cache:lock:sidebar:refresh", "cache:stats:w1"} <= set(fake.store)
+    assert fake.published[-1][1]["op"] == "clear"
+
+
+def test_tag_invalidation_messages_apply_to_local_index():
+    cache_module._clear_local()
+    cache_module._index_tags("categories:list", ["categories"])
+    cache_module._memory_cache.set("categories:list", [1])
+    cache_module._memory_cache.set("tags:cloud", [2])
+
+    cache_module._apply_invalidation_message({"origin": "other-worker", "op": "tags", "tags": ["categories"]})
+
+    assert cache_module._memory_cache.keys() == ["tags:cloud"]
+    assert "categories" not in cache_module._tag_index
+
+
+def test_prefix_stats_track_hits_misses_and_recomputes(monkeypatch):
+    _broken_redis(monkeypatch)
+    monkeypatch.setattr(cache_module, "_prefix_stats", {})
+
+    @cache_module.cache_key_wrapper("tests:stats", expire=60)
+    async def tag_detail(tag_id: int):
+        return {"id": tag_id}
+
+    async def run():
+        await tag_detail(tag_id=1)
+        await tag_detail(tag_id=1)
+        await tag_detail(tag_id=2)
+
+    asyncio.run(run())
+
+    snapshot = cache_module.local_stats_snapshot()
+    stats = snapshot["prefixes"]["tests:stats"]
+    assert (stats["hits"], stats["misses"], stats["recomputes"]) == (1, 2, 2)
+    assert stats["entries"] == 2
+    assert stats["bytes"] > 0
+
+
+def test_stats_snapshots_are_merged_across_workers():
+    def snapshot(instance, hits, misses, max_seconds):
+        return {
+            "instance": instance,
+            "overall": {"entries": 2, "bytes": 100, "coalesced_local": 1},
+            "prefixes": {
+                "tags:cloud": {
+                    "hits": hits,
+                    "misses": misses,
+                    "recomputes": misses,
+                    "recompute_seconds": max_seconds * misses,
+                    "recompute_max_seconds": max_seconds,
+                    "entries": 1,
+                    "bytes": 50,
+                }
+            },
+        }
+
+    merged = cache_module.merge_stats_snapshots([snapshot("a", 3, 1, 0.2), snapshot("b", 5, 1, 0.4)])
+
+    assert merged["workers"] == 2
+    assert merged["overall"]["entries"] == 4
+    assert merged["overall"]["coalesced"] == 2
+    assert merged["overall"]["hit_rate"] == 0.8
+    cloud = merged["prefixes"]["tags:cloud"]
+    assert cloud["hits"] == 8
+    assert cloud["bytes"] == 100
+    assert cloud["max_recompute_ms"] == 400.0
+    assert cloud["avg_recompute_ms"] == 300.0
+
+
+def test_cache_get_many_reads_missing_keys_in_one_round_trip(monkeypatch):
+    fake = FakeRedis()
+    _use_fake_redis(monkeypatch, fake)
+
+    async def run():
+        for index in range(5):
+            await cache_module.cache_set(f"fragment:{index}", {"index": index}, expire=60)
+        cache_module._memory_cache.clear()
+        cache_module._memory_cache.set("fragment:0", {"index": 0})
+        fake.round_trips = 0
+        return await cache_module.cache_get_many([f"fragment:{index}" for index in range(6)])
+
+    found = asyncio.run(run())
+    assert found == {f"fragment:{index}": {"index": index} for index in range(5)}
+    assert fake.round_trips == 1
+    assert cache_module._memory_cache.get("fragment:4") == {"index": 4}
+
+
+def test_shared_redis_client_is_reused_within_an_event_loop(monkeypatch):
+    from app.core import redis as redis_module
+
+    monkeypatch.setattr(redis_module, "_client", None)
+    monkeypatch.setattr(redis_module, "_client_loop", None)
+
+    async def grab_twice():
+        return redis_module.get_redis(), await redis_module.get_redis_connection()
+
+    first, second = asyncio.run(grab_twice())
+    assert first is second
+    assert first.connection_pool.max_connections == redis_module.settings.REDIS_MAX_CONNECTIONS
+
+    third, _ = asyncio.run(grab_twice())
+    assert third is not first
+
+
+def test_redis_client_is_closed_before_its_event_loop_ends(monkeypatch):
+    from app.core import redis as redis_module
+
+    closed = []
+
+    class FakeClient:
+        async def aclose(self, close_connection_pool=False):
+            closed.append((self, close_connection_pool))
+
+    monkeypatch.setattr(redis_module, "_client", None)
+    monkeypatch.setattr(redis_module, "_client_loop", None)
+    monkeypatch.setattr(redis_module, "_create_client", FakeClient)
+
+    async def grab():
+        return redis_module.get_redis()
+
+    # 每次 asyncio.run（如 Celery 任务）结束时，该循环上的客户端都已关闭
+    first = asyncio.run(grab())
+    second = asyncio.run(grab())
+    assert closed == [(first, True), (second, True)]
+    assert redis_module._client is None
@@ -0,0 +1,59 @@
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from pydantic import BaseModel
+
+from app.core import codecs
+
+
+class TagOut(BaseModel):
+    id: int
+    created_at: datetime
+
+
+def test_msgpack_round_trips_rich_types():
+    pytest.importorskip("msgpack")
+    value = {
+        "published_at": datetime(2024, 5, 1, 12, 30),
+        "day": date(2024, 5, 1),
+        "price": Decimal("9.90"),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "counts": {1: 3},
+    }
+
+    data = codecs.encode(value, codec="msgpack")
+
+    assert data[0] == codecs.CODEC_MSGPACK
+    assert codecs.decode(data) == value
+
+
+def test_json_codec_serializes_pydantic_models():
+    data = codecs.encode([TagOut(id=1, created_at=datetime(2024, 1, 1))], codec="json")
+
+    assert data[0] == codecs.CODEC_JSON
+    assert codecs.decode(data) == [{"id": 1, "created_at": "2024-01-01T00:00:00"}]
+
+
+def test_large_values_are_compressed(monkeypatch):
+    monkeypatch.setattr(codecs.settings, "CACHE_COMPRESS_THRESHOLD", 256)
+    monkeypatch.setattr(codecs.settings, "CACHE_COMPRESSION", "zlib")
+    value = {"posts": [{"title": "hello world", "views": index} for index in range(200)]}
+
+    data = codecs.encode(value, codec="json")
+
+    assert data[0] == codecs.CODEC_JSON | codecs.COMPRESSION_ZLIB
+    assert len(data) < len(json.dumps(value))
+    assert codecs.decode(data) == value
+
+    small = codecs.encode({"ok": True}, codec="json")
+    assert small[0] == codecs.CODEC_JSON
+
+
+def test_legacy_json_values_still_decode():
+    assert codecs.decode(b'{"tags": [1, 2]}') == {"tags": [1, 2]}
+    assert codecs.decode(b'"plain string"') == "plain string"
+    with pytest.raises(codecs.CodecError):
+        codecs.decode(b"not json")
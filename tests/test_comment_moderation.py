@@ -1,9 +1,11 @@
+from app.api.v1.comments import _comment_cache_tags, _refresh_post_comment_count
 from app.models.comment import (
     COMMENT_STATUS_APPROVED,
     COMMENT_STATUS_HIDDEN,
     COMMENT_STATUS_PENDING,
     Comment,
 )
+from app.models.post import Post, PostCounter
 
 
 def test_comment_moderation_status_helpers_stay_in_sync():
@@ -29,3 +31,23 @@ def test_comment_moderation_status_helpers_stay_in_sync():
     assert comment.is_visible is False
     assert comment.is_hidden is True
     assert comment.is_approved is False
+
+
+def test_visible_comment_count_changes_purge_list_pages(temp_db):
+    database = temp_db(tables=[Post, PostCounter, Comment])
+    database.add(Post(id=1, title="a", slug="a", content="", author_id=1, published=True))
+    database.add(
+        Comment(id=1, content="ok", post_id=1, author_id=2, moderation_status=COMMENT_STATUS_APPROVED),
+        Comment(id=2, content="wait", post_id=1, author_id=2, moderation_status=COMMENT_STATUS_PENDING),
+    )
+
+    async def run(db):
+        approved = await _refresh_post_comment_count(db, 1)
+        unchanged = await _refresh_post_comment_count(db, 1)
+        return approved, unchanged
+
+    approved, unchanged = database.run(run)
+
+    assert (approved, unchanged) == (True, False)
+    assert "posts" in _comment_cache_tags(1, approved)
+    assert _comment_cache_tags(1, unchanged) == ["post:1", "sidebar"]
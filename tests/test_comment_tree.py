@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from app.crud.comment_tree import comment_tree
+from app.models.comment import COMMENT_STATUS_APPROVED, COMMENT_STATUS_HIDDEN, COMMENT_STATUS_PENDING, Comment
+from app.models.like import CommentLike
+from app.models.user import User
+
+START = datetime(2024, 1, 1, 12, 0)
+
+# (id, post_id, parent_id, moderation_status)；id 越大发布越晚
+COMMENTS = [
+    (1, 1, None, COMMENT_STATUS_APPROVED),
+    (2, 1, None, COMMENT_STATUS_APPROVED),
+    (3, 1, None, COMMENT_STATUS_APPROVED),
+    (4, 1, None, COMMENT_STATUS_PENDING),
+    (5, 2, None, COMMENT_STATUS_APPROVED),
+    (10, 1, 3, COMMENT_STATUS_APPROVED),
+    (11, 1, 3, COMMENT_STATUS_APPROVED),
+    (12, 1, 3, COMMENT_STATUS_APPROVED),
+    (13, 1, 3, COMMENT_STATUS_HIDDEN),
+    (20, 1, 10, COMMENT_STATUS_APPROVED),
+    (30, 1, 20, COMMENT_STATUS_APPROVED),
+    (40, 1, 13, COMMENT_STATUS_APPROVED),
+]
+
+
+def test_comment_tree_is_loaded_with_one_query_and_paginated(temp_db, record_statements):
+    database = temp_db(tables=[User, Comment, CommentLike])
+    database.insert(
+        User.__table__,
+        [
+            {"id": i, "email": f"u{i}@example.com", "username": f"u{i}", "hashed_password": "x", "full_name": f"User {i}"}
+            for i in (1, 2)
+        ],
+    )
+    database.insert(
+        Comment.__table__,
+        [
+            {"id": id, "post_id": post_id, "parent_id": parent_id, "moderation_status": status,
+             "content": f"c{id}", "author_id": 1 + id % 2, "like_count": id,
+             "created_at": START + timedelta(minutes=id), "updated_at": START}
+            for id, post_id, parent_id, status in COMMENTS
+        ],
+    )
+    database.insert(CommentLike.__table__, [{"user_id": 2, "comment_id": 20}])
+    statements = record_statements(database.engine)
+
+    async def run(db):
+        first = await comment_tree.load(db, post_id=1, limit=2, replies_limit=2, max_depth=2)
+        queries = len(statements)
+        await comment_tree.mark_liked(db, first, user_id=2)
+        second = await comment_tree.load(db, post_id=1, after=first.next_cursor, limit=2)
+        more = await comment_tree.load(db, post_id=1, parent_id=3, after=first.comments[0].replies_cursor)
+        return first, queries, second, more
+
+    first, queries, second, more = database.run(run)
+
+    assert queries == 1
+    assert [node.id for node in first.comments] == [3, 2]
+    assert first.next_cursor is not None
+    newest = first.comments[0]
+    assert [node.id for node in newest.replies] == [10, 11]
+    assert (newest.reply_count, newest.has_more_replies, newest.replies_cursor is not None) == (3, True, True)
+    assert (newest.author.username, newest.like_count) == ("u2", 3)
+    # 第二层到达 max_depth，回复留给“加载更多”
+    deepest = newest.replies[0].replies[0]
+    assert (deepest.id, deepest.depth, deepest.replies, deepest.has_more_replies) == (20, 2, [], True)
+    assert [node.id for node in first.walk() if node.is_liked] == [20]
+
+    assert [node.id for node in second.comments] == [1] and second.next_cursor is None
+    assert [node.id for node in more.comments] == [12] and more.next_cursor is None
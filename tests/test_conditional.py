@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.conditional import Validators, conditional, http_date, make_etag
+
+
+def _app(calls):
+    app = FastAPI()
+    version = Validators(etag=make_etag("posts", 3), last_modified=datetime(2024, 5, 1, 12, 30, 15, 999))
+
+    async def validators(limit: int) -> Validators:
+        return version
+
+    @app.get("/items")
+    @conditional(validators)
+    async def read_items(limit: int = 10):
+        calls.append(limit)
+        return [{"id": i} for i in range(limit)]
+
+    return app, version
+
+
+def test_conditional_sets_validators_and_returns_304_before_loading():
+    calls = []
+    app, version = _app(calls)
+    client = TestClient(app)
+
+    response = client.get("/items?limit=2")
+    assert response.status_code == 200
+    assert response.json() == [{"id": 0}, {"id": 1}]
+    assert response.headers["etag"] == version.etag
+    assert response.headers["last-modified"] == "Wed, 01 May 2024 12:30:15 GMT"
+
+    response = client.get("/items?limit=2", headers={"If-None-Match": version.etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == version.etag
+    assert calls == [2]
+
+
+def test_conditional_honours_if_modified_since_and_prefers_if_none_match():
+    calls = []
+    app, version = _app(calls)
+    client = TestClient(app)
+    last_modified = http_date(version.last_modified)
+
+    assert client.get("/items", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/items", headers={"If-Modified-Since": "Tue, 30 Apr 2024 00:00:00 GMT"}).status_code == 200
+    # If-None-Match 不匹配时忽略 If-Modified-Since
+    response = client.get("/items", headers={"If-None-Match": 'W/"other"', "If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+def test_conditional_does_not_expose_injected_parameters():
+    app, _ = _app([])
+    parameters = app.openapi()["paths"]["/items"]["get"]["parameters"]
+    assert [parameter["name"] for parameter in parameters] == ["limit"]
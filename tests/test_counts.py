@@ -0,0 +1,62 @@
+from sqlalchemy import insert, select
+
+from app.core import cache as cache_module
+from app.core.counts import RowCount, count_rows
+from app.models.tag import Tag
+
+
+def _isolate(monkeypatch):
+    async def broken_connection():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache_module, "get_redis_connection", broken_connection)
+    monkeypatch.setattr(cache_module._redis_tier, "_down_until", 0.0)
+    cache_module._memory_cache.clear()
+
+
+def _tags(temp_db, count):
+    database = temp_db(tables=[Tag])
+    database.insert(Tag.__table__, [{"name": f"tag-{i}", "slug": f"tag-{i}"} for i in range(count)])
+    return database
+
+
+def test_counts_are_cached_per_filter_until_invalidated(monkeypatch, temp_db):
+    _isolate(monkeypatch)
+
+    async def run(db):
+        query = select(Tag)
+        first = await count_rows(db, query, "tests", tags=("tests",), kind="all")
+        await db.execute(insert(Tag.__table__).values(name="late", slug="late"))
+        cached = await count_rows(db, query, "tests", tags=("tests",), kind="all")
+        filtered = await count_rows(db, query.where(Tag.name == "late"), "tests", tags=("tests",), kind="late")
+        await cache_module.invalidate_tags("tests")
+        refreshed = await count_rows(db, query, "tests", tags=("tests",), kind="all")
+        return first, cached, filtered, refreshed
+
+    first, cached, filtered, refreshed = _tags(temp_db, 5).run(run)
+
+    assert (first, cached, filtered, refreshed) == (5, 5, 1, 6)
+    assert str(refreshed) == "6" and not refreshed.capped
+
+
+def test_counts_stop_at_the_cap(monkeypatch, temp_db):
+    _isolate(monkeypatch)
+
+    async def run(db):
+        return (
+            await count_rows(db, select(Tag), "tests", tags=(), cap=10, q="all"),
+            await count_rows(db, select(Tag).where(Tag.id <= 3), "tests", tags=(), cap=10, q="three"),
+        )
+
+    capped, small = _tags(temp_db, 25).run(run)
+
+    assert capped == 10 and capped.capped and str(capped) == "10+"
+    assert small == 3 and not small.capped
+
+
+def test_row_count_behaves_like_int():
+    estimate = RowCount(120000, approximate=True)
+
+    assert estimate + 1 == 120001
+    assert str(estimate) == "~120000"
+    assert RowCount.from_payload(estimate.to_payload()).approximate is True
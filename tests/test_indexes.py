@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models.comment import COMMENT_STATUS_APPROVED, COMMENT_STATUS_PENDING, Comment
+from app.models.like import CommentLike
+from app.models.post import Post
+from app.models.tag import Tag, post_tags
+
+# 热点查询形态与它应当使用的索引
+QUERY_SHAPES = {
+    "ix_posts_published_feed": select(Post.id)
+    .where(Post.published == True)
+    .order_by(Post.published_at.desc(), Post.id.desc())
+    .limit(20),
+    "ix_comments_post_status_roots": select(Comment.id)
+    .where(Comment.post_id == 7, Comment.moderation_status == COMMENT_STATUS_APPROVED, Comment.parent_id.is_(None))
+    .order_by(Comment.created_at.desc()),
+    "ix_comments_parent_id_created_at": select(Comment.id).where(Comment.parent_id == 11).order_by(Comment.created_at),
+    "ix_post_tag_tag_id_post_id": select(post_tags.c.post_id).where(post_tags.c.tag_id == 3),
+    "ix_comment_likes_comment_id_user_id": select(CommentLike.comment_id, func.count())
+    .where(CommentLike.comment_id.in_([1, 2, 3]))
+    .group_by(CommentLike.comment_id),
+    "ix_tags_name_lower": select(Tag.id).where(func.lower(Tag.name).in_(["tag-1", "tag-2"])),
+}
+
+
+async def _seed(conn) -> None:
+    now = datetime(2026, 1, 1)
+    for table in (Post.__table__, Tag.__table__, post_tags, Comment.__table__, CommentLike.__table__):
+        await conn.run_sync(table.create)
+    await conn.execute(
+        insert(Post.__table__),
+        [
+            {"id": i, "title": f"p{i}", "slug": f"p{i}", "content": "", "author_id": 1, "published": i % 4 != 0,
+             "published_at": now - timedelta(hours=i) if i % 4 != 0 else None, "created_at": now, "updated_at": now}
+            for i in range(1, 801)
+        ],
+    )
+    await conn.execute(
+        insert(Tag.__table__),
+        [{"id": i, "name": f"tag-{i}", "slug": f"tag-{i}", "created_at": now, "updated_at": now} for i in range(1, 51)],
+    )
+    await conn.execute(insert(post_tags), [{"post_id": i, "tag_id": i % 50 + 1} for i in range(1, 801)])
+    await conn.execute(
+        insert(Comment.__table__),
+        [
+            {"id": i, "content": "c", "post_id": i % 200 + 1, "author_id": 1,
+             "moderation_status": COMMENT_STATUS_APPROVED if i % 3 else COMMENT_STATUS_PENDING,
+             "parent_id": None if i % 5 else i - 1, "created_at": now + timedelta(minutes=i), "updated_at": now}
+            for i in range(1, 3001)
+        ],
+    )
+    await conn.execute(
+        insert(CommentLike.__table__),
+        [
+            {"user_id": user_id, "comment_id": comment_id, "created_at": now, "updated_at": now}
+            for comment_id in range(1, 601)
+            for user_id in range(1, 6)
+        ],
+    )
+    await conn.exec_driver_sql("ANALYZE")
+
+
+@pytest.fixture(scope="module")
+def query_plans(tmp_path_factory):
+    path = tmp_path_factory.mktemp("indexes") / "plans.db"
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            async with engine.begin() as conn:
+                await _seed(conn)
+                plans = {}
+                for index, query in QUERY_SHAPES.items():
+                    sql = query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+                    rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")).all()
+                    plans[index] = " | ".join(row[-1] for row in rows)
+                return plans
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("index", QUERY_SHAPES)
+def test_hot_query_shapes_use_their_index(query_plans, index):
+    plan = query_plans[index]
+
+    assert f"INDEX {index}" in plan
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan
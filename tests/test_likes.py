@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.like import comment_like, post_like
+from app.models.comment import Comment
+from app.models.like import CommentLike, PostLike
+from app.models.post import Post, PostCounter
+
+TABLES = (Post.__table__, PostCounter.__table__, PostLike.__table__, Comment.__table__, CommentLike.__table__)
+
+
+@pytest.fixture
+def database(temp_db):
+    database = temp_db(tables=TABLES)
+    database.add(Post(id=1, title="a", slug="a", content="", author_id=1, published=True))
+    database.add(Comment(id=1, content="c", post_id=1, author_id=1))
+    return database
+
+
+def test_like_is_idempotent_and_counts_with_two_statements(database, record_statements):
+    statements = record_statements(database.engine)
+
+    async def run(db):
+        first = await post_like.like(db, user_id=7, post_id=1)
+        issued = [statement.split()[0] for statement in statements]
+        again = await post_like.like(db, user_id=7, post_id=1)
+        missing = await post_like.like(db, user_id=7, post_id=404)
+        removed = await post_like.unlike(db, user_id=7, post_id=1)
+        removed_again = await post_like.unlike(db, user_id=7, post_id=1)
+        return first, issued, again, missing, removed, removed_again
+
+    first, issued, again, missing, removed, removed_again = database.run(run)
+
+    assert (first.changed, first.like_count, first.liked) == (True, 1, True)
+    assert [statement for statement in issued if statement in ("INSERT", "UPDATE", "SELECT")] == ["INSERT", "UPDATE"]
+    assert (again.changed, again.like_count) == (False, 1)
+    assert missing.like_count is None and not missing.liked
+    assert (removed.changed, removed.like_count) == (True, 0)
+    assert (removed_again.changed, removed_again.like_count) == (False, 0)
+
+
+def test_concurrent_likes_do_not_lose_or_double_count(database):
+    users = range(1, 31)
+
+    async def click(engine, action, user_id, **target):
+        async with AsyncSession(engine) as db:
+            return await action(db, user_id=user_id, **target)
+
+    async def run(engine):
+        # 每个用户同时点两次
+        likes = await asyncio.gather(
+            *(click(engine, post_like.like, user_id, post_id=1) for user_id in users for _ in range(2)),
+            *(click(engine, comment_like.like, user_id, comment_id=1) for user_id in users for _ in range(2)),
+        )
+        async with AsyncSession(engine) as db:
+            liked = (
+                await db.scalar(select(PostCounter.like_count).where(PostCounter.post_id == 1)),
+                await db.scalar(select(func.count()).select_from(PostLike)),
+                await db.scalar(select(func.count()).select_from(CommentLike)),
+            )
+        unlikes = await asyncio.gather(
+            *(click(engine, post_like.unlike, user_id, post_id=1) for user_id in users for _ in range(2)),
+        )
+        async with AsyncSession(engine) as db:
+            remaining = await db.scalar(select(PostCounter.like_count).where(PostCounter.post_id == 1))
+        return likes, liked, unlikes, remaining
+
+    likes, liked, unlikes, remaining = database.run_engine(run)
+
+    assert sum(result.changed for result in likes) == 2 * len(users)
+    assert liked == (len(users), len(users), len(users))
+    assert max(result.like_count for result in likes[2 * len(users):]) == len(users)
+    assert sum(result.changed for result in unlikes) == len(users)
+    assert remaining == 0
+
+
+def test_comment_like_count_is_persisted_and_reconciled(database):
+    async def run(db):
+        updated_at = await db.scalar(select(Comment.updated_at).where(Comment.id == 1))
+        await comment_like.like(db, user_id=7, comment_id=1)
+        await comment_like.like(db, user_id=8, comment_id=1)
+        await comment_like.unlike(db, user_id=8, comment_id=1)
+        stored = (await db.execute(select(Comment.like_count, Comment.updated_at).where(Comment.id == 1))).one()
+        # 模拟计数漂移：绕过 LikeEngine 直接写点赞表
+        await db.execute(insert(CommentLike.__table__).values(user_id=9, comment_id=1))
+        await db.execute(update(PostCounter).values(like_count=5))
+        await db.commit()
+        found = await comment_like.engine.reconcile(db)
+        fixed = await comment_like.engine.reconcile(db, fix=True)
+        post_fixed = await post_like.engine.reconcile(db, fix=True)
+        after = (
+            await db.scalar(select(Comment.like_count).where(Comment.id == 1)),
+            await db.scalar(select(PostCounter.like_count).where(PostCounter.post_id == 1)),
+            await comment_like.engine.reconcile(db),
+        )
+        return updated_at, stored, found, fixed, post_fixed, after
+
+    updated_at, stored, found, fixed, post_fixed, after = database.run(run)
+
+    assert stored == (1, updated_at)
+    assert found == fixed == [{"id": 1, "stored": 1, "actual": 2}]
+    assert post_fixed == [{"id": 1, "stored": 5, "actual": 0}]
+    assert after == (2, 0, [])
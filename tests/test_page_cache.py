@@ -0,0 +1,117 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse
+from fastapi.testclient import TestClient
+
+from app.core import cache as cache_module
+from app.core import warmup
+from app.core.conditional import Validators, conditional, make_etag
+from app.core.config import settings
+from app.core.page_cache import cache_page
+
+
+def _page_app(monkeypatch, on_hit=None):
+    async def broken_connection():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache_module, "get_redis_connection", broken_connection)
+    monkeypatch.setattr(cache_module._redis_tier, "_down_until", 0.0)
+    cache_module._clear_local()
+
+    renders = []
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+    async def validators(page: int) -> Validators:
+        return Validators(etag=make_etag("posts", page))
+
+    @app.get("/", response_class=HTMLResponse)
+    @cache_page("test_index", tags=("posts",), meta=lambda context: {"post_id": 1}, on_hit=on_hit)
+    @conditional(validators)
+    async def index(request: Request, page: int = 1):
+        renders.append(page)
+        return HTMLResponse("<p>" + "post " * 400 + f"page {page}</p>")
+
+    return TestClient(app), renders
+
+
+def test_anonymous_pages_are_served_from_cache(monkeypatch):
+    client, renders = _page_app(monkeypatch)
+
+    first = client.get("/?page=2&utm_source=feed")
+    second = client.get("/?page=2", headers={"Accept-Encoding": "identity"})
+    third = client.get("/?page=2", headers={"Accept-Encoding": "gzip"})
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert "content-encoding" not in second.headers
+    assert second.text == first.text
+    assert third.headers["X-Cache"] == "HIT"
+    assert third.headers["Content-Encoding"] == "gzip"
+    assert third.text == first.text
+    assert renders == [2]
+
+
+def test_logged_in_requests_bypass_the_page_cache(monkeypatch):
+    client, renders = _page_app(monkeypatch)
+    client.cookies.set(settings.ACCESS_COOKIE_NAME, "token")
+
+    assert client.get("/").headers["X-Cache"] == "BYPASS"
+    assert client.get("/").headers["X-Cache"] == "BYPASS"
+    assert renders == [1, 1]
+
+
+def test_page_cache_is_purged_by_tag(monkeypatch):
+    client, renders = _page_app(monkeypatch)
+
+    client.get("/")
+    asyncio.run(cache_module.invalidate_tags("posts"))
+    assert client.get("/").headers["X-Cache"] == "MISS"
+    assert renders == [1, 1]
+
+
+def test_page_cache_hit_answers_conditional_requests_with_304(monkeypatch):
+    client, renders = _page_app(monkeypatch)
+
+    etag = client.get("/?page=3").headers["ETag"]
+    response = client.get("/?page=3", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.headers["ETag"] == etag
+    assert renders == [3]
+
+
+def test_warmup_hits_do_not_count_views(monkeypatch):
+    views = []
+
+    async def count_view(meta):
+        views.append(meta["post_id"])
+
+    client, renders = _page_app(monkeypatch, on_hit=count_view)
+
+    client.get("/")
+    statuses = asyncio.run(warmup.prime_pages(client.app, ["/"]))
+    client.get("/")
+
+    assert statuses == {"/": 200}
+    assert renders == [1]
+    assert views == [1]
+
+
+def test_revalidations_do_not_count_views(monkeypatch):
+    views = []
+
+    async def count_view(meta):
+        views.append(meta["post_id"])
+
+    client, renders = _page_app(monkeypatch, on_hit=count_view)
+
+    etag = client.get("/").headers["ETag"]
+    revalidated = client.get("/", headers={"If-None-Match": etag})
+    client.get("/")
+
+    assert revalidated.status_code == 304
+    assert views == [1]
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.crud.base import CRUDBase, InvalidCursor, encode_cursor
+from app.main import page_url, paginate_posts
+from app.models.post import Post
+from app.models.tag import Tag
+
+
+@pytest.fixture
+def tags(temp_db):
+    database = temp_db(tables=[Tag])
+    # 每两个标签共用一个时间戳，检验 id 作为第二排序键
+    start = datetime(2024, 1, 1)
+    database.insert(
+        Tag.__table__,
+        [
+            {"id": i, "name": f"tag-{i}", "slug": f"tag-{i}", "created_at": start + timedelta(days=i // 2)}
+            for i in range(1, 8)
+        ],
+    )
+    return database
+
+
+def _ids(page):
+    return [tag.id for tag in page.items]
+
+
+def test_keyset_pages_walk_forward_and_back(tags):
+    crud = CRUDBase(Tag)
+    keys = (Tag.created_at, Tag.id)
+
+    async def walk(db):
+        first = await crud.paginate(db, keys=keys, limit=3)
+        second = await crud.paginate(db, keys=keys, limit=3, after=first.next_cursor)
+        third = await crud.paginate(db, keys=keys, limit=3, after=second.next_cursor)
+        back = await crud.paginate(db, keys=keys, limit=3, before=third.prev_cursor)
+        by_offset = await crud.paginate(db, keys=keys, limit=3, page=2)
+        return first, second, third, back, by_offset
+
+    first, second, third, back, by_offset = tags.run(walk)
+
+    assert _ids(first) == [7, 6, 5] and first.page == 1 and not first.has_prev
+    assert _ids(second) == [4, 3, 2] and second.page == 2
+    assert _ids(third) == [1] and third.page == 3 and not third.has_next
+    assert _ids(back) == [4, 3, 2] and back.page == 2 and back.has_next
+    assert _ids(by_offset) == _ids(second) and by_offset.has_prev
+
+
+def test_keyset_ascending_order_and_invalid_cursor(tags):
+    crud = CRUDBase(Tag)
+    keys = (Tag.created_at, Tag.id)
+
+    async def run(db):
+        first = await crud.paginate(db, keys=keys, descending=False, limit=4)
+        second = await crud.paginate(db, keys=keys, descending=False, limit=4, after=first.next_cursor)
+        with pytest.raises(InvalidCursor):
+            await crud.paginate(db, keys=keys, after="not-a-cursor")
+        with pytest.raises(InvalidCursor):
+            await crud.paginate(db, keys=keys, after=encode_cursor([1], 2))
+        return first, second
+
+    first, second = tags.run(run)
+
+    assert _ids(first) == [1, 2, 3, 4]
+    assert _ids(second) == [5, 6, 7] and not second.has_next
+
+
+def test_page_url_keeps_filters_and_replaces_pagination():
+    request = Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [],
+        "query_string": b"sort=popular&page=3&after=abc&tag_name=python",
+    })
+
+    assert page_url(request, after="next") == "/?sort=popular&tag_name=python&after=next"
+    assert page_url(request, page=1) == "/?sort=popular&tag_name=python"
+
+
+def test_offset_pages_past_the_limit_are_not_found():
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(paginate_posts(None, None, page=settings.PAGINATION_MAX_OFFSET_PAGE + 1, per_page=10))
+    assert exc_info.value.status_code == 404
+
+
+def test_published_posts_always_have_published_at():
+    post = Post(title="a", slug="a", content="", author_id=1, published=True)
+    draft = Post(title="b", slug="b", content="", author_id=1, published=False)
+
+    assert post.published_at is not None
+    assert draft.published_at is None
@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+
+from app.core import write_behind
+from app.core.conditional import fetch_validators, table_version
+from app.crud.post import (
+    counters_version, join_counters, popularity, post as crud_post, post_sort_keys, sort_posts_query, with_counters,
+)
+from app.models.post import Post, PostCounter
+
+
+@pytest.fixture
+def posts(temp_db):
+    database = temp_db(tables=[Post, PostCounter])
+    database.add(
+        Post(title="a", slug="a", content="", author_id=1, published=True, views=5, like_count=1),
+        Post(title="b", slug="b", content="", author_id=1, published=True, views=1, comment_count=4),
+        Post(title="c", slug="c", content="", author_id=2, published=False),
+    )
+    return database
+
+
+def test_new_posts_get_a_counter_row_and_counter_updates_skip_posts(posts, record_statements):
+    async def run(db):
+        post = (await db.execute(with_counters(select(Post)).where(Post.slug == "c"))).scalars().one()
+        statements = record_statements(posts.engine)
+        post.like_count += 1
+        await db.commit()
+        rows = (await db.execute(select(PostCounter.post_id, PostCounter.views, PostCounter.like_count))).all()
+        return post, statements, rows
+
+    post, statements, rows = posts.run(run, expire_on_commit=False)
+
+    assert (post.views, post.like_count, post.comment_count) == (0, 1, 0)
+    assert sorted(rows) == [(1, 5, 1), (2, 1, 0), (3, 0, 1)]
+    updates = [statement for statement in statements if statement.startswith("UPDATE")]
+    assert updates == ["UPDATE post_counters SET like_count=? WHERE post_counters.post_id = ?"]
+
+
+def test_popular_ordering_and_stats_read_post_counters(posts):
+    async def run(db):
+        query = select(Post).where(Post.published == True)
+        keys, descending = post_sort_keys("popular")
+        page = await crud_post.paginate(db, sort_posts_query(query, "popular"), keys=keys, limit=1)
+        second = await crud_post.paginate(
+            db, sort_posts_query(query, "popular"), keys=keys, limit=1, after=page.next_cursor,
+        )
+        by_score = (await db.execute(join_counters(query).order_by(popularity.desc()))).scalars().all()
+        # 兼容属性在类级别仍可用于排序
+        legacy = (await db.execute(select(Post.slug).order_by(Post.views.desc()))).scalars().all()
+        return page, second, by_score, legacy, await crud_post.get_stats(db, author_id=1)
+
+    page, second, by_score, legacy, stats = posts.run(run)
+
+    assert [post.slug for post in page.items] == ["a"] and [post.slug for post in second.items] == ["b"]
+    assert [post.slug for post in by_score] == ["b", "a"]
+    assert legacy == ["a", "b", "c"]
+    assert (stats["total_views"], stats["total_likes"], stats["total_comments"]) == (6, 1, 4)
+
+
+def test_pending_views_merge_into_counters(monkeypatch, posts):
+    monkeypatch.setattr(write_behind, "get_redis_connection", None)
+    monkeypatch.setattr(write_behind, "_registry", {})
+    counter = write_behind.WriteBehindCounter("tests", crud_post.apply_view_deltas, attribute="counters.views")
+
+    async def run(db):
+        post = (await db.execute(with_counters(select(Post)).where(Post.slug == "a"))).scalars().one()
+        await counter.incr(post.id, 3)
+        await counter.merge([post])
+        return post, db.dirty
+
+    post, dirty = posts.run(run)
+
+    assert post.views == 8
+    assert not dirty
+
+
+def test_counters_are_only_loaded_when_asked_for(monkeypatch, posts, record_statements):
+    monkeypatch.setattr(write_behind, "get_redis_connection", None)
+    monkeypatch.setattr(write_behind, "_registry", {})
+    counter = write_behind.WriteBehindCounter("tests", crud_post.apply_view_deltas, attribute="counters.views")
+    statements = record_statements(posts.engine)
+
+    async def plain(db):
+        post = (await db.execute(select(Post).where(Post.slug == "a"))).scalars().one()
+        with pytest.raises(InvalidRequestError):
+            post.counters
+        # 忘了 with_counters 的查询读到 0，而不是让页面 500
+        await counter.incr(post.id, 3)
+        await counter.merge([post])
+        return post.views, post.like_count, post.comment_count
+
+    async def loaded(db):
+        return (await db.execute(with_counters(select(Post)).where(Post.slug == "a"))).scalars().one()
+
+    unloaded = posts.run(plain)
+    loaded = posts.run(loaded)
+
+    assert "JOIN" not in statements[0]
+    assert unloaded == (0, 0, 0)
+    assert loaded.views == 5
+
+
+def test_list_validators_change_when_only_counters_change(posts):
+    async def run(db):
+        async def etag():
+            columns = (*table_version(Post, Post.published == True), *counters_version(Post.published == True))
+            return (await fetch_validators(db, *columns)).etag
+
+        before = await etag()
+        counters = await db.get(PostCounter, 1)
+        counters.like_count += 1
+        await db.commit()
+        return before, await etag()
+
+    before, after = posts.run(run)
+
+    assert before != after
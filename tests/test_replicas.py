@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from app.core.database import (
+    PRIMARY_STICKY_COOKIE,
+    READ_ONLY,
+    ReplicaRouter,
+    RoutingSession,
+    prefers_replica,
+)
+from app.models.tag import Tag
+
+
+def _request(method: str, cookie: str = "") -> Request:
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    return Request({"type": "http", "method": method, "path": "/", "headers": headers, "query_string": b""})
+
+
+async def _setup(tmp_path):
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((primary, "primary"), (replica, "replica")):
+        async with engine.begin() as conn:
+            await conn.run_sync(Tag.__table__.create)
+            await conn.execute(insert(Tag.__table__).values(name=name, slug=name))
+
+    router = ReplicaRouter(primary, [replica])
+
+    class Routing(RoutingSession):
+        pass
+
+    Routing.router = router
+    factory = async_sessionmaker(primary, class_=AsyncSession, sync_session_class=Routing, expire_on_commit=False)
+    return primary, replica, router, factory
+
+
+async def _names(session) -> list[str]:
+    return list((await session.execute(select(Tag.name).order_by(Tag.id))).scalars())
+
+
+def test_read_only_sessions_read_replica_and_writes_go_to_primary(tmp_path):
+    async def run():
+        primary, replica, _, factory = await _setup(tmp_path)
+        try:
+            async with factory() as session:
+                default = await _names(session)
+            async with factory(info={READ_ONLY: True}) as session:
+                before = await _names(session)
+                session.add(Tag(name="new", slug="new"))
+                await session.commit()
+                # 写入之后本会话改读主库，能读到刚写入的数据
+                after = await _names(session)
+            async with factory(info={READ_ONLY: True}) as session:
+                replica_view = await _names(session)
+            return default, before, after, replica_view
+        finally:
+            await primary.dispose()
+            await replica.dispose()
+
+    default, before, after, replica_view = asyncio.run(run())
+
+    assert default == ["primary"]
+    assert before == ["replica"]
+    assert after == ["primary", "new"]
+    assert replica_view == ["replica"]
+
+
+def test_lagging_replica_falls_back_to_primary(tmp_path):
+    async def run():
+        primary, replica, router, factory = await _setup(tmp_path)
+        try:
+            router.record_lag(0, 10.0)
+            async with factory(info={READ_ONLY: True}) as session:
+                lagging = await _names(session)
+            router.record_lag(0, 0.1)
+            async with factory(info={READ_ONLY: True}) as session:
+                recovered = await _names(session)
+            return lagging, recovered, router.status()
+        finally:
+            await primary.dispose()
+            await replica.dispose()
+
+    lagging, recovered, status = asyncio.run(run())
+
+    assert lagging == ["primary"]
+    assert recovered == ["replica"]
+    assert status == [{"replica": 0, "healthy": True, "lag_seconds": 0.1}]
+
+
+def test_prefers_replica_only_for_safe_requests_without_recent_writes():
+    assert prefers_replica(_request("GET")) is True
+    assert prefers_replica(_request("POST")) is False
+    assert prefers_replica(None) is False
+    assert prefers_replica(_request("GET", f"{PRIMARY_STICKY_COOKIE}={time.time() + 5}")) is False
+    assert prefers_replica(_request("GET", f"{PRIMARY_STICKY_COOKIE}={time.time() - 1}")) is True
@@ -0,0 +1,63 @@
+from sqlalchemy import select
+
+from app.crud.slugs import SlugAllocator, tag_slug
+from app.models.tag import Tag
+
+
+def _tags(temp_db, slugs):
+    database = temp_db(tables=[Tag])
+    database.add(*(Tag(name=f"existing {i}", slug=slug) for i, slug in enumerate(slugs)))
+    return database
+
+
+def test_collisions_are_resolved_with_one_prefix_query(temp_db, record_statements):
+    tags = _tags(temp_db, ["周报", "周报-1", "周报-3", "周报-notes", "a_b-1", "axb"])
+    statements = record_statements(tags.engine)
+
+    async def run(db):
+        weekly = await tag_slug.allocate(db, "周报")
+        underscore = await tag_slug.allocate(db, "a_b")
+        like = await tag_slug.allocate(db, "axb")
+        return weekly, underscore, like
+
+    weekly, underscore, like = tags.run(run)
+
+    assert (weekly, underscore, like) == ("周报-2", "a_b", "axb-1")
+    assert len(statements) == 3
+
+
+def test_bulk_allocation_keeps_the_batch_unique(temp_db):
+    async def run(db):
+        return await tag_slug.allocate_many(db, ["Weekly", "weekly", "New", "!!!"])
+
+    slugs = _tags(temp_db, ["weekly"]).run(run)
+
+    assert slugs == ["weekly-1", "weekly-2", "new", "tag"]
+
+
+def test_assign_retries_when_a_concurrent_writer_takes_the_slug(temp_db):
+    class StaleAllocator(SlugAllocator):
+        reads = 0
+
+        async def taken(self, db, bases, exclude_id=None):
+            # 第一次读取发生在另一个事务写入之前
+            self.reads += 1
+            return set() if self.reads == 1 else await super().taken(db, bases, exclude_id)
+
+    allocator = StaleAllocator(Tag, max_length=255)
+
+    async def run(db):
+        tag = Tag(name="release")
+        slug = await allocator.assign(db, tag, "Weekly")
+        reads = allocator.reads
+        await db.commit()
+        renamed = (await db.execute(select(Tag).where(Tag.slug == "weekly"))).scalars().one()
+        # 更新时自己当前的 slug 不算冲突
+        kept = await allocator.assign(db, renamed, "weekly")
+        await db.commit()
+        return slug, reads, kept
+
+    slug, reads, kept = _tags(temp_db, ["weekly"]).run(run)
+
+    assert (slug, reads) == ("weekly-1", 2)
+    assert kept == "weekly"
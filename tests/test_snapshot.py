@@ -0,0 +1,134 @@
+import asyncio
+
+from app.core import cache as cache_module
+from app.core import snapshot as snapshot_module
+
+
+class _FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _isolate(monkeypatch):
+    async def broken_connection():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache_module, "get_redis_connection", broken_connection)
+    monkeypatch.setattr(cache_module._redis_tier, "_down_until", 0.0)
+    monkeypatch.setattr(cache_module, "_invalidation_hooks", {})
+    monkeypatch.setattr(snapshot_module, "_registry", {})
+    monkeypatch.setattr(snapshot_module, "read_session", _FakeSession)
+    cache_module._memory_cache.clear()
+
+
+def test_snapshot_is_built_once_and_records_build_info(monkeypatch):
+    _isolate(monkeypatch)
+    builds = []
+
+    async def builder(db):
+        builds.append(db)
+        await asyncio.sleep(0.01)
+        return {"categories": [{"name": "python", "post_count": 3}]}
+
+    sidebar = snapshot_module.Snapshot("tests-sidebar", builder, refresh_interval=0, ttl=60)
+
+    async def run():
+        results = await asyncio.gather(*(sidebar.get() for _ in range(5)))
+        return results, await sidebar.info()
+
+    results, info = asyncio.run(run())
+
+    assert len(builds) == 1
+    assert results == [{"categories": [{"name": "python", "post_count": 3}]}] * 5
+    assert info["built"] is True
+    assert info["built_at"] is not None
+    assert info["build_seconds"] >= 0.01
+
+
+def test_tag_invalidation_rebuilds_snapshot_before_dropping_pages(monkeypatch):
+    _isolate(monkeypatch)
+    version = [1]
+    gates = []
+
+    async def builder(db):
+        await gates[0].wait()
+        return {"version": version[0]}
+
+    sidebar = snapshot_module.Snapshot(
+        "tests-sidebar", builder, refresh_interval=0, ttl=60, rebuild_on=("sidebar",),
+    )
+
+    async def run():
+        gate = asyncio.Event()
+        gates.append(gate)
+        gate.set()
+        first = await sidebar.get()
+        await cache_module.cache_set("page:index", "<html>", 60, tags=["sidebar"])
+
+        gate.clear()
+        version[0] = 2
+        invalidations = [
+            asyncio.create_task(cache_module.invalidate_tags("sidebar")) for _ in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        during = await sidebar.get()
+        page_during = await cache_module.cache_get("page:index")
+        pending = not any(task.done() for task in invalidations)
+
+        gate.set()
+        await asyncio.gather(*invalidations)
+        return first, during, page_during, pending, await sidebar.get(), await cache_module.cache_get("page:index")
+
+    first, during, page_during, pending, after, page_after = asyncio.run(run())
+
+    assert first == {"version": 1}
+    # 重建期间继续返回旧快照，页面缓存也要等重建完成后才删除
+    assert during == {"version": 1}
+    assert page_during == (True, "<html>")
+    assert pending
+    assert after == {"version": 2}
+    assert page_after == (False, None)
+
+
+def test_snapshot_falls_back_to_default_when_build_fails(monkeypatch):
+    _isolate(monkeypatch)
+
+    async def builder(db):
+        raise RuntimeError("database down")
+
+    sidebar = snapshot_module.Snapshot(
+        "tests-sidebar", builder, refresh_interval=0, ttl=60, default={"tags": []},
+    )
+
+    assert asyncio.run(sidebar.get()) == {"tags": []}
+
+
+def test_sidebar_snapshot_survives_json_codec_round_trip(monkeypatch):
+    from datetime import datetime
+    from types import SimpleNamespace
+
+    from app import main
+    from app.core import codecs
+
+    published = datetime(2024, 5, 1, 8, 30)
+    post = SimpleNamespace(
+        id=1, title="Hello", slug="hello", summary=None, content="body", views=3, comment_count=1,
+        like_count=2, published_at=published, created_at=published, featured_image=None,
+        author=SimpleNamespace(username="alice", full_name=None), category=None,
+        tags=[SimpleNamespace(name="python", slug="python")],
+    )
+    payload = {"categories": [], "tags": [], "popular_posts": [main.serialize_sidebar_post(post)], "featured_posts": []}
+    decoded = codecs.decode(codecs.encode(payload, codec="json"))
+
+    async def fake_get():
+        return decoded
+
+    monkeypatch.setattr(main.sidebar_snapshot, "get", fake_get)
+    sidebar = asyncio.run(main.get_sidebar_data())
+
+    restored = sidebar["popular_posts"][0]
+    assert restored["published_at"] == published
+    assert (restored["published_at"] or restored["created_at"]).strftime("%Y-%m-%d") == "2024-05-01"
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.tag import crud_tag
+from app.models.tag import Tag
+
+
+@pytest.fixture
+def tags(temp_db):
+    database = temp_db(tables=[Tag])
+    database.add(Tag(name="python", slug="python"), Tag(name="c", slug="c"))
+    return database
+
+
+def test_tags_resolve_in_one_lookup_and_one_insert(tags, record_statements):
+    names = [" Python ", "FastAPI", "", "fastapi", *[f"tag-{i}" for i in range(12)]]
+
+    statements = record_statements(tags.engine)
+
+    async def run(db):
+        resolved = [(tag.name, tag.slug) for tag in await crud_tag.resolve(db, names)]
+        await db.commit()
+        return resolved
+
+    resolved = tags.run(run)
+
+    assert [name for name, _ in resolved] == ["python", "fastapi", *[f"tag-{i}" for i in range(12)]]
+    assert ("fastapi", "fastapi") in resolved
+    issued = [statement.split()[0] for statement in statements if statement.split()[0] in ("SELECT", "INSERT")]
+    assert issued == ["SELECT", "INSERT", "SELECT"]
+    assert "lower(tags.name) IN" in statements[0]
+
+
+def test_concurrent_editors_share_new_tags_and_slug_clashes_get_suffixes(tags):
+    async def resolve(engine, names):
+        async with AsyncSession(engine) as db:
+            tags = {tag.name: tag.id for tag in await crud_tag.resolve(db, names)}
+            await db.commit()
+            return tags
+
+    async def run(engine):
+        first, second = await asyncio.gather(
+            resolve(engine, ["asyncio", "redis"]),
+            resolve(engine, ["Redis", "asyncio", "c++"]),
+        )
+        async with AsyncSession(engine) as db:
+            rows = (await db.execute(select(Tag.name, Tag.slug).order_by(Tag.id))).all()
+        return first, second, rows
+
+    first, second, rows = tags.run_engine(run)
+
+    assert first["asyncio"] == second["asyncio"] and first["redis"] == second["redis"]
+    assert sorted(name for name, _ in rows) == ["asyncio", "c", "c++", "python", "redis"]
+    assert ("c++", "c-1") in rows
@@ -0,0 +1,51 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+
+from app.core import warmup
+
+
+def test_warmup_records_step_durations_and_errors(monkeypatch):
+    monkeypatch.setattr(warmup, "warmup_state", warmup.WarmupState())
+
+    async def ok():
+        return 3
+
+    async def broken():
+        raise RuntimeError("db down")
+
+    state = asyncio.run(warmup.run_warmup([("pool", ok), ("sidebar", broken)], timeout=1))
+
+    assert state.status == "ready"
+    assert state.finished
+    assert state.steps["pool"]["result"] == 3
+    assert state.steps["pool"]["seconds"] >= 0
+    assert state.steps["sidebar"]["error"] == "db down"
+
+
+def test_warmup_gives_up_after_timeout(monkeypatch):
+    monkeypatch.setattr(warmup, "warmup_state", warmup.WarmupState())
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    state = asyncio.run(warmup.run_warmup([("pages", slow)], timeout=0.05))
+
+    assert state.status == "timeout"
+    assert state.finished
+    assert state.steps["pages"]["error"] == "timeout"
+
+
+def test_warmup_requests_are_marked():
+    app = FastAPI()
+    seen = []
+
+    @app.get("/post/{slug}")
+    async def post(slug: str, request: Request):
+        seen.append((slug, request.query_params.get("page"), warmup.is_warmup_request(request)))
+        return {}
+
+    statuses = asyncio.run(warmup.prime_pages(app, ["/post/hello?page=2"]))
+
+    assert statuses == {"/post/hello?page=2": 200}
+    assert seen == [("hello", "2", True)]
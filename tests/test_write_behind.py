@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.core import write_behind
+from app.crud.post import post as crud_post
+from app.models.post import Post, PostCounter
+
+
+class _FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        pass
+
+
+def _memory_counter(monkeypatch, apply, batch_size=2):
+    monkeypatch.setattr(write_behind, "get_redis_connection", None)
+    monkeypatch.setattr(write_behind, "async_session", _FakeSession)
+    monkeypatch.setattr(write_behind, "_registry", {})
+    return write_behind.WriteBehindCounter("tests", apply, flush_interval=60, batch_size=batch_size)
+
+
+def test_increments_are_buffered_and_flushed_in_batches(monkeypatch):
+    batches = []
+
+    async def apply(db, deltas):
+        batches.append(dict(deltas))
+
+    counter = _memory_counter(monkeypatch, apply)
+
+    async def run():
+        for post_id in (1, 1, 2, 1, 3):
+            await counter.incr(post_id)
+        before = await counter.pending([1, 2, 4])
+        await counter.flush()
+        return before, await counter.pending([1, 2, 3])
+
+    before, after = asyncio.run(run())
+
+    assert before == {1: 3, 2: 1}
+    assert batches == [{1: 3, 2: 1}, {3: 1}]
+    assert after == {}
+    stats = counter.stats()
+    assert stats["backend"] == "memory"
+    assert (stats["increments"], stats["flushed_total"], stats["flushed_rows"]) == (5, 5, 3)
+    assert stats["last_batch_size"] == 1 and stats["last_lag_seconds"] is not None
+
+
+def test_failed_flush_keeps_unwritten_deltas(monkeypatch):
+    calls = []
+
+    async def apply(db, deltas):
+        calls.append(dict(deltas))
+        if len(calls) == 2:
+            raise RuntimeError("database down")
+
+    counter = _memory_counter(monkeypatch, apply, batch_size=1)
+
+    async def run():
+        await counter.incr(1, 2)
+        await counter.incr(2, 5)
+        await counter.flush()
+        pending = await counter.pending([1, 2])
+        await counter.incr(2)
+        await counter.flush()
+        return pending
+
+    pending = asyncio.run(run())
+
+    # 第一批已写入，第二批失败后放回缓冲区并与新的增量合并
+    assert pending == {2: 5}
+    assert calls == [{1: 2}, {2: 5}, {2: 6}]
+    assert counter.failures == 1 and counter.last_error == "database down"
+    assert counter.stats()["local_pending"] == 0
+
+
+def test_view_deltas_are_applied_with_one_update(temp_db, record_statements):
+    updated_at = datetime(2024, 1, 1, 12, 0)
+    database = temp_db(tables=[Post, PostCounter])
+    database.insert(
+        Post.__table__,
+        [
+            {"id": i, "title": f"p{i}", "slug": f"p{i}", "content": "", "author_id": 1,
+             "created_at": updated_at, "updated_at": updated_at}
+            for i in (1, 2, 3)
+        ],
+    )
+    database.insert(PostCounter.__table__, [{"post_id": i, "views": 10} for i in (1, 2, 3)])
+    statements = record_statements(database.engine)
+
+    async def run(db):
+        await crud_post.apply_view_deltas(db, {1: 5, 3: 1})
+        await db.commit()
+        return (await db.execute(select(Post.id, Post.views, Post.updated_at).order_by(Post.id))).all()
+
+    rows = database.run(run)
+
+    assert [(row.id, row.views) for row in rows] == [(1, 15), (2, 10), (3, 11)]
+    assert all(row.updated_at == updated_at for row in rows)
+    updates = [statement for statement in statements if statement.startswith("UPDATE")]
+    assert len(updates) == 1 and updates[0].startswith("UPDATE post_counters")